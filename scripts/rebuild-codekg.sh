@@ -6,9 +6,9 @@ set -e
 REPO_ROOT="$(cd "$(dirname "$0")/.." && pwd)"
 
 echo "--- CodeKG rebuild: SQLite ---"
-poetry run codekg-build-sqlite --repo "$REPO_ROOT" --wipe
+poetry run codekg-build-sqlite --repo "$REPO_ROOT" --incremental
 
 echo "--- CodeKG rebuild: LanceDB ---"
-poetry run codekg-build-lancedb --repo "$REPO_ROOT" --wipe
+poetry run codekg-build-lancedb --repo "$REPO_ROOT" --incremental
 
 echo "--- CodeKG rebuild: complete ---"
@@ -17,7 +17,8 @@ Primary entry point::
 
 Individual layers::
 
-    from code_kg import CodeGraph, GraphStore, SemanticIndex
+    from code_kg import CodeGraph, GraphStore, GraphSnapshot, SemanticIndex
+    from code_kg import VectorBackend, NumpyVectorStore
 
 Result types::
 
@@ -32,6 +33,7 @@ __version__ = "0.3.2"
 __author__ = "Eric G. Suchanek, PhD"
 
 # Low-level primitives (locked v0 contract)
+from code_kg.cache import LRUCache
 from code_kg.codekg import DEFAULT_MODEL, Edge, Node
 
 # Layered classes
@@ -40,7 +42,9 @@ from code_kg.index import Embedder, SeedHit, SemanticIndex, SentenceTransformerE
 
 # Orchestrator + result types
 from code_kg.kg import BuildStats, CodeKG, QueryResult, Snippet, SnippetPack
+from code_kg.snapshot import GraphSnapshot
 from code_kg.store import DEFAULT_RELS, GraphStore, ProvMeta
+from code_kg.vecstore import NumpyVectorStore, VectorBackend
 
 __all__ = [
     # primitives
@@ -50,12 +54,16 @@ __all__ = [
     # layers
     "CodeGraph",
     "GraphStore",
+    "GraphSnapshot",
     "ProvMeta",
     "DEFAULT_RELS",
     "Embedder",
     "SentenceTransformerEmbedder",
     "SemanticIndex",
     "SeedHit",
+    "VectorBackend",
+    "NumpyVectorStore",
+    "LRUCache",
     # orchestrator
     "CodeKG",
     # result types
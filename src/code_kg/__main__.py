@@ -12,6 +12,7 @@ query           Run a hybrid query
 pack            Generate a snippet pack
 viz             Launch the Streamlit visualiser
 mcp             Start the MCP server
+bench           Benchmark the pipeline on synthetic repositories
 """
 
 import sys
@@ -23,6 +24,7 @@ _COMMANDS: dict[str, str] = {
     "pack": "code_kg.codekg_snippet_packer",
     "viz": "code_kg.codekg_viz",
     "mcp": "code_kg.mcp_server",
+    "bench": "code_kg.bench",
 }
 
 _HELP = """\
@@ -35,6 +37,7 @@ subcommands:
   pack            Generate a snippet pack
   viz             Launch the Streamlit visualiser
   mcp             Start the MCP server
+  bench           Benchmark the pipeline on synthetic repositories
 
 Run  python -m code_kg <subcommand> --help  for per-command options.
 """
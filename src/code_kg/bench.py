@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+bench.py
+
+codekg-bench — offline benchmark suite for the CodeKG hot paths.
+
+Generates a synthetic Python repository with a configurable number of
+functions, then times each pipeline stage against it:
+
+    extract  → extract_repo
+    write    → GraphStore.write + resolve_symbols
+    expand   → GraphStore.expand
+    hydrate  → GraphStore.nodes on the expanded ids
+    callers  → GraphStore.callers_of / callers_of_many on top fan-in nodes
+    index    → SemanticIndex.build
+    search   → SemanticIndex.search
+    pack     → CodeKG.pack
+
+Embeddings come from a deterministic hashing :class:`HashEmbedder`, so no
+model is downloaded and numbers reflect CodeKG itself.  Query caches are
+disabled so every search and pack call does the full work.  Results
+(throughput, latency percentiles and peak traced memory per stage) are
+printed as JSON for comparison across commits.
+
+Usage::
+
+    codekg-bench --functions 1000 10000 --output bench.json
+
+Author: Eric G. Suchanek, PhD
+"""
+
+from __future__ import annotations
+
+import argparse
+import datetime
+import hashlib
+import json
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from code_kg import __version__
+from code_kg.cache import LRUCache
+from code_kg.codekg import extract_repo
+from code_kg.index import VECTOR_INDEX_TYPES, Embedder, SemanticIndex
+from code_kg.kg import CodeKG
+from code_kg.store import GraphStore
+
+# ---------------------------------------------------------------------------
+# Constants
+# ---------------------------------------------------------------------------
+
+_MODULES_PER_PACKAGE = 20
+
+_VOCAB = (
+    "account alert archive batch buffer cache channel checksum client config "
+    "connection cursor database decode delta digest dispatch document encode "
+    "event export fetch filter graph handler header index invoice job ledger "
+    "lock manifest message metric migration node order packet parse payload "
+    "pipeline policy queue record registry report request retry route schema "
+    "session shard snapshot socket stream task token transaction upload user "
+    "validate vector worker"
+).split()
+
+_MB = 1024 * 1024
+
+# Highest fan-in nodes looked up by the callers stages
+_CALLER_TARGETS = 50
+
+# ---------------------------------------------------------------------------
+# Fake embedder
+# ---------------------------------------------------------------------------
+
+
+class HashEmbedder(Embedder):
+    """
+    Deterministic bag-of-words hashing embedder (no model needed).
+
+    Each token is hashed into one of :attr:`dim` buckets and the histogram
+    is L2-normalised, so texts sharing words land near each other.
+
+    :param dim: Vector dimension (default 64).
+    """
+
+    def __init__(self, dim: int = 64) -> None:
+        """Initialise the embedder.
+
+        :param dim: Vector dimension.
+        """
+        self.dim = dim
+        self.model_name = f"hash-{dim}"
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        """Embed each text as a normalised hashed token histogram.
+
+        :param texts: Texts to embed.
+        :return: One vector per text.
+        """
+        return self.embed_batch(texts).tolist()
+
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        """Embed *texts* into one ``(len(texts), dim)`` float32 matrix.
+
+        :param texts: Texts to embed.
+        :return: Row-normalised hashed token histograms.
+        """
+        out = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in zip(out, texts):
+            for tok in text.lower().split():
+                h = int.from_bytes(hashlib.blake2b(tok.encode(), digest_size=4).digest(), "little")
+                row[h % self.dim] += 1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.where(norms > 0, norms, 1.0)
+
+
+# ---------------------------------------------------------------------------
+# Synthetic repository
+# ---------------------------------------------------------------------------
+
+
+def synth_repo(
+    root: str | Path,
+    functions: int,
+    *,
+    per_module: int = 40,
+    seed: int = 0,
+) -> dict:
+    """
+    Write a deterministic synthetic package under ``root/synth``.
+
+    Each module holds ``per_module`` callables: a quarter are methods of one
+    class, the rest module-level functions.  Every callable has a docstring
+    drawn from a fixed vocabulary and calls its predecessor, and every module
+    after the first imports and calls the first function of an earlier one,
+    so the graph has CONTAINS, CALLS, IMPORTS and cross-module RESOLVES_TO
+    edges.  Names embed the module number, so symbol resolution scales with
+    the repo rather than with the square of it.
+
+    :param root: Directory to write into (created if absent).
+    :param functions: Total number of function and method definitions.
+    :param per_module: Definitions per module.
+    :param seed: Random seed for docstrings and import targets.
+    :return: ``{"functions": ..., "modules": ..., "packages": ..., "files": ...}``.
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    n_modules = max(1, -(-functions // per_module))
+    (root / "synth").mkdir(parents=True, exist_ok=True)
+    (root / "synth" / "__init__.py").write_text("")
+
+    remaining = functions
+    for m in range(n_modules):
+        pkg = root / "synth" / f"pkg_{m // _MODULES_PER_PACKAGE}"
+        if m % _MODULES_PER_PACKAGE == 0:
+            pkg.mkdir(exist_ok=True)
+            (pkg / "__init__.py").write_text("")
+        count = min(per_module, remaining)
+        remaining -= count
+        (pkg / f"mod_{m}.py").write_text(_synth_module(m, count, rng))
+
+    n_packages = -(-n_modules // _MODULES_PER_PACKAGE)
+    return {
+        "functions": functions,
+        "modules": n_modules,
+        "packages": n_packages,
+        "files": n_modules + n_packages + 1,
+    }
+
+
+def _synth_module(m: int, count: int, rng: random.Random) -> str:
+    """Render the source of synthetic module *m* with *count* definitions."""
+
+    def words(n: int) -> str:
+        return " ".join(rng.choice(_VOCAB) for _ in range(n))
+
+    n_methods = count // 4
+    n_funcs = count - n_methods
+    lines = [f'"""Synthetic module {m}: {words(6)}."""', ""]
+
+    first = "x"
+    if m > 0:
+        j = rng.randrange(m)
+        lines += [f"from synth.pkg_{j // _MODULES_PER_PACKAGE}.mod_{j} import fn_{j}_0", ""]
+        first = f"fn_{j}_0(x)"
+
+    for i in range(n_funcs):
+        call = f"fn_{m}_{i - 1}(x)" if i else first
+        lines += [
+            "",
+            f"def fn_{m}_{i}(x):",
+            f'    """{words(8).capitalize()}."""',
+            f"    return {call}",
+            "",
+        ]
+
+    if n_methods:
+        lines += ["", f"class Service{m}:", f'    """{words(8).capitalize()}."""', ""]
+        for i in range(n_methods):
+            call = f"self.method_{m}_{i - 1}(x)" if i else f"fn_{m}_0(x)"
+            lines += [
+                f"    def method_{m}_{i}(self, x):",
+                f'        """{words(8).capitalize()}."""',
+                f"        return {call}",
+                "",
+            ]
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Measurement helpers
+# ---------------------------------------------------------------------------
+
+
+@contextmanager
+def _stage(results: dict, name: str, *, trace: bool) -> Iterator[dict]:
+    """Time a block and record its wall time and peak traced memory.
+
+    The yielded dict is stored as ``results[name]``; callers add
+    stage-specific fields (counts, throughput, latencies) to it.
+    """
+    rec: dict = {}
+    base = 0
+    if trace:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    yield rec
+    rec["seconds"] = round(time.perf_counter() - t0, 4)
+    rec["peak_mb"] = round((tracemalloc.get_traced_memory()[1] - base) / _MB, 2) if trace else None
+    results[name] = rec
+
+
+def _latency(fn: Callable[[int], object], n: int) -> dict:
+    """Call ``fn(i)`` for ``i`` in ``range(n)`` and summarise per-call latency.
+
+    :return: Dict with ``calls``, ``mean_ms``, ``p50_ms``, ``p95_ms``,
+             ``max_ms`` and ``per_second``.
+    """
+    samples = []
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn(i)
+        samples.append((time.perf_counter() - t0) * 1e3)
+    samples.sort()
+    mean = statistics.fmean(samples)
+    return {
+        "calls": n,
+        "mean_ms": round(mean, 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "max_ms": round(samples[-1], 3),
+        "per_second": round(1e3 / mean, 1) if mean else None,
+    }
+
+
+def _recall(found: list[set[str]], truth: list[set[str]]) -> float | None:
+    """Return mean recall of *found* against *truth*, query by query.
+
+    :param found: Result ids per query from the approximate search.
+    :param truth: Result ids per query from the exact search.
+    :return: Mean ``|found ∩ truth| / |truth|``, or ``None`` if every truth set is empty.
+    """
+    scores = [len(f & t) / len(t) for f, t in zip(found, truth) if t]
+    return round(statistics.fmean(scores), 4) if scores else None
+
+
+def _rate(count: int, seconds: float) -> float | None:
+    """Return ``count / seconds`` rounded, or ``None`` for a zero duration."""
+    return round(count / seconds, 1) if seconds else None
+
+
+def _git_commit() -> str | None:
+    """Return the short commit hash of the working directory, if any."""
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            timeout=5,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+# ---------------------------------------------------------------------------
+# Benchmark driver
+# ---------------------------------------------------------------------------
+
+
+def run_benchmark(
+    functions: int,
+    workdir: str | Path,
+    *,
+    jobs: int = 1,
+    dim: int = 64,
+    queries: int = 20,
+    k: int = 8,
+    hop: int = 1,
+    seed: int = 0,
+    trace_memory: bool = True,
+    ann: str | None = None,
+    nprobes: int | None = None,
+    refine_factor: int | None = None,
+) -> dict:
+    """
+    Generate a synthetic repo of *functions* definitions and time every stage.
+
+    :param functions: Function and method definitions to generate.
+    :param workdir: Scratch directory for the repo, SQLite and LanceDB files.
+    :param jobs: Extraction worker processes (``0`` = one per CPU).
+    :param dim: :class:`HashEmbedder` dimension.
+    :param queries: Calls per latency stage (expand, hydrate, callers,
+        search, pack).  ``callers`` looks up one of the highest fan-in
+        nodes per call, ``callers_many`` all of them in one batch.
+    :param k: Seeds per expand call and top-K per search/pack.
+    :param hop: Expansion hops for expand and pack; the ``expand`` stage
+        also reports the mean number of nodes ``reached``.
+    :param seed: Random seed for the repo and the query mix.
+    :param trace_memory: Record per-stage peak memory with :mod:`tracemalloc`
+        (adds overhead to the timings).
+    :param ann: Also train this ANN index type after the flat ``search``
+        stage and time it (``ann_index``), then time ANN search and report
+        its ``recall_at_k`` against the exact results (``ann_search``).
+        ``pack`` then runs on the ANN index.
+    :param nprobes: IVF partitions probed per ANN search.
+    :param refine_factor: ANN re-ranking factor.
+    :return: Dict with ``repo`` (generator counts) and ``stages`` (per-stage
+             results keyed by stage name).
+    """
+    workdir = Path(workdir)
+    repo = workdir / "repo"
+    db_path = workdir / "graph.sqlite"
+    lancedb_dir = workdir / "lancedb"
+    rng = random.Random(seed)
+    embedder = HashEmbedder(dim)
+    query_text = [" ".join(rng.sample(_VOCAB, 4)) for _ in range(queries)]
+
+    repo_info = synth_repo(repo, functions, seed=seed)
+    import lancedb  # noqa: F401 — keep the one-off import out of the index stage
+
+    stages: dict = {}
+    own_trace = trace_memory and not tracemalloc.is_tracing()
+    if own_trace:
+        tracemalloc.start()
+    try:
+        with _stage(stages, "extract", trace=trace_memory) as rec:
+            nodes, edges = extract_repo(repo, jobs=jobs)
+        rec.update(
+            files=repo_info["files"],
+            nodes=len(nodes),
+            edges=len(edges),
+            functions_per_second=_rate(functions, rec["seconds"]),
+        )
+
+        store = GraphStore(db_path)
+        with _stage(stages, "write", trace=trace_memory) as rec:
+            store.write(nodes, edges, wipe=True)
+            resolved = store.resolve_symbols()
+        rec.update(
+            resolved=resolved,
+            nodes_per_second=_rate(len(nodes), rec["seconds"]),
+        )
+        del nodes, edges
+
+        fn_ids = [n["id"] for n in store.query_nodes(kinds=["function", "method"])]
+        seed_sets = [set(rng.sample(fn_ids, min(k, len(fn_ids)))) for _ in range(queries)]
+        expanded: list[list[str]] = [[] for _ in range(queries)]
+
+        def expand(i: int) -> None:
+            expanded[i] = list(store.expand(seed_sets[i], hop=hop))
+
+        with _stage(stages, "expand", trace=trace_memory) as rec:
+            rec.update(hop=hop, **_latency(expand, queries))
+        rec["reached"] = round(statistics.fmean(len(ids) for ids in expanded), 1)
+
+        with _stage(stages, "hydrate", trace=trace_memory) as rec:
+            rec.update(**_latency(lambda i: store.nodes(expanded[i]), queries))
+
+        targets = [n["id"] for n in store.top_nodes("fan_in", limit=_CALLER_TARGETS)]
+        with _stage(stages, "callers", trace=trace_memory) as rec:
+            rec.update(**_latency(lambda i: store.callers_of(targets[i % len(targets)]), queries))
+        with _stage(stages, "callers_many", trace=trace_memory) as rec:
+            rec.update(
+                targets=len(targets), **_latency(lambda i: store.callers_of_many(targets), queries)
+            )
+
+        index = SemanticIndex(lancedb_dir, embedder=embedder, query_cache=LRUCache(0))
+        with _stage(stages, "index", trace=trace_memory) as rec:
+            idx_stats = index.build(store, wipe=True, vector_index=None)
+        rec.update(
+            rows=idx_stats["indexed_rows"],
+            rows_per_second=_rate(idx_stats["indexed_rows"], rec["seconds"]),
+        )
+
+        with _stage(stages, "search", trace=trace_memory) as rec:
+            rec.update(k=k, **_latency(lambda i: index.search(query_text[i], k=k), queries))
+
+        if ann:
+            with _stage(stages, "ann_index", trace=trace_memory) as rec:
+                index.create_vector_index(ann)
+            rec.update(index_type=ann, rows=idx_stats["indexed_rows"])
+
+            exact = [{h.id for h in index.search(q, k=k, exact=True)} for q in query_text]
+            found: list[set[str]] = [set() for _ in range(queries)]
+
+            def ann_search(i: int) -> None:
+                hits = index.search(
+                    query_text[i], k=k, nprobes=nprobes, refine_factor=refine_factor
+                )
+                found[i] = {h.id for h in hits}
+
+            with _stage(stages, "ann_search", trace=trace_memory) as rec:
+                rec.update(
+                    k=k,
+                    nprobes=nprobes,
+                    refine_factor=refine_factor,
+                    **_latency(ann_search, queries),
+                )
+            rec["recall_at_k"] = _recall(found, exact)
+        store.close()
+
+        kg = CodeKG(
+            repo,
+            db_path=db_path,
+            lancedb_dir=lancedb_dir,
+            nprobes=nprobes,
+            refine_factor=refine_factor,
+        )
+        kg._embedder = embedder
+        kg.query_cache.maxsize = 0
+        kg.result_cache.maxsize = 0
+        with _stage(stages, "pack", trace=trace_memory) as rec:
+            rec.update(
+                k=k, hop=hop, **_latency(lambda i: kg.pack(query_text[i], k=k, hop=hop), queries)
+            )
+        kg.close()
+    finally:
+        if own_trace:
+            tracemalloc.stop()
+
+    return {"repo": repo_info, "stages": stages}
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Parse arguments, run the suite for each requested size, and emit JSON."""
+    p = argparse.ArgumentParser(
+        description="Benchmark CodeKG build, index, query and pack on synthetic repositories."
+    )
+    p.add_argument(
+        "--functions",
+        type=int,
+        nargs="+",
+        default=[1000],
+        help="Synthetic repo size(s) in function definitions (default: 1000)",
+    )
+    p.add_argument("--jobs", type=int, default=1, help="Extraction worker processes (default: 1)")
+    p.add_argument("--dim", type=int, default=64, help="Fake embedding dimension (default: 64)")
+    p.add_argument("--queries", type=int, default=20, help="Calls per latency stage (default: 20)")
+    p.add_argument("--k", type=int, default=8, help="Seeds / top-K per call (default: 8)")
+    p.add_argument("--hop", type=int, default=1, help="Expansion hops (default: 1)")
+    p.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    p.add_argument(
+        "--ann",
+        choices=VECTOR_INDEX_TYPES,
+        default=None,
+        help="Also benchmark this ANN index type and report recall@k against exact search",
+    )
+    p.add_argument("--nprobes", type=int, default=None, help="IVF partitions probed per ANN search")
+    p.add_argument(
+        "--refine-factor", type=int, default=None, help="Re-rank k * N ANN candidates exactly"
+    )
+    p.add_argument(
+        "--no-tracemalloc",
+        action="store_true",
+        help="Skip per-stage peak memory tracking for lower timing overhead",
+    )
+    p.add_argument("--workdir", default=None, help="Keep generated files here (default: temp dir)")
+    p.add_argument("--output", default=None, help="Also write the JSON report to this file")
+    args = p.parse_args(argv)
+
+    runs: list[dict] = []
+    report = {
+        "version": __version__,
+        "commit": _git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "jobs": args.jobs,
+            "dim": args.dim,
+            "queries": args.queries,
+            "k": args.k,
+            "hop": args.hop,
+            "seed": args.seed,
+            "tracemalloc": not args.no_tracemalloc,
+            "ann": args.ann,
+            "nprobes": args.nprobes,
+            "refine_factor": args.refine_factor,
+        },
+        "runs": runs,
+    }
+
+    for size in args.functions:
+        with tempfile.TemporaryDirectory() as tmp:
+            workdir = Path(args.workdir) / str(size) if args.workdir else Path(tmp)
+            runs.append(
+                run_benchmark(
+                    size,
+                    workdir,
+                    jobs=args.jobs,
+                    dim=args.dim,
+                    queries=args.queries,
+                    k=args.k,
+                    hop=args.hop,
+                    seed=args.seed,
+                    trace_memory=not args.no_tracemalloc,
+                    ann=args.ann,
+                    nprobes=args.nprobes,
+                    refine_factor=args.refine_factor,
+                )
+            )
+
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
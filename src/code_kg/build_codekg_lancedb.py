@@ -15,7 +15,13 @@ import argparse
 from pathlib import Path
 
 from code_kg.codekg import DEFAULT_MODEL
-from code_kg.index import SemanticIndex, SentenceTransformerEmbedder
+from code_kg.index import (
+    ANN_MIN_ROWS,
+    VECTOR_BACKENDS,
+    VECTOR_INDEX_TYPES,
+    SemanticIndex,
+    SentenceTransformerEmbedder,
+)
 from code_kg.store import GraphStore
 
 
@@ -57,7 +63,45 @@ def main() -> None:
         default="module,class,function,method",
         help="Comma-separated node kinds to index",
     )
+    p.add_argument(
+        "--vector-backend",
+        choices=VECTOR_BACKENDS,
+        default="lancedb",
+        help="Vector storage: a LanceDB table, or a memory-mapped NumPy matrix "
+        "(<lancedb>/<table>.vectors.bin) searched in-process (default: lancedb)",
+    )
     p.add_argument("--batch", type=int, default=256, help="Embedding batch size")
+    p.add_argument(
+        "--pipeline-depth",
+        type=int,
+        default=2,
+        help="Batches embedded ahead of the LanceDB writer (0 = embed and write serially)",
+    )
+    p.add_argument(
+        "--write-batch", type=int, default=4096, help="Rows per LanceDB commit (default: 4096)"
+    )
+    p.add_argument(
+        "--vector-index",
+        choices=[*VECTOR_INDEX_TYPES, "none"],
+        default="none",
+        help="ANN index trained once the table is large enough (default: none, flat scans)",
+    )
+    p.add_argument(
+        "--vector-index-min-rows",
+        type=int,
+        default=ANN_MIN_ROWS,
+        help=f"Rows needed before the ANN index is created (default: {ANN_MIN_ROWS})",
+    )
+    p.add_argument(
+        "--no-optimize",
+        action="store_true",
+        help="Skip compacting fragments and pruning old table versions after the build",
+    )
+    p.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Embed only nodes whose index text or model changed; drop vanished nodes",
+    )
     args = p.parse_args()
 
     repo = Path(args.repo).resolve()
@@ -73,17 +117,33 @@ def main() -> None:
         embedder=embedder,
         table=args.table,
         index_kinds=kinds,
+        backend=args.vector_backend,
+    )
+    stats = idx.build(
+        store,
+        wipe=args.wipe,
+        batch_size=args.batch,
+        incremental=args.incremental,
+        pipeline_depth=args.pipeline_depth,
+        write_batch_size=args.write_batch,
+        optimize=not args.no_optimize,
+        vector_index=None if args.vector_index == "none" else args.vector_index,
+        vector_index_min_rows=args.vector_index_min_rows,
     )
-    stats = idx.build(store, wipe=args.wipe, batch_size=args.batch)
     store.close()
 
     print(
         "OK:",
         f"indexed_rows={stats['indexed_rows']}",
+        f"embedded={stats['embedded']}",
+        f"skipped={stats['skipped']}",
+        f"deleted={stats['deleted']}",
         f"dim={stats['dim']}",
         f"table={stats['table']}",
         f"lancedb_dir={stats['lancedb_dir']}",
         f"kinds={','.join(stats['kinds'])}",
+        f"rows_per_sec={stats['rows_per_sec']}",
+        f"vector_index={stats['vector_index']}",
     )
 
 
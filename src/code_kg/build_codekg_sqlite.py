@@ -4,7 +4,10 @@ build_codekg_sqlite.py
 
 CLI entry point: repo → AST → SQLite
 
-Uses the new CodeGraph + GraphStore classes.
+Uses the CodeKG orchestrator (CodeGraph + GraphStore).  With
+``--incremental`` only files whose content hash changed since the previous
+build are re-extracted; with ``--stream`` files are written to SQLite as
+they are extracted, keeping memory flat on large repositories.
 
 Author: Eric G. Suchanek, PhD
 """
@@ -14,8 +17,7 @@ from __future__ import annotations
 import argparse
 from pathlib import Path
 
-from code_kg.graph import CodeGraph
-from code_kg.store import GraphStore
+from code_kg.kg import CodeKG
 
 
 def main() -> None:
@@ -24,6 +26,8 @@ def main() -> None:
 
     Walks the repository at ``--repo``, builds a CodeGraph via AST analysis,
     then writes all nodes and edges to the SQLite database at ``--db``.
+    With ``--incremental`` only changed, added, and removed files are
+    re-processed against the manifest recorded by the previous build.
     """
     p = argparse.ArgumentParser(
         description="Extract a code knowledge graph from a Python repo and store it in SQLite."
@@ -35,19 +39,34 @@ def main() -> None:
         help="SQLite database path (default: .codekg/graph.sqlite)",
     )
     p.add_argument("--wipe", action="store_true", help="Delete existing graph first")
+    p.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Parallel extraction worker processes (default: 1; 0 = one per CPU)",
+    )
+    p.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Re-extract only files whose content changed since the last build",
+    )
+    p.add_argument(
+        "--stream",
+        action="store_true",
+        help="Write each file to SQLite as it is extracted (bounded memory on large repos)",
+    )
     args = p.parse_args()
 
-    repo_root = Path(args.repo).resolve()
-
-    graph = CodeGraph(repo_root)
-    nodes, edges = graph.extract().result()
-
-    store = GraphStore(Path(args.db))
-    store.write(nodes, edges, wipe=args.wipe)
-    resolved = store.resolve_symbols()
-    store.close()
+    kg = CodeKG(Path(args.repo).resolve(), db_path=Path(args.db))
+    stats = kg.build_graph(
+        wipe=args.wipe, jobs=args.jobs, incremental=args.incremental, stream=args.stream
+    )
+    kg.close()
 
-    print(f"OK: nodes={len(nodes)} edges={len(edges)} resolved={resolved} db={args.db}")
+    print(
+        f"OK: nodes={stats.total_nodes} edges={stats.total_edges} "
+        f"extracted={stats.changed_files} removed={stats.removed_files} db={args.db}"
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+cache.py
+
+LRUCache — bounded in-memory cache with an optional SQLite-backed disk tier.
+
+Used for query embeddings (SemanticIndex.search) and end-to-end query
+results (CodeKG.query / CodeKG.pack).  Values must be JSON-serialisable
+when a disk tier is configured; nothing is ever unpickled from disk.
+
+Author: Eric G. Suchanek, PhD
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+_DISK_SCHEMA_SQL = """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+
+CREATE TABLE IF NOT EXISTS cache (
+  namespace  TEXT NOT NULL,
+  key        TEXT NOT NULL,
+  value      TEXT NOT NULL,
+  PRIMARY KEY (namespace, key)
+);
+"""
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache keyed on strings.
+
+    With *path* set, every entry is also written to a SQLite file (one
+    table shared by all *namespace* values) so it survives restarts; memory
+    misses fall through to disk and are promoted back into memory.  The
+    disk tier keeps at most ``disk_maxsize`` rows per namespace, evicting
+    the least recently written.
+
+    Example::
+
+        cache = LRUCache(256, path=".codekg/cache.sqlite", namespace="qvec")
+        vec = cache.get(key)
+        if vec is None:
+            vec = embed(query)
+            cache.put(key, vec)
+
+    :param maxsize: Maximum number of in-memory entries (``0`` disables caching).
+    :param path: Optional SQLite file for the persistent tier.
+    :param namespace: Partition name within the disk tier.
+    :param disk_maxsize: Row bound for this namespace on disk
+                         (default ``10 * maxsize``).
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        *,
+        path: str | Path | None = None,
+        namespace: str = "default",
+        disk_maxsize: int | None = None,
+    ) -> None:
+        """Initialise an empty cache.
+
+        :param maxsize: Maximum number of in-memory entries.
+        :param path: Optional SQLite file for the persistent tier.
+        :param namespace: Partition name within the disk tier.
+        :param disk_maxsize: Row bound for this namespace on disk.
+        """
+        self.maxsize = maxsize
+        self.path = Path(path) if path is not None else None
+        self.namespace = namespace
+        self.disk_maxsize = disk_maxsize if disk_maxsize is not None else 10 * maxsize
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        self._data: OrderedDict[str, Any] = OrderedDict()
+        self._lock = threading.Lock()
+        self._con: sqlite3.Connection | None = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Any | None:
+        """Return the cached value for *key*, or ``None`` on a miss.
+
+        :param key: Cache key.
+        :return: Cached value or ``None``.
+        """
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            value = self._disk_get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._remember(key, value)
+            return value
+
+    def put(self, key: str, value: Any) -> None:
+        """Store *value* under *key*, evicting the least recently used entry.
+
+        :param key: Cache key.
+        :param value: Value to cache (JSON-serialisable if a disk tier is set).
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._remember(key, value)
+            self._disk_put(key, value)
+
+    def clear(self) -> None:
+        """Drop all in-memory entries and this namespace's disk rows."""
+        with self._lock:
+            self._data.clear()
+            if self.path is not None:
+                self._disk.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+                self._disk.commit()
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and current size.
+
+        :return: Dict with ``size``, ``maxsize``, ``hits``, ``misses``,
+                 ``disk_hits``, ``hit_rate`` and ``persistent``.
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "disk_hits": self.disk_hits,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "persistent": self.path is not None,
+        }
+
+    def close(self) -> None:
+        """Close the disk tier connection, if open."""
+        if self._con is not None:
+            self._con.close()
+            self._con = None
+
+    def __len__(self) -> int:
+        """Return the number of in-memory entries."""
+        return len(self._data)
+
+    def __repr__(self) -> str:
+        """Return a developer-readable representation of this cache.
+
+        :return: String with size, bound and disk path.
+        """
+        return (
+            f"LRUCache(size={len(self._data)}, maxsize={self.maxsize}, "
+            f"namespace={self.namespace!r}, path={self.path!r})"
+        )
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _remember(self, key: str, value: Any) -> None:
+        """Insert into the in-memory tier and enforce ``maxsize``."""
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    @property
+    def _disk(self) -> sqlite3.Connection:
+        """Lazy SQLite connection for the disk tier."""
+        if self._con is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)  # type: ignore[union-attr]
+            self._con = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._con.executescript(_DISK_SCHEMA_SQL)
+        return self._con
+
+    def _disk_get(self, key: str) -> Any | None:
+        """Look *key* up in the disk tier."""
+        if self.path is None:
+            return None
+        row = self._disk.execute(
+            "SELECT value FROM cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _disk_put(self, key: str, value: Any) -> None:
+        """Write *key* to the disk tier and trim it to ``disk_maxsize`` rows."""
+        if self.path is None:
+            return
+        con = self._disk
+        # REPLACE assigns a fresh rowid, so rowid order is write-recency order
+        con.execute(
+            "INSERT OR REPLACE INTO cache (namespace, key, value) VALUES (?, ?, ?)",
+            (self.namespace, key, json.dumps(value, separators=(",", ":"))),
+        )
+        con.execute(
+            """
+            DELETE FROM cache WHERE namespace = ? AND rowid NOT IN (
+                SELECT rowid FROM cache WHERE namespace = ?
+                ORDER BY rowid DESC LIMIT ?
+            )
+            """,
+            (self.namespace, self.namespace, self.disk_maxsize),
+        )
+        con.commit()
@@ -19,9 +19,14 @@ Author: Eric G. Suchanek, PhD
 from __future__ import annotations
 
 import ast
+import hashlib
 import os
-from collections.abc import Iterable
+import sys
+from collections import deque
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
+from itertools import islice
 from pathlib import Path
 
 # ============================================================================
@@ -37,7 +42,7 @@ DEFAULT_MODEL: str = os.environ.get("CODEKG_MODEL", "all-MiniLM-L6-v2")
 # ============================================================================
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Node:
     """
     Graph node.
@@ -61,8 +66,24 @@ class Node:
     end_lineno: int | None
     docstring: str | None
 
+    def __reduce__(self) -> tuple:
+        """Pickle as a plain constructor call (cheaper than slot state)."""
+        return (
+            _unpickle_node,
+            (
+                self.id,
+                self.kind,
+                self.name,
+                self.qualname,
+                self.module_path,
+                self.lineno,
+                self.end_lineno,
+                self.docstring,
+            ),
+        )
+
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Edge:
     """
     Graph edge.
@@ -78,6 +99,71 @@ class Edge:
     dst: str
     evidence: dict | None = None
 
+    def __reduce__(self) -> tuple:
+        """Pickle as a plain constructor call (cheaper than slot state)."""
+        return (_unpickle_edge, (self.src, self.rel, self.dst, self.evidence))
+
+
+class FrozenDict(dict):
+    """
+    Read-only ``dict`` for evidence shared by several :class:`Edge` objects.
+
+    Still a ``dict`` for ``isinstance`` checks, ``json`` and ``==``, but
+    every mutating method raises :class:`TypeError`, so changing one edge's
+    evidence cannot silently change its neighbours'.  Copy it with
+    ``dict(ev)`` to edit.
+    """
+
+    __slots__ = ()
+
+    def _readonly(self, *args: object, **kwargs: object) -> None:
+        raise TypeError("evidence is shared between edges and read-only; copy it with dict()")
+
+    __setitem__ = __delitem__ = __ior__ = _readonly  # type: ignore[assignment]
+    clear = pop = popitem = setdefault = update = _readonly  # type: ignore[assignment]
+
+    def __reduce__(self) -> tuple:
+        """Pickle as a constructor call (dict's default replays ``__setitem__``)."""
+        return (FrozenDict, (dict(self),))
+
+
+def _unpickle_node(
+    id: str,
+    kind: str,
+    name: str,
+    qualname: str | None,
+    module_path: str | None,
+    lineno: int | None,
+    end_lineno: int | None,
+    docstring: str | None,
+) -> Node:
+    """Rebuild a pickled :class:`Node`, interning its repeated strings."""
+    if module_path is not None:
+        module_path = sys.intern(module_path)
+    return Node(id, sys.intern(kind), name, qualname, module_path, lineno, end_lineno, docstring)
+
+
+def _unpickle_edge(src: str, rel: str, dst: str, evidence: dict | None) -> Edge:
+    """Rebuild a pickled :class:`Edge`, interning its relation name."""
+    return Edge(src, sys.intern(rel), dst, evidence)
+
+
+@dataclass(frozen=True, slots=True)
+class FileRecord:
+    """
+    Content fingerprint of one source file, used for incremental rebuilds.
+
+    :param path: Repo-relative module path (same form as ``Node.module_path``)
+    :param mtime_ns: Modification time in nanoseconds
+    :param size: File size in bytes
+    :param sha256: Hex digest of the file contents
+    """
+
+    path: str
+    mtime_ns: int
+    size: int
+    sha256: str
+
 
 # ============================================================================
 # Constants
@@ -105,6 +191,9 @@ SKIP_DIRS = {
     ".codekg",
 }
 
+# Upper bound on files per worker shard in parallel extraction.
+_MAX_SHARD = 32
+
 
 # ============================================================================
 # Utility helpers
@@ -134,6 +223,48 @@ def rel_module_path(path: Path, repo_root: Path) -> str:
     return str(path.relative_to(repo_root)).replace("\\", "/")
 
 
+def dotted_module_name(module_path: str) -> str:
+    """
+    Convert a repo-relative module path to its dotted import path.
+
+    ``pkg/sub/mod.py`` becomes ``pkg.sub.mod`` and a package's
+    ``pkg/__init__.py`` becomes ``pkg``.  Source-layout prefixes such as
+    ``src/`` are kept; symbol resolution matches on dotted suffixes.
+
+    :param module_path: Repo-relative module path
+    """
+    dotted = module_path.removesuffix(".py").replace("/", ".")
+    return dotted.removesuffix(".__init__") if dotted != "__init__" else dotted
+
+
+def scan_files(
+    repo_root: Path, previous: dict[str, FileRecord] | None = None
+) -> dict[str, FileRecord]:
+    """
+    Fingerprint every Python file under repo_root.
+
+    Files whose mtime and size match their *previous* record keep the
+    previous digest without being re-read, so a scan of an unchanged tree
+    costs one ``stat`` per file.
+
+    :param repo_root: Repository root
+    :param previous: Records from the last build, keyed by module path
+    :return: ``{module_path: FileRecord}`` in :func:`iter_python_files` order
+    """
+    previous = previous or {}
+    records: dict[str, FileRecord] = {}
+    for pyfile in iter_python_files(repo_root):
+        module = rel_module_path(pyfile, repo_root)
+        st = pyfile.stat()
+        prev = previous.get(module)
+        if prev is not None and prev.mtime_ns == st.st_mtime_ns and prev.size == st.st_size:
+            records[module] = prev
+            continue
+        digest = hashlib.sha256(pyfile.read_bytes()).hexdigest()
+        records[module] = FileRecord(module, st.st_mtime_ns, st.st_size, digest)
+    return records
+
+
 def node_id(kind: str, module: str, qualname: str | None) -> str:
     """
     Construct stable node id.
@@ -178,319 +309,386 @@ def expr_to_name(expr: ast.AST) -> str | None:
 # ============================================================================
 
 
-def extract_repo(repo_root: Path) -> tuple[list[Node], list[Edge]]:
+def extract_file(pyfile: Path, repo_root: Path) -> tuple[list[Node], list[Edge]]:
     """
-    Extract a code knowledge graph from a repository.
+    Extract the nodes and edges contributed by a single Python file.
 
-    This function is:
-    - pure
-    - deterministic
-    - side-effect free
+    Pass 1 reads definitions and imports from the module body; a single
+    :class:`~code_kg.visitor.CodeKGVisitor` traversal then supplies both the
+    call sites for the call graph (Pass 2) and the data-flow edges (Pass 3).
+    Only this file's own symbol table is used.  Files that cannot be decoded
+    or parsed contribute nothing.
 
-    :param repo_root: Path to repository root
-    :return: (nodes, edges)
+    :param pyfile: Absolute path to the Python file.
+    :param repo_root: Repository root (used for the module path).
+    :return: (nodes, edges) in first-seen order.
     """
     nodes: dict[str, Node] = {}
     edges: dict[tuple[str, str, str], Edge] = {}
 
-    # ------------------------------------------------------------------
-    # PASS 1: modules, classes, functions, methods
-    # ------------------------------------------------------------------
-
-    module_locals: dict[str, dict[str, str]] = {}
-    module_class_methods: dict[str, dict[str, str]] = {}
-
-    for pyfile in iter_python_files(repo_root):
-        module = rel_module_path(pyfile, repo_root)
+    # Interned so every node of every file in a run shares one string per module.
+    module = sys.intern(rel_module_path(pyfile, repo_root))
+
+    try:
+        src = pyfile.read_text(encoding="utf-8")
+        tree = ast.parse(src, filename=module)
+    except (SyntaxError, UnicodeDecodeError):
+        return [], []
+
+    # module node
+    mod_id = node_id("module", module, None)
+    nodes[mod_id] = Node(
+        id=mod_id,
+        kind="module",
+        name=Path(module).stem,
+        qualname=None,
+        module_path=module,
+        lineno=1,
+        end_lineno=src.count("\n") + 1,
+        docstring=ast.get_docstring(tree),
+    )
+
+    module_locals: dict[str, str] = {}
+    class_methods: dict[str, str] = {}
+
+    # traverse module body only (NOT ast.walk)
+    for stmt in tree.body:
+        # --------------------
+        # class definitions
+        # --------------------
+        if isinstance(stmt, ast.ClassDef):
+            cls_qn = stmt.name
+            cls_id = node_id("class", module, cls_qn)
+
+            nodes[cls_id] = Node(
+                id=cls_id,
+                kind="class",
+                name=stmt.name,
+                qualname=cls_qn,
+                module_path=module,
+                lineno=getattr(stmt, "lineno", None),
+                end_lineno=getattr(stmt, "end_lineno", None),
+                docstring=ast.get_docstring(stmt),
+            )
 
-        try:
-            src = pyfile.read_text(encoding="utf-8")
-            tree = ast.parse(src, filename=module)
-        except (SyntaxError, UnicodeDecodeError):
-            continue
+            edges[(mod_id, "CONTAINS", cls_id)] = Edge(
+                src=mod_id,
+                rel="CONTAINS",
+                dst=cls_id,
+            )
 
-        # module node
-        mod_id = node_id("module", module, None)
-        nodes[mod_id] = Node(
-            id=mod_id,
-            kind="module",
-            name=Path(module).stem,
-            qualname=None,
-            module_path=module,
-            lineno=1,
-            end_lineno=src.count("\n") + 1,
-            docstring=ast.get_docstring(tree),
-        )
+            module_locals[stmt.name] = cls_id
 
-        module_locals[module] = {}
-        module_class_methods[module] = {}
-
-        # traverse module body only (NOT ast.walk)
-        for stmt in tree.body:
-            # --------------------
-            # class definitions
-            # --------------------
-            if isinstance(stmt, ast.ClassDef):
-                cls_qn = stmt.name
-                cls_id = node_id("class", module, cls_qn)
-
-                nodes[cls_id] = Node(
-                    id=cls_id,
-                    kind="class",
-                    name=stmt.name,
-                    qualname=cls_qn,
-                    module_path=module,
-                    lineno=getattr(stmt, "lineno", None),
-                    end_lineno=getattr(stmt, "end_lineno", None),
-                    docstring=ast.get_docstring(stmt),
+            # inheritance
+            for base in stmt.bases:
+                bname = expr_to_name(base)
+                if not bname:
+                    continue
+                sym_id = f"sym:{bname}"
+                nodes.setdefault(
+                    sym_id,
+                    Node(
+                        sym_id,
+                        "symbol",
+                        bname.split(".")[-1],
+                        bname,
+                        None,
+                        None,
+                        None,
+                        None,
+                    ),
                 )
-
-                edges[(mod_id, "CONTAINS", cls_id)] = Edge(
-                    src=mod_id,
-                    rel="CONTAINS",
-                    dst=cls_id,
+                edges[(cls_id, "INHERITS", sym_id)] = Edge(
+                    src=cls_id,
+                    rel="INHERITS",
+                    dst=sym_id,
+                    evidence={"lineno": getattr(stmt, "lineno", None)},
                 )
 
-                module_locals[module][stmt.name] = cls_id
-
-                # inheritance
-                for base in stmt.bases:
-                    bname = expr_to_name(base)
-                    if not bname:
-                        continue
-                    sym_id = f"sym:{bname}"
-                    nodes.setdefault(
-                        sym_id,
-                        Node(
-                            sym_id,
-                            "symbol",
-                            bname.split(".")[-1],
-                            bname,
-                            None,
-                            None,
-                            None,
-                            None,
-                        ),
+            # methods
+            for cstmt in stmt.body:
+                if isinstance(cstmt, ast.FunctionDef | ast.AsyncFunctionDef):
+                    m_qn = f"{stmt.name}.{cstmt.name}"
+                    m_id = node_id("method", module, m_qn)
+
+                    nodes[m_id] = Node(
+                        id=m_id,
+                        kind="method",
+                        name=cstmt.name,
+                        qualname=m_qn,
+                        module_path=module,
+                        lineno=getattr(cstmt, "lineno", None),
+                        end_lineno=getattr(cstmt, "end_lineno", None),
+                        docstring=ast.get_docstring(cstmt),
                     )
-                    edges[(cls_id, "INHERITS", sym_id)] = Edge(
+
+                    edges[(cls_id, "CONTAINS", m_id)] = Edge(
                         src=cls_id,
-                        rel="INHERITS",
-                        dst=sym_id,
-                        evidence={"lineno": getattr(stmt, "lineno", None)},
+                        rel="CONTAINS",
+                        dst=m_id,
                     )
 
-                # methods
-                for cstmt in stmt.body:
-                    if isinstance(cstmt, ast.FunctionDef | ast.AsyncFunctionDef):
-                        m_qn = f"{stmt.name}.{cstmt.name}"
-                        m_id = node_id("method", module, m_qn)
-
-                        nodes[m_id] = Node(
-                            id=m_id,
-                            kind="method",
-                            name=cstmt.name,
-                            qualname=m_qn,
-                            module_path=module,
-                            lineno=getattr(cstmt, "lineno", None),
-                            end_lineno=getattr(cstmt, "end_lineno", None),
-                            docstring=ast.get_docstring(cstmt),
-                        )
-
-                        edges[(cls_id, "CONTAINS", m_id)] = Edge(
-                            src=cls_id,
-                            rel="CONTAINS",
-                            dst=m_id,
-                        )
-
-                        module_class_methods[module][cstmt.name] = m_id
-                        module_locals[module][m_qn] = m_id
-
-            # --------------------
-            # top-level functions
-            # --------------------
-            elif isinstance(stmt, ast.FunctionDef | ast.AsyncFunctionDef):
-                fn_qn = stmt.name
-                fn_id = node_id("function", module, fn_qn)
-
-                nodes[fn_id] = Node(
-                    id=fn_id,
-                    kind="function",
-                    name=stmt.name,
-                    qualname=fn_qn,
-                    module_path=module,
-                    lineno=getattr(stmt, "lineno", None),
-                    end_lineno=getattr(stmt, "end_lineno", None),
-                    docstring=ast.get_docstring(stmt),
-                )
-
-                edges[(mod_id, "CONTAINS", fn_id)] = Edge(
-                    src=mod_id,
-                    rel="CONTAINS",
-                    dst=fn_id,
-                )
-
-                module_locals[module][stmt.name] = fn_id
+                    class_methods[cstmt.name] = m_id
+                    module_locals[m_qn] = m_id
+
+        # --------------------
+        # top-level functions
+        # --------------------
+        elif isinstance(stmt, ast.FunctionDef | ast.AsyncFunctionDef):
+            fn_qn = stmt.name
+            fn_id = node_id("function", module, fn_qn)
+
+            nodes[fn_id] = Node(
+                id=fn_id,
+                kind="function",
+                name=stmt.name,
+                qualname=fn_qn,
+                module_path=module,
+                lineno=getattr(stmt, "lineno", None),
+                end_lineno=getattr(stmt, "end_lineno", None),
+                docstring=ast.get_docstring(stmt),
+            )
 
-            # --------------------
-            # imports
-            # --------------------
-            elif isinstance(stmt, ast.Import):
-                for alias in stmt.names:
-                    sym = alias.name
-                    sym_id = f"sym:{sym}"
-                    nodes.setdefault(
-                        sym_id,
-                        Node(
-                            sym_id,
-                            "symbol",
-                            sym.split(".")[-1],
-                            sym,
-                            None,
-                            None,
-                            None,
-                            None,
-                        ),
-                    )
-                    edges[(mod_id, "IMPORTS", sym_id)] = Edge(
-                        src=mod_id,
-                        rel="IMPORTS",
-                        dst=sym_id,
-                        evidence={"lineno": getattr(stmt, "lineno", None)},
-                    )
+            edges[(mod_id, "CONTAINS", fn_id)] = Edge(
+                src=mod_id,
+                rel="CONTAINS",
+                dst=fn_id,
+            )
 
-            elif isinstance(stmt, ast.ImportFrom):
-                mod = stmt.module or ""
-                for alias in stmt.names:
-                    full = f"{mod}.{alias.name}" if mod else alias.name
-                    sym_id = f"sym:{full}"
-                    nodes.setdefault(
-                        sym_id,
-                        Node(sym_id, "symbol", alias.name, full, None, None, None, None),
-                    )
-                    edges[(mod_id, "IMPORTS", sym_id)] = Edge(
-                        src=mod_id,
-                        rel="IMPORTS",
-                        dst=sym_id,
-                        evidence={"lineno": getattr(stmt, "lineno", None)},
-                    )
+            module_locals[stmt.name] = fn_id
 
-        # ------------------------------------------------------------------
-        # PASS 2: call graph (best-effort, honest)
-        # ------------------------------------------------------------------
-
-        parent: dict[ast.AST, ast.AST] = {}
-        for p in ast.walk(tree):
-            for c in ast.iter_child_nodes(p):
-                parent[c] = p
-
-        def enclosing_def(n: ast.AST) -> ast.FunctionDef | ast.AsyncFunctionDef | None:
-            """Find the nearest enclosing function or async function definition.
-
-            :param n: AST node whose enclosing function definition is sought.
-            :return: Nearest enclosing ``FunctionDef`` or ``AsyncFunctionDef``,
-                     or ``None`` if not inside any function.
-            """
-            cur = parent.get(n)
-            while cur:
-                if isinstance(cur, ast.FunctionDef | ast.AsyncFunctionDef):
-                    return cur
-                cur = parent.get(cur)
-            return None
-
-        def owner_id(fn: ast.FunctionDef | ast.AsyncFunctionDef) -> str | None:
-            """Compute the graph node ID for the owner of a function definition.
-
-            :param fn: Function or async function definition node.
-            :return: Graph node ID string if the function is tracked, otherwise ``None``.
-            """
-            p = parent.get(fn)
-            if isinstance(p, ast.ClassDef):
-                return module_locals[module].get(f"{p.name}.{fn.name}")
-            return module_locals[module].get(fn.name)
-
-        for n in ast.walk(tree):
-            if not isinstance(n, ast.Call):
-                continue
-
-            fn = enclosing_def(n)
-            if fn is None:
-                continue
-
-            src_id = owner_id(fn)
-            if not src_id:
-                continue
-
-            callee = expr_to_name(n.func)
-            if not callee:
-                continue
-
-            # resolution rules (LOCKED)
-            if callee in module_locals[module]:
-                dst_id = module_locals[module][callee]
-            elif callee.startswith("self."):
-                meth = callee.split(".", 1)[1]
-                dst_id = module_class_methods[module].get(meth) or f"sym:{callee}"
-            else:
-                dst_id = f"sym:{callee}"
-
-            if dst_id.startswith("sym:"):
+        # --------------------
+        # imports
+        # --------------------
+        elif isinstance(stmt, ast.Import):
+            for alias in stmt.names:
+                sym = alias.name
+                sym_id = f"sym:{sym}"
                 nodes.setdefault(
-                    dst_id,
+                    sym_id,
                     Node(
-                        dst_id,
+                        sym_id,
                         "symbol",
-                        dst_id.split(":")[-1].split(".")[-1],
-                        dst_id[4:],
+                        sym.split(".")[-1],
+                        sym,
                         None,
                         None,
                         None,
                         None,
                     ),
                 )
+                edges[(mod_id, "IMPORTS", sym_id)] = Edge(
+                    src=mod_id,
+                    rel="IMPORTS",
+                    dst=sym_id,
+                    evidence={"lineno": getattr(stmt, "lineno", None)},
+                )
 
-            edges[(src_id, "CALLS", dst_id)] = Edge(
-                src=src_id,
-                rel="CALLS",
-                dst=dst_id,
-                evidence={
-                    "lineno": getattr(n, "lineno", None),
-                    "expr": callee,
-                },
-            )
+        elif isinstance(stmt, ast.ImportFrom):
+            mod = stmt.module or ""
+            for alias in stmt.names:
+                full = f"{mod}.{alias.name}" if mod else alias.name
+                sym_id = f"sym:{full}"
+                nodes.setdefault(
+                    sym_id,
+                    Node(sym_id, "symbol", alias.name, full, None, None, None, None),
+                )
+                edges[(mod_id, "IMPORTS", sym_id)] = Edge(
+                    src=mod_id,
+                    rel="IMPORTS",
+                    dst=sym_id,
+                    evidence={"lineno": getattr(stmt, "lineno", None)},
+                )
 
-        # ------------------------------------------------------------------
-        # PASS 3: data-flow edges via CodeKGVisitor (READS, WRITES, ATTR_ACCESS)
-        # ------------------------------------------------------------------
+    # ------------------------------------------------------------------
+    # PASS 2+3: one CodeKGVisitor traversal yields the call sites for the
+    # call graph and the data-flow edges (READS, WRITES, ATTR_ACCESS)
+    # ------------------------------------------------------------------
 
-        # Local import breaks the codekg ↔ visitor circular dependency.
-        from code_kg.visitor import CodeKGVisitor  # noqa: PLC0415
+    # Local import breaks the codekg ↔ visitor circular dependency.
+    from code_kg.visitor import CodeKGVisitor  # noqa: PLC0415
 
-        vis = CodeKGVisitor(module_id=module, file_path=str(pyfile))
-        vis.visit(tree)
-        vis_nodes, vis_edges = vis.finalize()
+    vis = CodeKGVisitor(module_id=module, file_path=str(pyfile))
+    vis.visit(tree)
+
+    # Call graph (best-effort, honest).  Call sites are replayed in
+    # breadth-first order so that, for repeated (src, dst) pairs, the
+    # recorded evidence is the last call in ast.walk order.
+    vis.call_sites.sort(key=lambda site: (site[0], site[1]))
+    for _, _, n, def_name, def_class in vis.call_sites:
+        src_id = module_locals.get(f"{def_class}.{def_name}" if def_class else def_name)
+        if not src_id:
+            continue
 
-        # Merge new symbol/var nodes that Pass 1 didn't create.
-        for nid, props in vis_nodes.items():
+        callee = expr_to_name(n.func)
+        if not callee:
+            continue
+
+        # resolution rules (LOCKED)
+        if callee in module_locals:
+            dst_id = module_locals[callee]
+        elif callee.startswith("self."):
+            meth = callee.split(".", 1)[1]
+            dst_id = class_methods.get(meth) or sys.intern(f"sym:{callee}")
+        else:
+            dst_id = sys.intern(f"sym:{callee}")
+
+        if dst_id.startswith("sym:"):
             nodes.setdefault(
-                nid,
+                dst_id,
                 Node(
-                    id=nid,
-                    kind=props["kind"],
-                    name=props["qualname"].split(".")[-1],
-                    qualname=props["qualname"],
-                    module_path=module,
-                    lineno=None,
-                    end_lineno=None,
-                    docstring=None,
+                    dst_id,
+                    "symbol",
+                    dst_id.split(":")[-1].split(".")[-1],
+                    dst_id[4:],
+                    None,
+                    None,
+                    None,
+                    None,
                 ),
             )
 
-        # Merge data-flow edges; setdefault keeps Pass 1/2 edges authoritative
-        # for any CONTAINS/CALLS duplicates.
-        for src_id, tgt_id, rel, ev in vis_edges:
-            edges.setdefault(
-                (src_id, rel, tgt_id),
-                Edge(src=src_id, rel=rel, dst=tgt_id, evidence=ev),
-            )
+        edges[(src_id, "CALLS", dst_id)] = Edge(
+            src=src_id,
+            rel="CALLS",
+            dst=dst_id,
+            evidence={
+                "lineno": getattr(n, "lineno", None),
+                "expr": callee,
+            },
+        )
+
+    vis_nodes, vis_edges = vis.finalize()
+
+    # Merge new symbol/var nodes that Pass 1 didn't create.
+    for nid, props in vis_nodes.items():
+        nodes.setdefault(
+            nid,
+            Node(
+                id=nid,
+                kind=props["kind"],
+                name=props["qualname"].split(".")[-1],
+                qualname=props["qualname"],
+                module_path=module,
+                lineno=None,
+                end_lineno=None,
+                docstring=None,
+            ),
+        )
+
+    # Merge data-flow edges; setdefault keeps Pass 1/2 edges authoritative
+    # for any CONTAINS/CALLS duplicates.
+    for src_id, tgt_id, rel, ev in vis_edges:
+        edges.setdefault(
+            (src_id, rel, tgt_id),
+            Edge(src=src_id, rel=rel, dst=tgt_id, evidence=ev),
+        )
+
+    return list(nodes.values()), list(edges.values())
+
+
+def extract_repo(
+    repo_root: Path,
+    *,
+    jobs: int = 1,
+    files: Iterable[Path] | None = None,
+) -> tuple[list[Node], list[Edge]]:
+    """
+    Extract a code knowledge graph from a repository.
+
+    This function is:
+    - pure
+    - deterministic
+    - side-effect free
+
+    Files are extracted independently (see :func:`extract_file`) and merged
+    in :func:`iter_python_files` order, so the result is identical for any
+    value of *jobs*.
+
+    :param repo_root: Path to repository root
+    :param jobs: Number of worker processes.  ``1`` (default) extracts
+        serially in-process; ``0`` uses one worker per CPU.
+    :param files: Restrict extraction to these files (absolute paths under
+        repo_root).  Defaults to every file from :func:`iter_python_files`.
+    :return: (nodes, edges)
+    """
+    nodes: dict[str, Node] = {}
+    edges: dict[tuple[str, str, str], Edge] = {}
+
+    for file_nodes, file_edges in iter_extract(repo_root, jobs=jobs, files=files):
+        # Definition ids are module-scoped, so the only cross-file
+        # collisions are shared ``sym:`` stubs — first file wins.
+        for n in file_nodes:
+            nodes.setdefault(n.id, n)
+        for e in file_edges:
+            edges.setdefault((e.src, e.rel, e.dst), e)
 
     return list(nodes.values()), list(edges.values())
+
+
+def iter_extract(
+    repo_root: Path,
+    *,
+    jobs: int = 1,
+    files: Iterable[Path] | None = None,
+) -> Iterator[tuple[list[Node], list[Edge]]]:
+    """
+    Yield each file's ``(nodes, edges)`` without merging them.
+
+    Same files and order as :func:`extract_repo`, but nothing is kept once a
+    result has been consumed, so a consumer that persists as it goes (see
+    :meth:`~code_kg.store.GraphStore.write_stream`) runs in memory bounded
+    by the largest file rather than the repository.  Shared ``sym:`` stubs
+    are repeated by every file that references them.
+
+    :param repo_root: Path to repository root.
+    :param jobs: Number of worker processes (``0`` = one per CPU).
+    :param files: Restrict extraction to these files (absolute paths under
+        repo_root).  Defaults to every file from :func:`iter_python_files`.
+    :return: Iterator of per-file ``(nodes, edges)`` tuples.
+    """
+    paths = list(iter_python_files(repo_root) if files is None else files)
+    yield from _map_files(paths, repo_root, jobs)
+
+
+def _extract_files(files: list[Path], repo_root: Path) -> list[tuple[list[Node], list[Edge]]]:
+    """Extract a shard of files in a worker process.
+
+    :param files: Python files in this shard.
+    :param repo_root: Repository root.
+    :return: Per-file ``(nodes, edges)`` tuples in shard order.
+    """
+    return [extract_file(pyfile, repo_root) for pyfile in files]
+
+
+def _map_files(
+    files: list[Path], repo_root: Path, jobs: int
+) -> Iterator[tuple[list[Node], list[Edge]]]:
+    """Run :func:`extract_file` over *files*, yielding results in input order.
+
+    :param files: Python files to extract.
+    :param repo_root: Repository root.
+    :param jobs: Worker process count (``0`` = CPU count, ``1`` = serial).
+    :return: Iterator of per-file ``(nodes, edges)`` tuples.
+    """
+    workers = jobs if jobs > 0 else (os.cpu_count() or 1)
+    workers = min(workers, len(files))
+    if workers <= 1:
+        for pyfile in files:
+            yield extract_file(pyfile, repo_root)
+        return
+
+    # Several shards per worker keeps the pool balanced when file sizes vary;
+    # capping the shard size and the number of shards in flight keeps
+    # finished-but-unconsumed results bounded when the consumer is slower.
+    chunksize = max(1, min(len(files) // (workers * 4), _MAX_SHARD))
+    shards = (files[i : i + chunksize] for i in range(0, len(files), chunksize))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque(
+            pool.submit(_extract_files, shard, repo_root) for shard in islice(shards, workers * 2)
+        )
+        while pending:
+            done = pending.popleft().result()
+            for shard in islice(shards, 1):
+                pending.append(pool.submit(_extract_files, shard, repo_root))
+            yield from done
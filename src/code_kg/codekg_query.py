@@ -15,6 +15,7 @@ import argparse
 from pathlib import Path
 
 from code_kg.codekg import DEFAULT_MODEL
+from code_kg.index import VECTOR_BACKENDS
 from code_kg.kg import CodeKG
 from code_kg.store import DEFAULT_RELS
 
@@ -55,6 +56,24 @@ def main() -> None:
         help="Comma-separated edge types to expand",
     )
     p.add_argument("--include-symbols", action="store_true", help="Include symbol nodes in output")
+    p.add_argument(
+        "--nprobes",
+        type=int,
+        default=None,
+        help="IVF partitions probed when the index has an ANN index (default: LanceDB's)",
+    )
+    p.add_argument(
+        "--refine-factor",
+        type=int,
+        default=None,
+        help="Re-rank k * N ANN candidates by exact distance (default: off)",
+    )
+    p.add_argument(
+        "--vector-backend",
+        choices=VECTOR_BACKENDS,
+        default="lancedb",
+        help="Vector storage the index was built with (default: lancedb)",
+    )
     # repo_root is not needed for query-only; use db_path as a stand-in
     args = p.parse_args()
 
@@ -70,6 +89,9 @@ def main() -> None:
         lancedb_dir=Path(args.lancedb),
         model=args.model,
         table=args.table,
+        nprobes=args.nprobes,
+        refine_factor=args.refine_factor,
+        vector_backend=args.vector_backend,
     )
 
     result = kg.query(
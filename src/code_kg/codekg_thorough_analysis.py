@@ -30,6 +30,9 @@ from rich.table import Table
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Node kinds that count as definitions for fan-in and orphan analysis
+_DEF_KINDS = ("function", "method", "class")
+
 
 @dataclass
 class FunctionMetrics:
@@ -41,7 +44,7 @@ class FunctionMetrics:
     :param kind: Kind of node (function, method, class)
     :param fan_in: Count of callers (how many call this)
     :param fan_out: Count of callees (how many this calls)
-    :param lines: Approximate line count
+    :param lines: Line count (the store's ``lines`` metric, 0 when unknown)
     :param docstring: Docstring text if available
     :param risk_level: Risk assessment (low, medium, high, critical)
     """
@@ -188,71 +191,45 @@ class CodeKGAnalyzer:
     def _analyze_fan_in(self) -> None:
         """Phase 2: Find most-called functions (fan-in).
 
-        Queries for functions and methods, then uses callers() to get
-        exact caller counts. Identifies bottlenecks and core functionality.
+        Ranks every function, method and class in the graph by the store's
+        precomputed ``fan_in`` metric (distinct callers, resolved through
+        ``sym:`` stubs). Identifies bottlenecks and core functionality.
         """
         self.console.print("[dim]🔍 Analyzing fan-in (most called functions)...[/dim]")
 
         try:
-            # Query for all functions and methods
-            result = self.kg.query(
-                "function method core utility helper",
-                k=30,
-                hop=0,
-                rels=("CONTAINS",),
-            )
-
-            fan_in_data: list[tuple] = []
-
-            # For each function, get actual caller count
-            for node in result.nodes:
-                if node.get("kind") not in ["function", "method", "class"]:
-                    continue
-
-                node_id = node.get("id")
-                if not node_id:
-                    continue
-
-                try:
-                    caller_list = self.kg.callers(node_id, rel="CALLS")
-                    caller_count = len(caller_list)
-
-                    metrics = FunctionMetrics(
-                        node_id=node_id,
-                        name=node.get("name", "unknown"),
-                        module=node.get("module_path", "unknown"),
-                        kind=node.get("kind", "unknown"),
-                        fan_in=caller_count,
-                        fan_out=0,  # Will be filled in fan-out phase
-                        lines=max(
-                            0,
-                            node.get("end_lineno", 0) - node.get("lineno", 0),
-                        ),
-                        docstring=node.get("docstring"),
-                    )
-
-                    # Assign risk level based on caller count
-                    if caller_count > 1000:
-                        metrics.risk_level = "critical"
-                    elif caller_count > 500:
-                        metrics.risk_level = "high"
-                    elif caller_count > 100:
-                        metrics.risk_level = "medium"
-
-                    fan_in_data.append((node_id, metrics))
-
-                except Exception as e:
-                    logger.debug(f"Could not analyze node {node_id}: {e}")
+            store = self.kg.store
+            top = store.top_nodes("fan_in", limit=15, kinds=_DEF_KINDS)
+
+            for node in top:
+                node_id = node["id"]
+                caller_count = node["value"]
+
+                metrics = FunctionMetrics(
+                    node_id=node_id,
+                    name=node.get("name", "unknown"),
+                    module=node.get("module_path", "unknown"),
+                    kind=node.get("kind", "unknown"),
+                    fan_in=caller_count,
+                    fan_out=0,  # Will be filled in fan-out phase
+                    lines=store.metrics(node_id).get("lines", 0),
+                    docstring=node.get("docstring"),
+                )
 
-            # Sort by fan-in descending
-            fan_in_data.sort(key=lambda x: x[1].fan_in, reverse=True)
+                # Assign risk level based on caller count
+                if caller_count > 1000:
+                    metrics.risk_level = "critical"
+                elif caller_count > 500:
+                    metrics.risk_level = "high"
+                elif caller_count > 100:
+                    metrics.risk_level = "medium"
 
-            # Keep top 15
-            for node_id, metrics in fan_in_data[:15]:
                 self.function_metrics[node_id] = metrics
 
+            counts = self.stats.get("node_counts") or store.stats()["node_counts"]
+            analyzed = sum(counts.get(kind, 0) for kind in _DEF_KINDS)
             self.console.print(
-                f"[green]✓[/green] Analyzed {len(fan_in_data)} functions; "
+                f"[green]✓[/green] Analyzed {analyzed} functions; "
                 f"top {len(self.function_metrics)} by fan-in"
             )
 
@@ -263,9 +240,9 @@ class CodeKGAnalyzer:
     def _analyze_fan_out(self) -> None:
         """Phase 3: Find functions that call many others (fan-out).
 
-        Analyzes functions in the function_metrics already identified,
-        computing their actual fan-out by reverse-querying callee lists.
-        Also identifies additional high-fanout orchestrator functions.
+        Fills in the fan-out of the functions already identified from the
+        store's precomputed ``out:CALLS`` degree, then adds the functions
+        with the highest fan-out in the whole graph as orchestrators.
         """
         self.console.print("[dim]🔗 Analyzing fan-out (functions calling many others)...[/dim]")
 
@@ -273,20 +250,7 @@ class CodeKGAnalyzer:
             # For functions already identified, compute their fan-out
             for node_id, metrics in self.function_metrics.items():
                 try:
-                    # Get the node to see what it calls
-                    node = self.kg.node(node_id)
-                    if node is None:
-                        continue
-
-                    # Count CALLS edges outgoing from this node
-                    # This is a rough estimate via the store; exact count requires
-                    # querying the store directly
-                    fanout_count = 0
-                    # Try to get edges from the node
-                    if hasattr(self.kg, "_store"):
-                        edges = self.kg._store.edges_from(node_id, rel="CALLS", limit=100)
-                        fanout_count = len(edges) if edges else 0
-
+                    fanout_count = self.kg.store.metrics(node_id).get("out:CALLS", 0)
                     metrics.fan_out = fanout_count
 
                     # Flag high fan-out functions
@@ -298,32 +262,15 @@ class CodeKGAnalyzer:
                 except Exception as e:
                     logger.debug(f"Could not compute fan-out for {node_id}: {e}")
 
-            # Query for additional orchestrator functions
+            # Highest fan-out functions across the whole graph (index lookup)
             try:
-                result = self.kg.query(
-                    "coordinator orchestrator manager init constructor setup",
-                    k=20,
-                    hop=0,
-                    rels=("CONTAINS",),
-                )
-
-                for node in result.nodes:
-                    node_id = node.get("id")
-                    if not node_id or node_id in self.function_metrics:
-                        continue
-
-                    if node.get("kind") not in ["function", "method"]:
+                top = self.kg.store.top_nodes("out:CALLS", limit=20, kinds=("function", "method"))
+                for node in top:
+                    node_id = node["id"]
+                    if node_id in self.function_metrics:
                         continue
 
-                    # Estimate fan-out for new functions
-                    fanout_count = 0
-                    if hasattr(self.kg, "_store"):
-                        try:
-                            edges = self.kg._store.edges_from(node_id, rel="CALLS", limit=100)
-                            fanout_count = len(edges) if edges else 0
-                        except Exception:
-                            pass
-
+                    fanout_count = node["value"]
                     if fanout_count > 25:
                         metrics = FunctionMetrics(
                             node_id=node_id,
@@ -332,10 +279,7 @@ class CodeKGAnalyzer:
                             kind=node.get("kind", "unknown"),
                             fan_in=0,
                             fan_out=fanout_count,
-                            lines=max(
-                                0,
-                                node.get("end_lineno", 0) - node.get("lineno", 0),
-                            ),
+                            lines=self.kg.store.metrics(node_id).get("lines", 0),
                         )
 
                         if fanout_count > 150:
@@ -359,50 +303,25 @@ class CodeKGAnalyzer:
     def _analyze_dependencies(self) -> None:
         """Phase 4: Analyze module-level dependencies.
 
-        Detects orphaned functions (zero callers), import cycles,
-        and tight coupling patterns.
+        Detects orphaned functions: every function, method or class in the
+        graph with zero callers (dunder methods excepted).
         """
         self.console.print("[dim]🏗️  Analyzing dependencies...[/dim]")
 
         try:
-            # Query for potential orphaned code
-            result = self.kg.query(
-                "unused dead code deprecated helper utility internal",
-                k=15,
-                hop=0,
-                rels=("CONTAINS",),
-            )
-
-            for node in result.nodes:
-                if node.get("kind") not in ["function", "method", "class"]:
-                    continue
-
-                node_id = node.get("id")
-                if not node_id:
-                    continue
-
-                try:
-                    caller_list = self.kg.callers(node_id, rel="CALLS")
-
-                    # Functions with zero callers are orphaned
-                    if len(caller_list) == 0:
-                        metrics = FunctionMetrics(
-                            node_id=node_id,
-                            name=node.get("name", "unknown"),
-                            module=node.get("module_path", "unknown"),
-                            kind=node.get("kind", "unknown"),
-                            fan_in=0,
-                            fan_out=0,
-                            lines=max(
-                                0,
-                                node.get("end_lineno", 0) - node.get("lineno", 0),
-                            ),
-                        )
-                        metrics.risk_level = "high"
-                        self.orphaned_functions.append(metrics)
-
-                except Exception as e:
-                    logger.debug(f"Could not check callers for {node_id}: {e}")
+            store = self.kg.store
+            for node in store.orphans(kinds=_DEF_KINDS):
+                metrics = FunctionMetrics(
+                    node_id=node["id"],
+                    name=node.get("name", "unknown"),
+                    module=node.get("module_path", "unknown"),
+                    kind=node.get("kind", "unknown"),
+                    fan_in=0,
+                    fan_out=0,
+                    lines=store.metrics(node["id"]).get("lines", 0),
+                )
+                metrics.risk_level = "high"
+                self.orphaned_functions.append(metrics)
 
             self.console.print(
                 f"[green]✓[/green] Found {len(self.orphaned_functions)} orphaned functions"
@@ -457,68 +376,30 @@ class CodeKGAnalyzer:
     def _analyze_module_coupling(self) -> None:
         """Phase 6: Analyze module-level coupling and dependencies.
 
-        Uses IMPORTS edges to identify module interdependencies and
-        calculate cohesion metrics.
+        Uses IMPORTS edges (resolved through ``sym:`` stubs) to find every
+        module's importers and imports, and calculates cohesion metrics.
         """
         self.console.print("[dim]📦 Analyzing module coupling...[/dim]")
 
         try:
-            # Query for all modules
-            result = self.kg.query(
-                "module package namespace",
-                k=25,
-                hop=0,
-                rels=("CONTAINS",),
-            )
-
-            for node in result.nodes:
-                if node.get("kind") != "module":
-                    continue
-
-                module_path = node.get("module_path", "unknown")
-                node_id = node.get("id")
-
-                # Get incoming imports (modules that import this)
-                incoming = []
-                try:
-                    importer_list = self.kg.callers(node_id, rel="IMPORTS")
-                    incoming = [m.get("module_path", "unknown") for m in importer_list]
-                except Exception:
-                    pass
-
-                # Get outgoing imports via query
-                outgoing = []
-                try:
-                    import_result = self.kg.query(
-                        f"imports from {module_path}",
-                        k=10,
-                        hop=1,
-                        rels=("IMPORTS",),
-                    )
-                    outgoing = [
-                        n.get("module_path", "unknown")
-                        for n in import_result.nodes
-                        if n.get("module_path") != module_path
-                    ]
-                except Exception:
-                    pass
+            for module_path, info in self.kg.store.module_coupling().items():
+                incoming = info["imported_by"]
+                outgoing = info["imports"]
 
                 # Calculate cohesion (internal coupling strength)
                 cohesion = min(1.0, len(outgoing) / (len(incoming) + len(outgoing) + 1))
 
-                module_metric = ModuleMetrics(
+                self.module_metrics[module_path] = ModuleMetrics(
                     path=module_path,
-                    functions=0,
-                    classes=0,
-                    methods=0,
-                    incoming_deps=list(set(incoming)),
-                    outgoing_deps=list(set(outgoing)),
-                    total_fan_in=len(incoming),
+                    functions=info["functions"],
+                    classes=info["classes"],
+                    methods=info["methods"],
+                    incoming_deps=incoming,
+                    outgoing_deps=outgoing,
+                    total_fan_in=info["fan_in"],
                     cohesion_score=cohesion,
                 )
 
-                self.module_metrics[module_path] = module_metric
-
             self.console.print(f"[green]✓[/green] Analyzed {len(self.module_metrics)} modules")
 
         except Exception as e:
@@ -527,8 +408,8 @@ class CodeKGAnalyzer:
     def _analyze_critical_paths(self) -> None:
         """Phase 7: Identify critical call chains.
 
-        Finds the deepest call chains starting from high-fan-in functions
-        using the callers() function to trace backwards.
+        Finds the deepest call chains starting from high-fan-in functions,
+        tracing their callers backwards in one batched lookup.
         """
         self.console.print("[dim]🔗 Analyzing critical paths...[/dim]")
 
@@ -540,9 +421,10 @@ class CodeKGAnalyzer:
                 reverse=True,
             )[:5]
 
+            caller_map = self.kg.callers_many([f.node_id for f in top_functions], rel="CALLS")
             for func in top_functions:
                 try:
-                    callers = self.kg.callers(func.node_id, rel="CALLS")
+                    callers = caller_map[func.node_id]
 
                     if callers:
                         # Build a simple chain
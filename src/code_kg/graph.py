@@ -47,15 +47,17 @@ class CodeGraph:
     # Public API
     # ------------------------------------------------------------------
 
-    def extract(self, *, force: bool = False) -> CodeGraph:
+    def extract(self, *, force: bool = False, jobs: int = 1) -> CodeGraph:
         """
         Run AST extraction (cached after first call).
 
         :param force: Re-extract even if already cached.
+        :param jobs: Worker processes for extraction (``1`` = serial,
+            ``0`` = one per CPU).  The result does not depend on this value.
         :return: self (for chaining)
         """
         if self._nodes is None or force:
-            self._nodes, self._edges = extract_repo(self.repo_root)
+            self._nodes, self._edges = extract_repo(self.repo_root, jobs=jobs)
         return self
 
     @property
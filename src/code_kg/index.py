@@ -4,6 +4,9 @@ index.py
 
 SemanticIndex — LanceDB vector index for the Code Knowledge Graph.
 
+Vectors live in LanceDB by default; a :class:`~code_kg.vecstore.VectorBackend`
+such as the in-process NumPy store can be plugged in instead.
+
 Derived from SQLite; disposable and rebuildable at any time.
 SQLite (GraphStore) remains the authoritative source of truth.
 
@@ -12,13 +15,22 @@ Author: Eric G. Suchanek, PhD
 
 from __future__ import annotations
 
-from collections.abc import Sequence
+import hashlib
+import time
+from collections import deque
+from collections.abc import Generator, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from dataclasses import dataclass
+from datetime import timedelta
+from itertools import islice
 from pathlib import Path
 
 import numpy as np
 
+from code_kg.cache import LRUCache
 from code_kg.codekg import DEFAULT_MODEL
+from code_kg.vecstore import NumpyVectorStore, VectorBackend
 
 # ---------------------------------------------------------------------------
 # Embedder interface (pluggable)
@@ -30,6 +42,9 @@ class Embedder:
     Abstract embedding backend.
 
     Subclass and implement :meth:`embed_texts` to plug in any model.
+    Backends whose model already returns a NumPy matrix should also
+    override :meth:`embed_batch`, which :meth:`SemanticIndex.build` uses so
+    vectors reach the index without a round trip through Python floats.
 
     :param dim: Embedding dimension (must be set by subclass ``__init__``).
     """
@@ -45,6 +60,18 @@ class Embedder:
         """
         raise NotImplementedError
 
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        """
+        Embed a list of strings into one matrix.
+
+        Default implementation converts the output of :meth:`embed_texts`.
+
+        :param texts: Input strings.
+        :return: C-contiguous float32 array of shape ``(len(texts), dim)``.
+        """
+        vecs = self.embed_texts(texts)
+        return np.asarray(vecs, dtype=np.float32).reshape(len(texts), self.dim)
+
     def embed_query(self, query: str) -> list[float]:
         """
         Embed a single query string.
@@ -82,8 +109,20 @@ class SentenceTransformerEmbedder(Embedder):
         :param texts: Input strings to embed.
         :return: List of float32 vectors, one per input string.
         """
-        vecs = self.model.encode(texts, normalize_embeddings=True, show_progress_bar=False)
-        return [np.asarray(v, dtype="float32").tolist() for v in vecs]
+        return self.embed_batch(texts).tolist()
+
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        """Embed a list of strings into a float32 matrix.
+
+        :param texts: Input strings to embed.
+        :return: Float32 array of shape ``(len(texts), dim)``.
+        """
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        vecs = self.model.encode(
+            texts, normalize_embeddings=True, show_progress_bar=False, convert_to_numpy=True
+        )
+        return np.ascontiguousarray(vecs, dtype=np.float32)
 
     def embed_query(self, query: str) -> list[float]:
         """Embed a single query string into a float32 vector.
@@ -137,6 +176,30 @@ class SeedHit:
 _DEFAULT_TABLE = "codekg_nodes"
 _DEFAULT_KINDS = ("module", "class", "function", "method")
 
+# Rows per Arrow batch when copying a finished staging table into place.
+_PUBLISH_BATCH = 4096
+
+# Superseded table versions younger than this survive compaction, so a
+# reader still scanning one when a build finishes is not cut off.
+_KEEP_VERSIONS_FOR = timedelta(minutes=5)
+
+# Approximate-nearest-neighbour index types accepted by create_vector_index(),
+# mapped to their ``lancedb.index`` config class.
+_VECTOR_INDEX_CONFIGS = {
+    "IVF_PQ": "IvfPq",
+    "IVF_HNSW_SQ": "HnswSq",
+    "IVF_HNSW_PQ": "HnswPq",
+    "IVF_FLAT": "IvfFlat",
+}
+VECTOR_INDEX_TYPES = tuple(_VECTOR_INDEX_CONFIGS)
+
+# Row count from which build() adds an ANN index; below it a flat scan is
+# both exact and fast enough.
+ANN_MIN_ROWS = 100_000
+
+# Vector storage backends selectable by name (see SemanticIndex ``backend``).
+VECTOR_BACKENDS = ("lancedb", "numpy")
+
 
 class SemanticIndex:
     """
@@ -163,6 +226,21 @@ class SemanticIndex:
                      :data:`~code_kg.codekg.DEFAULT_MODEL`.
     :param table: LanceDB table name.  Defaults to ``"codekg_nodes"``.
     :param index_kinds: Node kinds to embed.
+    :param query_cache: Cache for query vectors, keyed on model name and
+                        whitespace-normalised query.  Defaults to an
+                        in-memory :class:`~code_kg.cache.LRUCache` of 256
+                        entries.
+    :param nprobes: Default IVF partitions probed per search once the table
+                    has an ANN index (``None`` = LanceDB's default).
+    :param refine_factor: Default re-ranking factor: fetch
+                          ``k * refine_factor`` ANN candidates and re-rank
+                          them by exact distance (``None`` = no re-ranking).
+    :param backend: Vector storage: ``"lancedb"`` (default), ``"numpy"`` for
+                    a :class:`~code_kg.vecstore.NumpyVectorStore` at
+                    ``<lancedb_dir>/<table>.vectors.bin``, or any
+                    :class:`~code_kg.vecstore.VectorBackend` instance.  Non-
+                    LanceDB backends always search exactly and ignore the
+                    ANN options.
     """
 
     def __init__(
@@ -172,6 +250,10 @@ class SemanticIndex:
         embedder: Embedder | None = None,
         table: str = _DEFAULT_TABLE,
         index_kinds: Sequence[str] = _DEFAULT_KINDS,
+        query_cache: LRUCache | None = None,
+        nprobes: int | None = None,
+        refine_factor: int | None = None,
+        backend: str | VectorBackend = "lancedb",
     ) -> None:
         """Initialise the semantic index.
 
@@ -179,12 +261,32 @@ class SemanticIndex:
         :param embedder: Embedding backend. Defaults to :class:`SentenceTransformerEmbedder`.
         :param table: LanceDB table name. Defaults to ``"codekg_nodes"``.
         :param index_kinds: Node kinds to include in the index.
+        :param query_cache: Query-vector cache. Defaults to a 256-entry in-memory LRU.
+        :param nprobes: Default IVF partitions probed per ANN search.
+        :param refine_factor: Default ANN re-ranking factor.
+        :param backend: ``"lancedb"``, ``"numpy"``, or a :class:`~code_kg.vecstore.VectorBackend`.
+        :raises ValueError: If *backend* is an unknown name.
         """
         self.lancedb_dir = Path(lancedb_dir)
         self.embedder: Embedder = embedder or SentenceTransformerEmbedder()
         self.table_name = table
         self.index_kinds = tuple(index_kinds)
+        self.query_cache = (
+            query_cache if query_cache is not None else LRUCache(256, namespace="query_vectors")
+        )
+        self.nprobes = nprobes
+        self.refine_factor = refine_factor
         self._tbl = None  # lazy LanceDB table handle
+        self._tbl_generation: tuple[int, ...] | None = None
+        self._backend: VectorBackend | None = None  # None = LanceDB
+        if isinstance(backend, VectorBackend):
+            self._backend = backend
+        elif backend == "numpy":
+            self._backend = NumpyVectorStore(self.lancedb_dir / f"{table}.vectors.bin")
+        elif backend != "lancedb":
+            raise ValueError(
+                f"Unknown vector backend {backend!r}; expected one of {VECTOR_BACKENDS}"
+            )
 
     # ------------------------------------------------------------------
     # Build
@@ -196,86 +298,326 @@ class SemanticIndex:
         *,
         wipe: bool = False,
         batch_size: int = 256,
+        incremental: bool = False,
+        pipeline_depth: int = 2,
+        write_batch_size: int = 4096,
+        optimize: bool = True,
+        vector_index: str | None = None,
+        vector_index_min_rows: int = ANN_MIN_ROWS,
     ) -> dict:
         """
         Build (or rebuild) the vector index from *store*.
 
+        Every row records a SHA-256 of its index text (``text_hash``) and the
+        embedding model name (``model``).  With ``incremental=True`` only
+        nodes whose hash or model differs from the stored row are embedded,
+        and rows whose node ids no longer exist in *store* are deleted.
+
+        Embedding and writing overlap: a background thread embeds up to
+        *pipeline_depth* batches ahead while this thread appends finished
+        rows to LanceDB in commits of about *write_batch_size* rows.  In an
+        existing table each commit is a ``merge_insert`` keyed on ``id``, so
+        a changed row is replaced atomically rather than deleted and re-added.
+        Any build that changed the table is then compacted (:meth:`optimize`),
+        which also folds new rows into an existing ANN index.  If
+        *vector_index* is given and the table holds *vector_index_min_rows*
+        rows, a build that lacks an ANN index, or that replaced the table,
+        trains one (:meth:`create_vector_index`).
+
+        With a pluggable backend the changed rows and deletions are handed
+        to :meth:`~code_kg.vecstore.VectorBackend.write` in one call, and
+        the LanceDB-only steps (write batching, compaction, ANN) are skipped.
+
         :param store: Authoritative :class:`~code_kg.store.GraphStore`.
         :param wipe: If ``True``, delete all existing vectors first.
         :param batch_size: Number of nodes to embed per batch.
-        :return: Stats dict with ``indexed_rows``, ``dim``, ``table``,
-                 ``lancedb_dir``, ``kinds``.
+        :param incremental: Embed only new or changed nodes and prune
+                            vanished ones.
+        :param pipeline_depth: Embedded batches allowed in flight ahead of
+                               the writer (``0`` embeds inline, serially).
+        :param write_batch_size: Rows buffered per LanceDB commit.
+        :param optimize: Run :meth:`optimize` after the build.
+        :param vector_index: ANN index type from :data:`VECTOR_INDEX_TYPES`
+                             to train, or ``None`` (default) to keep
+                             searching by flat scan.
+        :param vector_index_min_rows: Table size from which *vector_index*
+                                      is created.
+        :return: Stats dict with ``indexed_rows``, ``embedded``, ``skipped``,
+                 ``deleted``, ``dim``, ``table``, ``lancedb_dir``, ``kinds``,
+                 plus ``seconds`` (embed + write wall time), ``embed_seconds``
+                 (time spent inside the embedder), ``rows_per_sec`` and
+                 ``vector_index`` (the table's ANN index type, or ``None``).
         """
         nodes = self._read_nodes(store)
-        tbl = self._open_table(wipe=wipe)
-
-        indexed = 0
-        for i in range(0, len(nodes), batch_size):
-            chunk = nodes[i : i + batch_size]
-            texts = [_build_index_text(n) for n in chunk]
-            vecs = self.embedder.embed_texts(texts)
-
-            # upsert: delete existing IDs then add fresh rows
-            ids = [n["id"] for n in chunk]
-            if ids:
-                pred = " OR ".join([f"id = '{_escape(nid)}'" for nid in ids])
-                tbl.delete(pred)
-
-            rows = [
-                {
-                    "id": n["id"],
-                    "kind": n["kind"],
-                    "name": n["name"],
-                    "qualname": n["qualname"] or "",
-                    "module_path": n["module_path"] or "",
-                    "text": text,
-                    "vector": vec,
-                }
-                for n, text, vec in zip(chunk, texts, vecs)
+        if self._backend is not None:
+            return self._build_backend(
+                nodes,
+                wipe=wipe,
+                batch_size=batch_size,
+                incremental=incremental,
+                pipeline_depth=pipeline_depth,
+            )
+        tbl, staged = self._open_table(wipe=wipe)
+        model = _embedder_model(self.embedder)
+        texts = [_build_index_text(n) for n in nodes]
+        hashes = [_text_hash(t) for t in texts]
+
+        pending = list(range(len(nodes)))
+        deleted = 0
+        if incremental:
+            existing = self._existing_hashes(tbl)
+            pending = [
+                i
+                for i, (n, h) in enumerate(zip(nodes, hashes))
+                if existing.get(n["id"]) != (h, model)
             ]
-            tbl.add(rows)
-            indexed += len(rows)
-
+            stale = list(existing.keys() - {n["id"] for n in nodes})
+            if stale:
+                tbl.delete(_id_predicate(stale))  # one commit for the whole build
+            deleted = len(stale)
+
+        t0 = time.perf_counter()
+        chunks = [pending[i : i + batch_size] for i in range(0, len(pending), batch_size)]
+        buffered: list = []  # record batches not yet written
+        n_buffered = embedded = 0
+        embed_seconds = 0.0
+        # closing() stops the embedding thread promptly if a write fails
+        with closing(self._embed_chunks(chunks, texts, pipeline_depth)) as results:
+            for chunk, vecs, seconds in results:
+                embed_seconds += seconds
+                buffered.append(
+                    _index_batch(
+                        [nodes[j] for j in chunk],
+                        [texts[j] for j in chunk],
+                        [hashes[j] for j in chunk],
+                        model,
+                        vecs,
+                    )
+                )
+                n_buffered += len(chunk)
+                if n_buffered >= write_batch_size:
+                    self._write_batches(tbl, buffered, staged=staged)
+                    embedded += n_buffered
+                    buffered, n_buffered = [], 0
+        if buffered:
+            self._write_batches(tbl, buffered, staged=staged)
+            embedded += n_buffered
+        seconds = time.perf_counter() - t0
+
+        if staged:
+            tbl = self._publish(tbl)
         self._tbl = tbl
-        return {
-            "indexed_rows": indexed,
-            "dim": self.embedder.dim,
-            "table": self.table_name,
-            "lancedb_dir": str(self.lancedb_dir),
-            "kinds": list(self.index_kinds),
-        }
+        self._tbl_generation = self.generation()
+        changed = bool(staged or embedded or deleted)
+        if optimize and changed:
+            self.optimize()
+        if (
+            vector_index
+            and changed
+            and (staged or self.vector_index_type() is None)
+            and self._get_table().count_rows() >= vector_index_min_rows
+        ):
+            self.create_vector_index(vector_index)
+        self._tbl_generation = self.generation()
+        return self._build_stats(
+            len(nodes) if incremental else embedded,
+            embedded,
+            len(nodes) - len(pending),
+            deleted,
+            seconds,
+            embed_seconds,
+        )
+
+    def create_vector_index(self, index_type: str = "IVF_PQ") -> None:
+        """
+        Train an approximate-nearest-neighbour index on the ``vector`` column.
+
+        Replaces any existing vector index.  Searches then probe
+        :attr:`nprobes` IVF partitions instead of scanning every row; rows
+        added later are searched by flat scan until :meth:`optimize` folds
+        them into the index.
+
+        :param index_type: One of :data:`VECTOR_INDEX_TYPES`.
+        :raises ValueError: If *index_type* is not supported, or the index
+                            uses a non-LanceDB backend.
+        """
+        if self._backend is not None:
+            raise ValueError(f"{self._backend!r} does not support ANN indexes")
+        if index_type not in VECTOR_INDEX_TYPES:
+            raise ValueError(
+                f"Unknown vector index type {index_type!r}; expected one of {VECTOR_INDEX_TYPES}"
+            )
+        import lancedb.index
+
+        config = getattr(lancedb.index, _VECTOR_INDEX_CONFIGS[index_type])(distance_type="l2")
+        self._get_table().create_index("vector", config=config, replace=True)
+
+    def vector_index_type(self) -> str | None:
+        """Return the LanceDB type name of the ``vector`` column's index.
+
+        :return: For example ``"IvfPq"``, or ``None`` without an ANN index
+                 (always ``None`` for a non-LanceDB backend).
+        """
+        if self._backend is not None:
+            return None
+        for cfg in self._get_table().list_indices():
+            if list(cfg.columns) == ["vector"]:
+                return cfg.index_type
+        return None
 
     # ------------------------------------------------------------------
     # Search
     # ------------------------------------------------------------------
 
-    def search(self, query: str, k: int = 8) -> list[SeedHit]:
+    def search(
+        self,
+        query: str,
+        k: int = 8,
+        *,
+        nprobes: int | None = None,
+        refine_factor: int | None = None,
+        exact: bool = False,
+    ) -> list[SeedHit]:
         """
         Semantic vector search.
 
+        Uses the table's ANN index when it has one; the tuning knobs have no
+        effect on a flat scan.
+
         :param query: Natural-language query string.
         :param k: Number of results to return.
+        :param nprobes: IVF partitions to probe (default :attr:`nprobes`).
+                        More partitions raise recall and latency.
+        :param refine_factor: Re-rank ``k * refine_factor`` ANN candidates
+                              by exact distance (default :attr:`refine_factor`).
+        :param exact: Bypass the ANN index and scan every row.
         :return: List of :class:`SeedHit` ordered by ascending distance.
         """
+        if self._backend is not None:
+            return _seed_hits(self._backend.search(np.array([self.embed_query(query)]), k)[0])
         tbl = self._get_table()
-        qvec = self.embedder.embed_query(query)
-        raw = tbl.search(qvec).limit(k).to_list()
-
-        hits: list[SeedHit] = []
-        for rank, row in enumerate(raw):
-            dist = _extract_distance(row, rank)
-            hits.append(
-                SeedHit(
-                    id=row["id"],
-                    kind=row.get("kind", ""),
-                    name=row.get("name", ""),
-                    qualname=row.get("qualname", ""),
-                    module_path=row.get("module_path", ""),
-                    distance=dist,
-                    rank=rank,
-                )
-            )
-        return hits
+        qvec = self.embed_query(query)
+        q = tbl.search(qvec).limit(k)
+        nprobes = nprobes if nprobes is not None else self.nprobes
+        refine_factor = refine_factor if refine_factor is not None else self.refine_factor
+        if exact:
+            q = q.bypass_vector_index()
+        else:
+            if nprobes is not None:
+                q = q.nprobes(nprobes)
+            if refine_factor is not None:
+                q = q.refine_factor(refine_factor)
+        return _seed_hits(q.to_list())
+
+    def search_many(
+        self,
+        queries: Sequence[str],
+        k: int = 8,
+        *,
+        nprobes: int | None = None,
+        refine_factor: int | None = None,
+        exact: bool = False,
+    ) -> list[list[SeedHit]]:
+        """
+        Run :meth:`search` for several queries.
+
+        A pluggable backend scores all query vectors in one batched call;
+        LanceDB runs one search per query.
+
+        :param queries: Natural-language query strings.
+        :param k: Number of results per query.
+        :param nprobes: See :meth:`search`.
+        :param refine_factor: See :meth:`search`.
+        :param exact: See :meth:`search`.
+        :return: One :class:`SeedHit` list per query, in input order.
+        """
+        if self._backend is not None:
+            if not queries:
+                return []
+            qvecs = np.array([self.embed_query(q) for q in queries], dtype=np.float32)
+            return [_seed_hits(rows) for rows in self._backend.search(qvecs, k)]
+        return [
+            self.search(q, k, nprobes=nprobes, refine_factor=refine_factor, exact=exact)
+            for q in queries
+        ]
+
+    def embed_query(self, query: str) -> list[float]:
+        """
+        Embed *query*, consulting :attr:`query_cache` first.
+
+        The cache key is the embedder's model name plus the query with
+        surrounding whitespace stripped and internal runs collapsed, and the
+        normalised string is what gets embedded, so equivalent spellings
+        share one vector.
+
+        :param query: Natural-language query string.
+        :return: Float32 query vector as a list.
+        """
+        text = _normalize_query(query)
+        key = f"{_embedder_model(self.embedder)}\x1f{text}"
+        vec = self.query_cache.get(key)
+        if vec is None:
+            vec = [float(x) for x in self.embedder.embed_query(text)]
+            self.query_cache.put(key, vec)
+        return vec
+
+    def optimize(self, *, keep_versions_for: timedelta = _KEEP_VERSIONS_FOR) -> None:
+        """Compact the table's fragments and prune superseded versions.
+
+        Merges the small data files left by incremental upserts, folds in
+        deletion files, and removes manifests, transaction files and data
+        that only versions older than *keep_versions_for* still reference.
+        The latest version is always kept.  :meth:`build` calls this after
+        every build that changed the table.  A no-op for non-LanceDB backends.
+
+        :param keep_versions_for: Minimum age of a superseded version before
+                                  its files are removed.  A reader scanning
+                                  an older version than that may fail.
+        """
+        if self._backend is not None:
+            return
+        self._get_table().optimize(cleanup_older_than=keep_versions_for)
+
+    def generation(self) -> tuple[int, ...]:
+        """Return a signature that changes whenever the table is rewritten.
+
+        Every LanceDB commit adds a manifest under ``<table>.lance/_versions``,
+        so the directory's ``mtime_ns`` moves on each add, delete or
+        drop/recreate, including writes from other processes.  Pluggable
+        backends report their own signature.
+
+        :return: Tuple of integers; compare for equality only.
+        """
+        if self._backend is not None:
+            return self._backend.generation()
+        return self.stored_generation(self.lancedb_dir, table=self.table_name)
+
+    @staticmethod
+    def stored_generation(
+        lancedb_dir: str | Path,
+        *,
+        table: str = _DEFAULT_TABLE,
+        backend: str | VectorBackend = "lancedb",
+    ) -> tuple[int, ...]:
+        """Return :meth:`generation` for an index on disk without opening it.
+
+        Only stats files, so no embedder is loaded; used to key caches in
+        front of the index.
+
+        :param lancedb_dir: Directory of the index.
+        :param table: Table name.
+        :param backend: As for :class:`SemanticIndex`.
+        :return: Tuple of integers; compare for equality only.
+        """
+        if isinstance(backend, VectorBackend):
+            return backend.generation()
+        if backend == "numpy":
+            return NumpyVectorStore(Path(lancedb_dir) / f"{table}.vectors.bin").generation()
+        try:
+            st = (Path(lancedb_dir) / f"{table}.lance" / "_versions").stat()
+        except FileNotFoundError:
+            return (0,)
+        return (st.st_mtime_ns,)
 
     # ------------------------------------------------------------------
     # Internal helpers
@@ -289,57 +631,265 @@ class SemanticIndex:
         """
         return store.query_nodes(kinds=list(self.index_kinds))
 
+    def _build_backend(
+        self,
+        nodes: list[dict],
+        *,
+        wipe: bool,
+        batch_size: int,
+        incremental: bool,
+        pipeline_depth: int,
+    ) -> dict:
+        """:meth:`build` for a pluggable :class:`~code_kg.vecstore.VectorBackend`.
+
+        Embeds the pending rows, then applies them and any stale-row
+        deletions with a single :meth:`~code_kg.vecstore.VectorBackend.write`.
+
+        :param nodes: Indexable nodes from :meth:`_read_nodes`.
+        :param wipe: Replace every stored row.
+        :param batch_size: Number of nodes to embed per batch.
+        :param incremental: Embed only new or changed nodes and prune vanished ones.
+        :param pipeline_depth: Batches embedded ahead (see :meth:`_embed_chunks`).
+        :return: Stats dict as for :meth:`build`.
+        """
+        backend = self._backend
+        assert backend is not None
+        model = _embedder_model(self.embedder)
+        texts = [_build_index_text(n) for n in nodes]
+        hashes = [_text_hash(t) for t in texts]
+
+        pending = list(range(len(nodes)))
+        stale: list[str] = []
+        if incremental and not wipe:
+            existing = backend.existing_hashes()
+            pending = [
+                i
+                for i, (n, h) in enumerate(zip(nodes, hashes))
+                if existing.get(n["id"]) != (h, model)
+            ]
+            stale = list(existing.keys() - {n["id"] for n in nodes})
+
+        t0 = time.perf_counter()
+        chunks = [pending[i : i + batch_size] for i in range(0, len(pending), batch_size)]
+        parts: list[np.ndarray] = []
+        embed_seconds = 0.0
+        with closing(self._embed_chunks(chunks, texts, pipeline_depth)) as results:
+            for _chunk, vecs, seconds in results:
+                embed_seconds += seconds
+                parts.append(vecs)
+        embedded = len(pending)
+        if wipe or embedded or stale or backend.generation() == (0,):
+            sel = [nodes[i] for i in pending]
+            rows = {
+                "id": [n["id"] for n in sel],
+                "kind": [n["kind"] for n in sel],
+                "name": [n["name"] for n in sel],
+                "qualname": [n["qualname"] or "" for n in sel],
+                "module_path": [n["module_path"] or "" for n in sel],
+                "text_hash": [hashes[i] for i in pending],
+                "model": [model] * embedded,
+            }
+            vecs = np.concatenate(parts) if parts else np.zeros((0, self.embedder.dim), np.float32)
+            backend.write(rows, vecs, wipe=wipe, delete=stale)
+        seconds = time.perf_counter() - t0
+
+        return self._build_stats(
+            len(nodes) if incremental else embedded,
+            embedded,
+            len(nodes) - len(pending),
+            len(stale),
+            seconds,
+            embed_seconds,
+        )
+
+    def _build_stats(
+        self,
+        indexed_rows: int,
+        embedded: int,
+        skipped: int,
+        deleted: int,
+        seconds: float,
+        embed_seconds: float,
+    ) -> dict:
+        """Assemble the stats dict returned by :meth:`build`.
+
+        :param indexed_rows: Rows covered by the index after the build.
+        :param embedded: Rows embedded and written.
+        :param skipped: Unchanged rows not re-embedded.
+        :param deleted: Stale rows removed.
+        :param seconds: Embed + write wall time.
+        :param embed_seconds: Time spent inside the embedder.
+        :return: Stats dict (see :meth:`build`).
+        """
+        return {
+            "indexed_rows": indexed_rows,
+            "embedded": embedded,
+            "skipped": skipped,
+            "deleted": deleted,
+            "dim": self.embedder.dim,
+            "table": self.table_name,
+            "lancedb_dir": str(self.lancedb_dir),
+            "kinds": list(self.index_kinds),
+            "seconds": round(seconds, 3),
+            "embed_seconds": round(embed_seconds, 3),
+            "rows_per_sec": round(embedded / seconds, 1) if embedded and seconds else 0.0,
+            "vector_index": self.vector_index_type(),
+        }
+
+    def _embed_chunks(
+        self,
+        chunks: list[list[int]],
+        texts: list[str],
+        depth: int,
+    ) -> Generator[tuple[list[int], np.ndarray, float], None, None]:
+        """Embed *chunks* in order, running up to *depth* batches ahead.
+
+        :param chunks: Row indices into *texts*, one list per embedding batch.
+        :param texts: Index text per row.
+        :param depth: Batches embedded ahead of the consumer (``0`` = inline).
+        :return: Generator of ``(chunk, vectors, embed_seconds)`` in input order.
+        """
+
+        def embed(chunk: list[int]) -> tuple[np.ndarray, float]:
+            t0 = time.perf_counter()
+            vecs = self.embedder.embed_batch([texts[j] for j in chunk])
+            return vecs, time.perf_counter() - t0
+
+        if depth <= 0:
+            for chunk in chunks:
+                yield (chunk, *embed(chunk))
+            return
+
+        # A single worker keeps batches in order; the bounded window of
+        # futures is the queue between the embedder and the writer.
+        todo = iter(chunks)
+        pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="codekg-embed")
+        try:
+            pending = deque((c, pool.submit(embed, c)) for c in islice(todo, depth))
+            while pending:
+                chunk, fut = pending.popleft()
+                for c in islice(todo, 1):
+                    pending.append((c, pool.submit(embed, c)))
+                yield (chunk, *fut.result())
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    def _write_batches(self, tbl, batches: list, *, staged: bool) -> None:
+        """Upsert buffered record batches into *tbl* in one commit.
+
+        A staging table starts empty, so its rows are simply appended;
+        otherwise rows are merged on ``id``, replacing any existing row.
+
+        :param tbl: LanceDB table handle.
+        :param batches: ``pyarrow.RecordBatch`` objects from :func:`_index_batch`.
+        :param staged: Whether *tbl* is a fresh staging table.
+        """
+        import pyarrow as pa
+
+        rows = pa.Table.from_batches(batches)
+        if staged:
+            tbl.add(rows)
+            return
+        (
+            tbl.merge_insert("id")
+            .when_matched_update_all()
+            .when_not_matched_insert_all()
+            .execute(rows)
+        )
+
+    def _existing_hashes(self, tbl) -> dict[str, tuple[str, str]]:
+        """Read the ``(text_hash, model)`` pair of every row in *tbl*.
+
+        :param tbl: LanceDB table handle.
+        :return: Mapping of node id to ``(text_hash, model)``.
+        """
+        n = tbl.count_rows()
+        if n == 0:
+            return {}
+        cols = tbl.search().select(["id", "text_hash", "model"]).limit(n).to_arrow().to_pydict()
+        return {nid: (h, m) for nid, h, m in zip(cols["id"], cols["text_hash"], cols["model"])}
+
     def _open_table(self, *, wipe: bool = False):
-        """Open the LanceDB table, creating it with the correct schema if absent.
+        """Open the table that :meth:`build` should write into.
 
-        :param wipe: If ``True``, delete all existing rows after opening.
-        :return: LanceDB table handle.
+        An existing, current table is returned as is and updated in place.
+        For a wipe, a missing table, or a table written before
+        ``text_hash``/``model`` were recorded, a fresh staging table is
+        created instead; readers keep seeing the old table until
+        :meth:`_publish` swaps the finished rows in.
+
+        :param wipe: If ``True``, rebuild from scratch via a staging table.
+        :return: ``(table, staged)`` where *staged* tells whether the table
+                 still has to be published.
         """
         import lancedb
 
         self.lancedb_dir.mkdir(parents=True, exist_ok=True)
         db = lancedb.connect(str(self.lancedb_dir))  # type: ignore[attr-defined]
+        tables = db.list_tables().tables
+
+        if self.table_name in tables and not wipe:
+            tbl = db.open_table(self.table_name)
+            if "text_hash" in tbl.schema.names:
+                return tbl, False
+
+        staging = f"{self.table_name}__staging"
+        if staging in tables:
+            db.drop_table(staging)  # left behind by an interrupted build
+
+        tbl = db.create_table(staging, schema=_index_schema(self.embedder.dim))
+        return tbl, True
+
+    def _publish(self, staging):
+        """Replace the live table's contents with *staging* in one commit.
 
+        The rows are streamed into a single ``overwrite`` write, which LanceDB
+        commits as one new table version, so a reader sees either the old
+        index or the complete new one.  The staging table is then dropped.
+
+        :param staging: Finished staging table from :meth:`_open_table`.
+        :return: Handle to the live table.
+        """
+        import lancedb
+
+        db = lancedb.connect(str(self.lancedb_dir))  # type: ignore[attr-defined]
+        n = staging.count_rows()
+        rows = staging.search().limit(n).to_batches(_PUBLISH_BATCH) if n else staging.to_arrow()
         if self.table_name in db.list_tables().tables:
-            if wipe:
-                db.drop_table(self.table_name)
-            else:
-                return db.open_table(self.table_name)
-
-        # Create with a dummy row to establish schema, then remove it
-        dummy = {
-            "id": "__dummy__",
-            "kind": "dummy",
-            "name": "__dummy__",
-            "qualname": "",
-            "module_path": "",
-            "text": "__dummy__",
-            "vector": np.zeros((self.embedder.dim,), dtype="float32").tolist(),
-        }
-        tbl = db.create_table(self.table_name, data=[dummy])
-        tbl.delete("id = '__dummy__'")
+            tbl = db.open_table(self.table_name)
+            tbl.add(rows, mode="overwrite")
+        else:
+            tbl = db.create_table(self.table_name, data=rows)
+        db.drop_table(staging.name)
         return tbl
 
     def _get_table(self):
         """Return the cached LanceDB table handle, opening it if not yet loaded.
 
+        The handle is reopened when :meth:`generation` moves, so a rebuild
+        by another process is picked up on the next search.
+
         :return: LanceDB table handle.
         """
-        if self._tbl is None:
+        gen = self.generation()
+        if self._tbl is None or gen != self._tbl_generation:
             import lancedb
 
             db = lancedb.connect(str(self.lancedb_dir))  # type: ignore[attr-defined]
             self._tbl = db.open_table(self.table_name)
+            self._tbl_generation = gen
         return self._tbl
 
     def __repr__(self) -> str:
         """Return a developer-readable representation of this SemanticIndex.
 
-        :return: String including lancedb_dir, table name, and embedder details.
+        :return: String including lancedb_dir, table name, embedder and
+                 (when not LanceDB) backend details.
         """
+        backend = f", backend={self._backend!r}" if self._backend is not None else ""
         return (
             f"SemanticIndex(lancedb_dir={self.lancedb_dir!r}, "
-            f"table={self.table_name!r}, embedder={self.embedder!r})"
+            f"table={self.table_name!r}, embedder={self.embedder!r}{backend})"
         )
 
 
@@ -347,6 +897,63 @@ class SemanticIndex:
 # Internal utilities
 # ---------------------------------------------------------------------------
 
+# String columns of the index table, in schema order; ``vector`` follows.
+_INDEX_COLUMNS = ("id", "kind", "name", "qualname", "module_path", "text", "text_hash", "model")
+
+
+def _index_schema(dim: int):
+    """Return the Arrow schema of the index table.
+
+    :param dim: Embedding dimension.
+    :return: ``pyarrow.Schema`` with the string columns of
+             :data:`_INDEX_COLUMNS` and a ``fixed_size_list<float32>[dim]``
+             ``vector`` column.
+    """
+    import pyarrow as pa
+
+    fields = [pa.field(c, pa.string()) for c in _INDEX_COLUMNS]
+    return pa.schema([*fields, pa.field("vector", pa.list_(pa.float32(), dim))])
+
+
+def _index_batch(
+    nodes: list[dict],
+    texts: list[str],
+    hashes: list[str],
+    model: str,
+    vecs: np.ndarray,
+):
+    """Assemble one Arrow record batch of index rows.
+
+    The ``vector`` column wraps the flattened embedding matrix directly, so
+    the floats are never boxed into Python objects.
+
+    :param nodes: Node dicts, one per row.
+    :param texts: Index text per row (:func:`_build_index_text`).
+    :param hashes: :func:`_text_hash` of each text.
+    :param model: Embedding model identifier shared by all rows.
+    :param vecs: ``(len(nodes), dim)`` embedding matrix.
+    :return: ``pyarrow.RecordBatch`` matching :func:`_index_schema`.
+    """
+    import pyarrow as pa
+
+    vecs = np.ascontiguousarray(vecs, dtype=np.float32)
+    n, dim = vecs.shape
+    vector = pa.FixedSizeListArray.from_arrays(pa.array(vecs.reshape(-1)), dim)
+    columns = [
+        [nd["id"] for nd in nodes],
+        [nd["kind"] for nd in nodes],
+        [nd["name"] for nd in nodes],
+        [nd["qualname"] or "" for nd in nodes],
+        [nd["module_path"] or "" for nd in nodes],
+        texts,
+        hashes,
+        [model] * n,
+    ]
+    return pa.RecordBatch.from_arrays(
+        [*(pa.array(c, type=pa.string()) for c in columns), vector],
+        schema=_index_schema(dim),
+    )
+
 
 def _build_index_text(n: dict) -> str:
     """Build the canonical text document used for embedding a node.
@@ -369,6 +976,68 @@ def _build_index_text(n: dict) -> str:
     return "\n".join(parts)
 
 
+def _normalize_query(query: str) -> str:
+    """Canonicalise a query for embedding and cache lookup.
+
+    Strips the ends and collapses internal whitespace; case is preserved
+    because not every embedding model is case-insensitive.
+
+    :param query: Raw query string.
+    :return: Normalised query string.
+    """
+    return " ".join(query.split())
+
+
+def _text_hash(text: str) -> str:
+    """Return the SHA-256 hex digest of an index text document.
+
+    :param text: Output of :func:`_build_index_text`.
+    :return: 64-character hex digest.
+    """
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _embedder_model(embedder: Embedder) -> str:
+    """Return a stable identifier for the model behind *embedder*.
+
+    Uses ``embedder.model_name`` when present, else the class name, so
+    switching models forces re-embedding in incremental builds.
+
+    :param embedder: Embedding backend.
+    :return: Model identifier string.
+    """
+    return getattr(embedder, "model_name", None) or type(embedder).__name__
+
+
+def _id_predicate(ids: Sequence[str]) -> str:
+    """Build a LanceDB filter matching any of *ids*.
+
+    :param ids: Node IDs.
+    :return: SQL-style ``id IN (...)`` predicate.
+    """
+    return "id IN (" + ", ".join(f"'{_escape(nid)}'" for nid in ids) + ")"
+
+
+def _seed_hits(rows: list[dict]) -> list[SeedHit]:
+    """Convert raw result rows, nearest first, into ranked :class:`SeedHit` objects.
+
+    :param rows: Result dicts from LanceDB or a :class:`~code_kg.vecstore.VectorBackend`.
+    :return: One :class:`SeedHit` per row.
+    """
+    return [
+        SeedHit(
+            id=row["id"],
+            kind=row.get("kind", ""),
+            name=row.get("name", ""),
+            qualname=row.get("qualname", ""),
+            module_path=row.get("module_path", ""),
+            distance=_extract_distance(row, rank),
+            rank=rank,
+        )
+        for rank, row in enumerate(rows)
+    ]
+
+
 def _extract_distance(row: dict, fallback_rank: int) -> float:
     """Extract a distance value from a LanceDB result row.
 
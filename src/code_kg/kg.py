@@ -15,14 +15,18 @@ Author: Eric G. Suchanek, PhD
 
 from __future__ import annotations
 
+import copy
 import json
+from collections.abc import Iterable, Iterator
+from contextlib import nullcontext
 from dataclasses import dataclass
 from pathlib import Path
 
-from code_kg.codekg import DEFAULT_MODEL
+from code_kg.cache import LRUCache
+from code_kg.codekg import DEFAULT_MODEL, Edge, FileRecord, Node, iter_extract, scan_files
 from code_kg.graph import CodeGraph
 from code_kg.index import Embedder, SemanticIndex, SentenceTransformerEmbedder
-from code_kg.store import DEFAULT_RELS, GraphStore, ProvMeta
+from code_kg.store import DEFAULT_RELS, GraphStore, ProvMeta, resolution_names
 
 # ---------------------------------------------------------------------------
 # Constants
@@ -49,6 +53,12 @@ class BuildStats:
     :param indexed_rows: Number of nodes embedded into LanceDB
                          (``None`` if the index was not built).
     :param index_dim: Embedding dimension (``None`` if not built).
+    :param changed_files: Files (re-)extracted by the graph build
+                          (``None`` if the graph was not built).
+    :param removed_files: Files whose nodes were dropped by an incremental
+                          build (``None`` if the graph was not built).
+    :param embedded_rows: Vectors actually (re-)embedded by the index build
+                          (``None`` if not built).
     """
 
     repo_root: str
@@ -59,6 +69,9 @@ class BuildStats:
     edge_counts: dict[str, int]
     indexed_rows: int | None = None
     index_dim: int | None = None
+    changed_files: int | None = None
+    removed_files: int | None = None
+    embedded_rows: int | None = None
 
     def to_dict(self) -> dict:
         """
@@ -75,6 +88,9 @@ class BuildStats:
             "edge_counts": self.edge_counts,
             "indexed_rows": self.indexed_rows,
             "index_dim": self.index_dim,
+            "changed_files": self.changed_files,
+            "removed_files": self.removed_files,
+            "embedded_rows": self.embedded_rows,
         }
 
     def __str__(self) -> str:
@@ -90,8 +106,14 @@ class BuildStats:
             f"nodes       : {self.total_nodes}  {self.node_counts}",
             f"edges       : {self.total_edges}  {self.edge_counts}",
         ]
+        if self.changed_files is not None:
+            lines.append(
+                f"files       : {self.changed_files} extracted  {self.removed_files} removed"
+            )
         if self.indexed_rows is not None:
             lines.append(f"indexed     : {self.indexed_rows} vectors  dim={self.index_dim}")
+        if self.embedded_rows is not None and self.embedded_rows != self.indexed_rows:
+            lines.append(f"embedded    : {self.embedded_rows} vectors (rest unchanged)")
         return "\n".join(lines)
 
 
@@ -336,6 +358,8 @@ class CodeKG:
     :param lancedb_dir: LanceDB directory.
     :param model: Sentence-transformer model name.
     :param table: LanceDB table name.
+    :param snapshot: Serve graph traversal from an in-memory snapshot.
+    :param persist_cache: Persist cached query vectors and results under ``.codekg/``.
     """
 
     def __init__(
@@ -346,6 +370,11 @@ class CodeKG:
         *,
         model: str = DEFAULT_MODEL,
         table: str = "codekg_nodes",
+        snapshot: bool = False,
+        persist_cache: bool = False,
+        nprobes: int | None = None,
+        refine_factor: int | None = None,
+        vector_backend: str = "lancedb",
     ) -> None:
         """
         Initialise ``CodeKG`` and resolve all paths.
@@ -357,6 +386,19 @@ class CodeKG:
             ``<repo_root>/.codekg/lancedb``.
         :param model: Sentence-transformer model name used for embedding.
         :param table: LanceDB table name for the node index.
+        :param snapshot: Serve graph traversal from an in-memory
+            :class:`~code_kg.snapshot.GraphSnapshot` (reloaded when the
+            database changes) instead of querying SQLite per call.
+        :param persist_cache: Also keep cached query vectors and
+            query/pack results on disk in ``cache.sqlite`` next to the graph
+            database, so they survive restarts.
+        :param nprobes: IVF partitions probed per semantic search once the
+            index has an ANN index (see :meth:`SemanticIndex.search`).
+        :param refine_factor: Re-rank ``k * refine_factor`` ANN candidates by
+            exact distance.
+        :param vector_backend: Vector storage for the semantic index:
+            ``"lancedb"`` or ``"numpy"`` (an in-process, memory-mapped
+            :class:`~code_kg.vecstore.NumpyVectorStore` in *lancedb_dir*).
         """
         self.repo_root = Path(repo_root).resolve()
         self.db_path = (
@@ -367,6 +409,13 @@ class CodeKG:
         )
         self.model_name = model
         self.table_name = table
+        self.snapshot = snapshot
+        self.nprobes = nprobes
+        self.refine_factor = refine_factor
+        self.vector_backend = vector_backend
+        cache_path = self.db_path.parent / "cache.sqlite" if persist_cache else None
+        self.query_cache = LRUCache(256, path=cache_path, namespace="query_vectors")
+        self.result_cache = LRUCache(128, path=cache_path, namespace="results")
 
         # Lazy-initialised layers
         self._graph: CodeGraph | None = None
@@ -389,7 +438,7 @@ class CodeKG:
     def store(self) -> GraphStore:
         """SQLite persistence layer (lazy)."""
         if self._store is None:
-            self._store = GraphStore(self.db_path)
+            self._store = GraphStore(self.db_path, snapshot=self.snapshot)
         return self._store
 
     @property
@@ -401,12 +450,16 @@ class CodeKG:
 
     @property
     def index(self) -> SemanticIndex:
-        """LanceDB semantic index (lazy)."""
+        """Semantic vector index (lazy)."""
         if self._index is None:
             self._index = SemanticIndex(
                 self.lancedb_dir,
                 embedder=self.embedder,
                 table=self.table_name,
+                query_cache=self.query_cache,
+                nprobes=self.nprobes,
+                refine_factor=self.refine_factor,
+                backend=self.vector_backend,
             )
         return self._index
 
@@ -414,29 +467,131 @@ class CodeKG:
     # Build
     # ------------------------------------------------------------------
 
-    def build(self, *, wipe: bool = False) -> BuildStats:
+    def build(
+        self,
+        *,
+        wipe: bool = False,
+        jobs: int = 1,
+        incremental: bool = False,
+        stream: bool = False,
+    ) -> BuildStats:
         """
         Full pipeline: AST extraction → SQLite → LanceDB.
 
         :param wipe: Clear existing data before writing.
+        :param jobs: Extraction worker processes (``0`` = one per CPU).
+        :param incremental: Re-extract only changed files and re-embed only
+            nodes whose index text changed.
+        :param stream: Write extracted files to SQLite as they are produced
+            (see :meth:`build_graph`).
         :return: :class:`BuildStats`.
         """
-        graph_stats = self.build_graph(wipe=wipe)
-        index_stats = self.build_index(wipe=wipe)
+        graph_stats = self.build_graph(wipe=wipe, jobs=jobs, incremental=incremental, stream=stream)
+        index_stats = self.build_index(wipe=wipe, incremental=incremental)
         graph_stats.indexed_rows = index_stats.indexed_rows
         graph_stats.index_dim = index_stats.index_dim
+        graph_stats.embedded_rows = index_stats.embedded_rows
         return graph_stats
 
-    def build_graph(self, *, wipe: bool = False) -> BuildStats:
+    def build_graph(
+        self,
+        *,
+        wipe: bool = False,
+        jobs: int = 1,
+        incremental: bool = False,
+        stream: bool = False,
+    ) -> BuildStats:
         """
         AST extraction → SQLite only.
 
-        :param wipe: Clear existing graph before writing.
+        With ``incremental=True`` only files whose content hash differs from
+        the manifest recorded by the previous build are re-extracted; nodes
+        and edges owned by changed or removed modules are deleted first, and
+        symbol resolution is re-run only for the affected names.  Falls back
+        to a full wiped build when no manifest exists yet.
+
+        :param wipe: Clear existing graph before writing (ignored when
+            *incremental* is set and a manifest exists).
+        :param jobs: Extraction worker processes (``0`` = one per CPU).
+        :param incremental: Rebuild only what changed since the last build.
+        :param stream: Persist each file's nodes and edges as soon as it is
+            extracted (:meth:`GraphStore.write_stream`) instead of collecting
+            the whole repository in :attr:`graph` first, so peak memory does
+            not grow with repository size.  The stored graph is identical.
+            Incremental updates always stream.
+        :return: :class:`BuildStats` (``indexed_rows`` will be ``None``).
+        """
+        previous = self.store.manifest()
+        if incremental and previous:
+            return self._update_graph(previous, jobs=jobs)
+
+        records = scan_files(self.repo_root)
+        # An empty database is bulk-loaded in place; only replacing a
+        # populated graph needs a staging file.
+        staged = (wipe or incremental) and not self.store.is_empty()
+        with self.store.rebuild() if staged else nullcontext(self.store) as store:
+            if stream:
+                self._graph = None  # never populated on this path
+                store.write_stream(iter_extract(self.repo_root, jobs=jobs))
+            else:
+                nodes, edges = self.graph.extract(force=staged, jobs=jobs).result()
+                store.write(nodes, edges)
+            store.resolve_symbols()
+            store.write_manifest(records.values(), removed=previous.keys() - records.keys())
+        if not staged:  # rebuild() refreshes the staging copy itself
+            self.store.refresh_metrics()
+        return self._graph_stats(changed_files=len(records), removed_files=0)
+
+    def _update_graph(self, previous: dict[str, FileRecord], *, jobs: int) -> BuildStats:
+        """Apply an incremental rebuild against the *previous* file manifest.
+
+        :param previous: Manifest recorded by the last build.
+        :param jobs: Extraction worker processes.
+        :return: :class:`BuildStats` with changed/removed file counts.
+        """
+        current = scan_files(self.repo_root, previous)
+        changed = [
+            path
+            for path, rec in current.items()
+            if path not in previous or previous[path].sha256 != rec.sha256
+        ]
+        removed = sorted(previous.keys() - current.keys())
+
+        if not changed and not removed:
+            self.store.write_manifest(current.values())  # refresh moved mtimes only
+            return self._graph_stats(changed_files=0, removed_files=0)
+
+        # Stubs whose resolution the dropped or re-added definitions can change
+        names: set[str] = set()
+
+        def batches() -> Iterator[tuple[list[Node], list[Edge]]]:
+            files = [self.repo_root / p for p in changed]
+            for file_nodes, file_edges in iter_extract(self.repo_root, jobs=jobs, files=files):
+                for n in file_nodes:
+                    names.update(resolution_names(n.kind, n.name, n.module_path))
+                yield file_nodes, file_edges
+
+        # One write transaction, so readers never see the graph between
+        # delete and re-add.
+        with self.store.transaction() as store:
+            for path in changed + removed:
+                for n in store.query_nodes(module=path):
+                    names.update(resolution_names(n["kind"], n["name"], n["module_path"]))
+            store.delete_modules(changed + removed)
+            store.write_stream(batches())
+            store.resolve_symbols(names=names)
+            store.write_manifest(current.values(), removed=removed)
+            store.refresh_metrics()
+        self._graph = None  # cached full extraction is stale now
+        return self._graph_stats(changed_files=len(changed), removed_files=len(removed))
+
+    def _graph_stats(self, *, changed_files: int, removed_files: int) -> BuildStats:
+        """Build a :class:`BuildStats` from the current store contents.
+
+        :param changed_files: Files (re-)extracted by this build.
+        :param removed_files: Files whose graph was dropped by this build.
         :return: :class:`BuildStats` (``indexed_rows`` will be ``None``).
         """
-        nodes, edges = self.graph.extract(force=wipe).result()
-        self.store.write(nodes, edges, wipe=wipe)
-        self.store.resolve_symbols()
         s = self.store.stats()
         return BuildStats(
             repo_root=str(self.repo_root),
@@ -445,16 +600,21 @@ class CodeKG:
             total_edges=s["total_edges"],
             node_counts=s["node_counts"],
             edge_counts=s["edge_counts"],
+            changed_files=changed_files,
+            removed_files=removed_files,
         )
 
-    def build_index(self, *, wipe: bool = False) -> BuildStats:
+    def build_index(self, *, wipe: bool = False, incremental: bool = False) -> BuildStats:
         """
         SQLite → LanceDB only (graph must already exist).
 
         :param wipe: Delete existing vectors before indexing.
-        :return: :class:`BuildStats` with ``indexed_rows`` and ``index_dim`` set.
+        :param incremental: Embed only nodes whose index text or model changed
+            and drop vectors for nodes no longer in the graph.
+        :return: :class:`BuildStats` with ``indexed_rows``, ``index_dim`` and
+            ``embedded_rows`` set.
         """
-        idx_stats = self.index.build(self.store, wipe=wipe)
+        idx_stats = self.index.build(self.store, wipe=wipe, incremental=incremental)
         s = self.store.stats()
         return BuildStats(
             repo_root=str(self.repo_root),
@@ -465,6 +625,7 @@ class CodeKG:
             edge_counts=s["edge_counts"],
             indexed_rows=idx_stats["indexed_rows"],
             index_dim=idx_stats["dim"],
+            embedded_rows=idx_stats.get("embedded"),
         )
 
     # ------------------------------------------------------------------
@@ -492,28 +653,35 @@ class CodeKG:
         :param max_nodes: Maximum nodes to return (default 25).
         :return: :class:`QueryResult`.
         """
+        cache_key = self._result_key(
+            "query",
+            q,
+            k=k,
+            hop=hop,
+            rels=list(rels),
+            include_symbols=include_symbols,
+            max_nodes=max_nodes,
+        )
+        cached = self.result_cache.get(cache_key)
+        if cached is not None:
+            return QueryResult(**copy.deepcopy(cached))
+
         hits = self.index.search(q, k=k)
         seed_ids: set[str] = {h.id for h in hits}
 
         meta = self.store.expand(seed_ids, hop=hop, rels=rels)
         all_ids = set(meta.keys())
 
-        nodes: list[dict] = []
-        kept_ids: set[str] = set()
-        for nid in sorted(all_ids):
-            if len(nodes) >= max_nodes:
-                break
-            n = self.store.node(nid)
-            if not n:
-                continue
-            if not include_symbols and n["kind"] == "symbol":
-                continue
-            kept_ids.add(nid)
-            nodes.append(n)
+        nodes = self.store.filter_nodes(
+            all_ids,
+            exclude_kinds=() if include_symbols else ("symbol",),
+            limit=max_nodes,
+        )
+        kept_ids: set[str] = {n["id"] for n in nodes}
 
         edges = self.store.edges_within(kept_ids)
 
-        return QueryResult(
+        result = QueryResult(
             query=q,
             seeds=len(seed_ids),
             expanded_nodes=len(all_ids),
@@ -523,6 +691,8 @@ class CodeKG:
             nodes=nodes,
             edges=edges,
         )
+        self.result_cache.put(cache_key, copy.deepcopy(result.to_dict()))
+        return result
 
     # ------------------------------------------------------------------
     # Snippet pack
@@ -553,6 +723,24 @@ class CodeKG:
         :param max_nodes: Maximum nodes to return (default 15).
         :return: :class:`SnippetPack`.
         """
+        cache_key = self._result_key(
+            "pack",
+            q,
+            k=k,
+            hop=hop,
+            rels=list(rels),
+            include_symbols=include_symbols,
+            context=context,
+            max_lines=max_lines,
+            max_nodes=max_nodes,
+        )
+        cached = self.result_cache.get(cache_key)
+        if cached is not None and all(
+            _file_stamp(_safe_join(self.repo_root, mp)) == stamp
+            for mp, stamp in cached["files"].items()
+        ):
+            return SnippetPack(**copy.deepcopy(cached["pack"]))
+
         hits = self.index.search(q, k=k)
         seed_rank: dict[str, dict] = {h.id: {"rank": h.rank, "dist": h.distance} for h in hits}
         seed_ids: set[str] = set(seed_rank.keys())
@@ -562,14 +750,10 @@ class CodeKG:
 
         # Materialise + annotate nodes
         raw_nodes: list[dict] = []
-        for nid in sorted(all_ids):
-            n = self.store.node(nid)
-            if not n:
-                continue
-            if not include_symbols and n["kind"] == "symbol":
-                continue
-
-            prov: ProvMeta = meta[nid]
+        for n in self.store.filter_nodes(
+            all_ids, exclude_kinds=() if include_symbols else ("symbol",)
+        ):
+            prov: ProvMeta = meta[n["id"]]
             base_dist = seed_rank.get(prov.via_seed, {"dist": 1e9})["dist"]
             kind_pri = _KIND_PRIORITY.get(n["kind"], 99)
             n["_rank_key"] = (prov.best_hop, base_dist, kind_pri, n["id"])
@@ -579,14 +763,22 @@ class CodeKG:
 
         # Attach spans (needed for dedup)
         file_cache: dict[str, list[str]] = {}
+        file_stamps: dict[str, list[int] | None] = {}
+
+        def lines_of(mp: str) -> list[str]:
+            if mp not in file_cache:
+                path = _safe_join(self.repo_root, mp)
+                # stat before reading, so an edit in between fails the next check
+                file_stamps[mp] = _file_stamp(path)
+                file_cache[mp] = _read_lines(path)
+            return file_cache[mp]
+
         for n in raw_nodes:
             mp = n.get("module_path")
             if not mp:
                 n["_span"] = None
                 continue
-            if mp not in file_cache:
-                file_cache[mp] = _read_lines(_safe_join(self.repo_root, mp))
-            lines = file_cache[mp]
+            lines = lines_of(mp)
             n["_span"] = _compute_span(
                 n["kind"],
                 n.get("lineno"),
@@ -628,9 +820,7 @@ class CodeKG:
             span = n.get("_span")
             if not mp or not span:
                 continue
-            if mp not in file_cache:
-                file_cache[mp] = _read_lines(_safe_join(self.repo_root, mp))
-            lines = file_cache[mp]
+            lines = lines_of(mp)
             start, end = span
             if end >= start and lines:
                 n["snippet"] = _make_snippet(mp, lines, start, end)
@@ -640,7 +830,7 @@ class CodeKG:
             for key in [k for k in n if k.startswith("_")]:
                 del n[key]
 
-        return SnippetPack(
+        result = SnippetPack(
             query=q,
             seeds=len(seed_ids),
             expanded_nodes=len(all_ids),
@@ -651,6 +841,43 @@ class CodeKG:
             nodes=kept,
             edges=edges,
         )
+        self.result_cache.put(
+            cache_key, copy.deepcopy({"pack": result.to_dict(), "files": file_stamps})
+        )
+        return result
+
+    def _result_key(self, op: str, q: str, **params: object) -> str:
+        """Build the :attr:`result_cache` key for a query or pack call.
+
+        Includes :meth:`GraphStore.build_id` and the index generation, so
+        any rebuild — in this process or another — makes earlier entries
+        unreachable, plus the ANN search knobs, which change the hits.  The
+        generation is read from disk when :attr:`index` has not been created
+        yet, so a cache hit never loads the embedder.  Source files are not
+        part of the key: :meth:`pack` stores the ``mtime_ns`` and size of
+        every file it read next to its result and recomputes when any of
+        them has changed.
+
+        :param op: ``"query"`` or ``"pack"``.
+        :param q: Query string, verbatim (it is echoed in the result).
+        :param params: Remaining call parameters.
+        :return: Canonical JSON string.
+        """
+        if self._index is not None:
+            generation = self._index.generation()
+        else:
+            generation = SemanticIndex.stored_generation(
+                self.lancedb_dir, table=self.table_name, backend=self.vector_backend
+            )
+        stamp = [
+            self.model_name,
+            self.store.build_id(),
+            generation,
+            self.nprobes,
+            self.refine_factor,
+            self.vector_backend,
+        ]
+        return json.dumps([op, q, params, stamp], sort_keys=True, separators=(",", ":"))
 
     # ------------------------------------------------------------------
     # Convenience
@@ -671,6 +898,16 @@ class CodeKG:
         """
         return self.store.callers_of(node_id, rel=rel)
 
+    def callers_many(self, node_ids: Iterable[str], *, rel: str = "CALLS") -> dict[str, list[dict]]:
+        """
+        Batch form of :meth:`callers`: fan-in for many nodes in one lookup.
+
+        :param node_ids: Target node identifiers.
+        :param rel: Relation type to invert (default ``"CALLS"``).
+        :return: ``{node_id: callers}`` for every requested id, in request order.
+        """
+        return self.store.callers_of_many(node_ids, rel=rel)
+
     def stats(self) -> dict:
         """Return store statistics (node/edge counts by kind/relation)."""
         return self.store.stats()
@@ -679,10 +916,22 @@ class CodeKG:
         """Fetch a single node by ID from the store."""
         return self.store.node(node_id)
 
+    def cache_stats(self) -> dict:
+        """Return hit/miss counters for the query caches.
+
+        Does not load the embedder or open the index.
+
+        :return: ``{"query_vectors": {...}, "results": {...}}`` with
+                 :meth:`LRUCache.stats` fields.
+        """
+        return {"query_vectors": self.query_cache.stats(), "results": self.result_cache.stats()}
+
     def close(self) -> None:
-        """Close the underlying SQLite connection."""
+        """Close the underlying SQLite connections."""
         if self._store is not None:
             self._store.close()
+        self.query_cache.close()
+        self.result_cache.close()
 
     def __enter__(self) -> CodeKG:
         """
@@ -739,6 +988,20 @@ def _safe_join(repo_root: Path, rel_path: str) -> Path:
     return p
 
 
+def _file_stamp(path: Path) -> list[int] | None:
+    """
+    Return ``[mtime_ns, size]`` of a source file, or ``None`` if it is missing.
+
+    :param path: Absolute path to the file.
+    :return: JSON-friendly change stamp used to validate cached snippet packs.
+    """
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
 def _read_lines(path: Path) -> list[str]:
     """
     Read all lines from a file, returning an empty list if the file is missing.
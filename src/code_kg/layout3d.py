@@ -23,6 +23,7 @@ Author: Eric G. Suchanek, PhD
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from collections.abc import Iterator, Mapping
 from dataclasses import dataclass
 
 import numpy as np
@@ -31,12 +32,60 @@ import numpy as np
 # Fibonacci spatial utilities  (adapted from repo_vis/pkg_visualizer/utility.py)
 # ---------------------------------------------------------------------------
 
+_GOLDEN_ANGLE = np.pi * (3.0 - np.sqrt(5.0))  # radians
+
+
+def _sphere_points(
+    rank: np.ndarray,
+    count: np.ndarray,
+    radius: np.ndarray,
+    center: np.ndarray,
+) -> np.ndarray:
+    """
+    Vectorised Fibonacci-sphere placement for many spheres at once.
+
+    Row *k* is point ``rank[k]`` of a ``count[k]``-point sphere with radius
+    ``radius[k]`` centred at ``center[k]``, so a whole layout tier is placed
+    in one pass instead of one sphere (and one array per point) at a time.
+
+    :param rank: ``(n,)`` point index within its sphere.
+    :param count: ``(n,)`` number of points on that sphere.
+    :param radius: ``(n,)`` sphere radius.
+    :param center: ``(n, 3)`` sphere centre (or a single ``(3,)`` centre).
+    :return: ``(n, 3)`` float array of positions.
+    """
+    rank = rank.astype(np.float64)
+    y = 1.0 - rank / np.maximum(count - 1, 1) * 2.0
+    r_at_y = np.sqrt(np.maximum(0.0, 1.0 - y * y))
+    theta = _GOLDEN_ANGLE * rank
+    unit = np.column_stack((np.cos(theta) * r_at_y, y, np.sin(theta) * r_at_y))
+    unit[count == 1] = (0.0, 0.0, 1.0)  # lone points sit at the pole
+    return center + radius[:, None] * unit
+
+
+def _group_ranks(groups: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Rank rows within runs of equal, contiguous group ids.
+
+    :param groups: ``(n,)`` group id per row; each group's rows are contiguous.
+    :return: ``(rank, count)`` — index of each row within its group and the
+             size of that group, both ``(n,)``.
+    """
+    n = len(groups)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty
+    starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    sizes = np.diff(np.r_[starts, n])
+    rank = np.arange(n) - np.repeat(starts, sizes)
+    return rank, np.repeat(sizes, sizes)
+
 
 def fibonacci_sphere(
     samples: int,
     radius: float = 1.0,
     center: np.ndarray | None = None,
-) -> list[np.ndarray]:
+) -> np.ndarray:
     """
     Distribute *samples* points uniformly on a sphere using the Fibonacci spiral.
 
@@ -45,25 +94,11 @@ def fibonacci_sphere(
     :param samples: Number of points to generate.
     :param radius: Sphere radius.
     :param center: Centre of the sphere (default: origin).
-    :return: List of 3-D coordinate arrays.
+    :return: ``(samples, 3)`` float array of positions.
     """
-    if center is None:
-        center = np.zeros(3)
-    if samples <= 0:
-        return []
-    if samples == 1:
-        return [center + radius * np.array([0.0, 0.0, 1.0])]
-
-    phi = np.pi * (3.0 - np.sqrt(5.0))  # golden angle in radians
-    points: list[np.ndarray] = []
-    for i in range(samples):
-        y = 1.0 - (i / float(samples - 1)) * 2.0
-        r_at_y = np.sqrt(max(0.0, 1.0 - y * y))
-        theta = phi * i
-        x = np.cos(theta) * r_at_y
-        z = np.sin(theta) * r_at_y
-        points.append(center + radius * np.array([x, y, z]))
-    return points
+    center = np.zeros(3) if center is None else np.asarray(center, dtype=np.float64)
+    n = max(samples, 0)
+    return _sphere_points(np.arange(n), np.full(n, n), np.full(n, float(radius)), center)
 
 
 def fibonacci_annulus(
@@ -72,7 +107,7 @@ def fibonacci_annulus(
     outer_radius: float = 2.0,
     center: np.ndarray | None = None,
     z_thickness: float = 0.2,
-) -> list[np.ndarray]:
+) -> np.ndarray:
     """
     Distribute *samples* points in a flat annular ring in the XY plane.
 
@@ -84,30 +119,21 @@ def fibonacci_annulus(
     :param outer_radius: Outer radius of the annulus.
     :param center: Centre of the annulus (default: origin).
     :param z_thickness: Half-range of Z jitter applied to each point.
-    :return: List of 3-D coordinate arrays.
+    :return: ``(samples, 3)`` float array of positions.
     """
-    if center is None:
-        center = np.zeros(3)
+    center = np.zeros(3) if center is None else np.asarray(center, dtype=np.float64)
     if samples <= 0:
-        return []
+        return np.zeros((0, 3))
     if samples == 1:
         mid = (inner_radius + outer_radius) / 2.0
-        return [center + np.array([mid, 0.0, 0.0])]
+        return (center + np.array([mid, 0.0, 0.0]))[None, :]
 
-    phi = np.pi * (3.0 - np.sqrt(5.0))
-    r_range = outer_radius - inner_radius
-    r_step = r_range / max(samples - 1, 1)
+    i = np.arange(samples)
+    r = inner_radius + i * ((outer_radius - inner_radius) / (samples - 1))
+    theta = _GOLDEN_ANGLE * i
     rng = np.random.default_rng(42)  # deterministic jitter seed
-
-    points: list[np.ndarray] = []
-    for i in range(samples):
-        r = inner_radius + i * r_step
-        theta = phi * i
-        x = np.cos(theta) * r
-        y = np.sin(theta) * r
-        z = (rng.random() * 2.0 - 1.0) * z_thickness
-        points.append(center + np.array([x, y, z]))
-    return points
+    z = (rng.random(samples) * 2.0 - 1.0) * z_thickness
+    return center + np.column_stack((np.cos(theta) * r, np.sin(theta) * r, z))
 
 
 def _golden_spiral_2d(
@@ -115,30 +141,24 @@ def _golden_spiral_2d(
     radius: float = 1.0,
     center: np.ndarray | None = None,
     z: float = 0.0,
-) -> list[np.ndarray]:
+) -> np.ndarray:
     """
     Place *samples* points in the XY plane using a golden-angle disc spiral.
 
     :param samples: Number of points.
     :param radius: Outer radius of the disc.
-    :param center: XY centre (Z component ignored; overridden by *z*).
-    :param z: Fixed Z coordinate for all output points.
-    :return: List of 3-D coordinate arrays.
+    :param center: XY centre (added to every point, including its Z component).
+    :param z: Z coordinate for all output points (before adding *center*).
+    :return: ``(samples, 3)`` float array of positions.
     """
-    if center is None:
-        center = np.zeros(3)
+    center = np.zeros(3) if center is None else np.asarray(center, dtype=np.float64)
     if samples <= 0:
-        return []
+        return np.zeros((0, 3))
 
-    phi = np.pi * (3.0 - np.sqrt(5.0))
-    points: list[np.ndarray] = []
-    for i in range(samples):
-        r = radius * np.sqrt(i / max(samples - 1, 1))
-        theta = phi * i
-        x = r * np.cos(theta)
-        y = r * np.sin(theta)
-        points.append(center + np.array([x, y, z]))
-    return points
+    i = np.arange(samples)
+    r = radius * np.sqrt(i / max(samples - 1, 1))
+    theta = _GOLDEN_ANGLE * i
+    return center + np.column_stack((r * np.cos(theta), r * np.sin(theta), np.full(samples, z)))
 
 
 # ---------------------------------------------------------------------------
@@ -222,6 +242,46 @@ class LayoutEdge:
         return cls(src=d["src"], rel=d["rel"], dst=d["dst"])
 
 
+@dataclass(eq=False)
+class LayoutPositions(Mapping):
+    """
+    Result of :meth:`Layout3D.compute`: one position matrix plus an id index.
+
+    ``positions[index[node_id]]`` is the ``[x, y, z]`` position of
+    *node_id*.  The matrix can be shifted, scaled or handed to PyVista in
+    one operation; the read-only mapping interface (``result[node_id]``,
+    ``result.get(node_id)``, iteration over ids) returns row views into it.
+
+    :param index: Mapping from node ID to row of *positions*.
+    :param positions: ``(n, 3)`` float array, one row per indexed node.
+    """
+
+    index: dict[str, int]
+    positions: np.ndarray
+
+    def __getitem__(self, node_id: str) -> np.ndarray:
+        """Return the position row of *node_id* (a view into :attr:`positions`)."""
+        return self.positions[self.index[node_id]]
+
+    def __contains__(self, node_id: object) -> bool:
+        """Return ``True`` if *node_id* has a position."""
+        return node_id in self.index
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over node IDs in row order."""
+        return iter(self.index)
+
+    def __len__(self) -> int:
+        """Return the number of positioned nodes."""
+        return len(self.index)
+
+
+def _row_index(nodes: list[LayoutNode]) -> dict[str, int]:
+    """Assign one matrix row per distinct node ID, in first-seen order."""
+    ids = dict.fromkeys(n.id for n in nodes)
+    return dict(zip(ids, range(len(ids))))
+
+
 # ---------------------------------------------------------------------------
 # Abstract base
 # ---------------------------------------------------------------------------
@@ -232,8 +292,9 @@ class Layout3D(ABC):
     Abstract base class for 3-D graph layout strategies.
 
     Subclasses implement :meth:`compute` to assign a 3-D position to every
-    node, returning a ``{node_id: np.ndarray([x, y, z])}`` mapping that the
-    :class:`~code_kg.viz3d.KGViz3D` renderer consumes.
+    node, returning a :class:`LayoutPositions` (an ``(n, 3)`` matrix plus a
+    node-id → row index) that the :class:`~code_kg.viz3d.KGViz3D` renderer
+    consumes.
     """
 
     @abstractmethod
@@ -241,13 +302,13 @@ class Layout3D(ABC):
         self,
         nodes: list[LayoutNode],
         edges: list[LayoutEdge],
-    ) -> dict[str, np.ndarray]:
+    ) -> LayoutPositions:
         """
         Compute 3-D positions for all *nodes*.
 
         :param nodes: All nodes in the graph.
         :param edges: All edges in the graph (used to derive hierarchy).
-        :return: Mapping from node ID to ``[x, y, z]`` position.
+        :return: Positions of all nodes, indexed by node ID.
         """
         ...
 
@@ -311,13 +372,13 @@ class AlliumLayout(Layout3D):
         self,
         nodes: list[LayoutNode],
         edges: list[LayoutEdge],
-    ) -> dict[str, np.ndarray]:
+    ) -> LayoutPositions:
         """
         Compute allium-plant 3-D positions for all nodes.
 
         :param nodes: All nodes in the graph.
         :param edges: All edges (``CONTAINS`` used to derive hierarchy).
-        :return: Mapping from node ID to ``[x, y, z]`` position.
+        :return: Positions of all nodes, indexed by node ID.
         """
         # Build CONTAINS hierarchy: child_id -> parent_id, parent_id -> [child_ids]
         parent: dict[str, str] = {}
@@ -327,14 +388,15 @@ class AlliumLayout(Layout3D):
                 parent[e.dst] = e.src
                 children.setdefault(e.src, []).append(e.dst)
 
-        node_by_id: dict[str, LayoutNode] = {n.id: n for n in nodes}
-        positions: dict[str, np.ndarray] = {}
+        index = _row_index(nodes)
+        positions = np.zeros((len(index), 3))
+        placed = np.zeros(len(index), dtype=bool)
 
         # Module nodes form the allium stems
-        modules = [n for n in nodes if n.kind == "module"]
+        modules = [n.id for n in nodes if n.kind == "module"]
         if not modules:
             # Fallback: treat nodes without a CONTAINS parent as pseudo-modules
-            modules = [n for n in nodes if n.id not in parent]
+            modules = [n.id for n in nodes if n.id not in parent]
 
         n_mods = len(modules)
         inner = self.annulus_inner_radius
@@ -348,47 +410,62 @@ class AlliumLayout(Layout3D):
             center=np.zeros(3),
             z_thickness=0.0,  # flat ring — alliums stand vertically
         )
-
-        for mod_node, mod_pos in zip(modules, mod_positions):
-            positions[mod_node.id] = np.array(mod_pos)
-            stem_apex = np.array([mod_pos[0], mod_pos[1], self.stem_height])
-
-            # Direct children (classes, top-level functions)
-            direct_ids = children.get(mod_node.id, [])
-            direct = [node_by_id[cid] for cid in direct_ids if cid in node_by_id]
-            n_direct = len(direct)
-            if not direct:
-                continue
-
-            # Head radius scales with child count
-            head_r = self.base_head_radius + np.sqrt(n_direct) * 0.4
-            head_positions = fibonacci_sphere(n_direct, radius=head_r, center=stem_apex)
-
-            for child, child_pos in zip(direct, head_positions):
-                positions[child.id] = np.array(child_pos)
-
-                # Grandchildren (methods) orbit their parent class
-                grand_ids = children.get(child.id, [])
-                grand = [node_by_id[gid] for gid in grand_ids if gid in node_by_id]
-                n_grand = len(grand)
-                if not grand:
-                    continue
-
-                method_r = self.method_orbit_radius + np.sqrt(n_grand) * 0.15
-                method_positions = fibonacci_sphere(
-                    n_grand, radius=method_r, center=np.array(child_pos)
-                )
-                for gc, gc_pos in zip(grand, method_positions):
-                    positions[gc.id] = np.array(gc_pos)
+        mod_rows = np.fromiter((index[m] for m in modules), dtype=np.intp, count=n_mods)
+        positions[mod_rows] = mod_positions
+        placed[mod_rows] = True
+
+        # Head: direct children (classes, top-level functions) on a sphere at
+        # the stem apex; head radius scales with child count
+        child_ids, child_mod = self._tier(modules, children, index)
+        rank, count = _group_ranks(child_mod)
+        apex = mod_positions[child_mod]
+        apex[:, 2] = self.stem_height
+        head_r = self.base_head_radius + np.sqrt(count) * 0.4
+        child_positions = _sphere_points(rank, count, head_r, apex)
+        child_rows = np.fromiter((index[c] for c in child_ids), dtype=np.intp, count=len(child_ids))
+        positions[child_rows] = child_positions
+        placed[child_rows] = True
+
+        # Florets: grandchildren (methods) orbit their parent class
+        grand_ids, grand_parent = self._tier(child_ids, children, index)
+        rank, count = _group_ranks(grand_parent)
+        method_r = self.method_orbit_radius + np.sqrt(count) * 0.15
+        grand_rows = np.fromiter((index[g] for g in grand_ids), dtype=np.intp, count=len(grand_ids))
+        positions[grand_rows] = _sphere_points(rank, count, method_r, child_positions[grand_parent])
+        placed[grand_rows] = True
 
         # Orphan nodes: anything not yet placed (symbols, unrooted nodes)
-        orphans = [n for n in nodes if n.id not in positions]
-        if orphans:
-            orphan_positions = fibonacci_sphere(len(orphans), radius=3.0, center=np.zeros(3))
-            for n, pos in zip(orphans, orphan_positions):
-                positions[n.id] = np.array(pos)
-
-        return positions
+        orphan_rows = np.flatnonzero(~placed)
+        if len(orphan_rows):
+            positions[orphan_rows] = fibonacci_sphere(
+                len(orphan_rows), radius=3.0, center=np.zeros(3)
+            )
+
+        return LayoutPositions(index, positions)
+
+    @staticmethod
+    def _tier(
+        parents: list[str],
+        children: dict[str, list[str]],
+        index: dict[str, int],
+    ) -> tuple[list[str], np.ndarray]:
+        """
+        Flatten the known children of *parents* into one placement tier.
+
+        :param parents: Parent node IDs, in placement order.
+        :param children: CONTAINS adjacency (parent ID -> child IDs).
+        :param index: Node-id → row index; children outside it are skipped.
+        :return: ``(child_ids, owner)`` where ``owner[k]`` is the position of
+                 ``child_ids[k]``'s parent in *parents*.  Each parent's
+                 children are contiguous, as :func:`_group_ranks` requires.
+        """
+        child_ids: list[str] = []
+        owner: list[int] = []
+        for i, pid in enumerate(parents):
+            kids = [c for c in children.get(pid, ()) if c in index]
+            child_ids.extend(kids)
+            owner.extend([i] * len(kids))
+        return child_ids, np.array(owner, dtype=np.intp)
 
 
 # ---------------------------------------------------------------------------
@@ -441,30 +518,27 @@ class LayerCakeLayout(Layout3D):
         self,
         nodes: list[LayoutNode],
         edges: list[LayoutEdge],
-    ) -> dict[str, np.ndarray]:
+    ) -> LayoutPositions:
         """
         Compute layer-cake 3-D positions for all nodes.
 
         :param nodes: All nodes in the graph.
         :param edges: Unused by this layout (present for API compatibility).
-        :return: Mapping from node ID to ``[x, y, z]`` position.
+        :return: Positions of all nodes, indexed by node ID.
         """
-        # Group nodes by Z layer
-        layers: dict[int, list[LayoutNode]] = {}
-        for n in nodes:
-            level = _KIND_ZLEVEL.get(n.kind, 3)
-            layers.setdefault(level, []).append(n)
-
-        positions: dict[str, np.ndarray] = {}
-        n_total = max(len(nodes), 1)
+        index = _row_index(nodes)
+        kind_by_id = {n.id: n.kind for n in nodes}
+        levels = np.fromiter(
+            (_KIND_ZLEVEL.get(kind_by_id[i], 3) for i in index), dtype=np.intp, count=len(index)
+        )
+        positions = np.zeros((len(index), 3))
+        n_total = max(len(index), 1)
 
-        for level, layer_nodes in layers.items():
-            z = level * self.layer_gap
+        for level in np.unique(levels):
+            rows = np.flatnonzero(levels == level)
             # Scale disc radius proportionally to the layer's node count
-            r = self.disc_radius * np.sqrt(len(layer_nodes) / n_total)
+            r = self.disc_radius * np.sqrt(len(rows) / n_total)
             r = max(r, 4.0)  # minimum spread
-            pts = _golden_spiral_2d(len(layer_nodes), radius=r, z=z)
-            for n, pt in zip(layer_nodes, pts):
-                positions[n.id] = pt
+            positions[rows] = _golden_spiral_2d(len(rows), radius=r, z=level * self.layer_gap)
 
-        return positions
+        return LayoutPositions(index, positions)
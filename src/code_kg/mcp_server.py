@@ -71,6 +71,7 @@ except ImportError:
 
 from code_kg import CodeKG
 from code_kg.codekg import DEFAULT_MODEL
+from code_kg.index import VECTOR_BACKENDS
 from code_kg.store import DEFAULT_RELS
 
 # ---------------------------------------------------------------------------
@@ -190,14 +191,15 @@ def pack_snippets(
 
 
 @mcp.tool()
-def callers(node_id: str, rel: str = "CALLS") -> str:
+def callers(node_id: str | list[str], rel: str = "CALLS") -> str:
     """
     Return all nodes that call a given node, resolving through ``sym:`` stubs.
 
     Unlike ``query_codebase`` (which seeds on semantics and expands outward),
     this tool performs a precise reverse lookup: it finds every caller of the
     specified node, including cross-module callers that reference it via an
-    import alias recorded as a ``sym:`` stub.
+    import alias recorded as a ``sym:`` stub.  Pass a list of ids to get the
+    fan-in of several nodes in one batched lookup.
 
     Typical workflow::
 
@@ -208,22 +210,28 @@ def callers(node_id: str, rel: str = "CALLS") -> str:
         callers("fn:src/my_pkg/utils.py:helper")
 
     :param node_id: Target node identifier, e.g.
-                    ``fn:src/code_kg/store.py:GraphStore.expand``.
+                    ``fn:src/code_kg/store.py:GraphStore.expand``, or a list
+                    of identifiers.
     :param rel: Relation type to invert (default ``"CALLS"``).
     :return: JSON with ``node_id``, ``rel``, ``caller_count``, and
-             ``callers`` list of node dicts.
+             ``callers`` list of node dicts; for a list of ids, JSON with
+             ``rel`` and ``results`` holding one such object per id.
     """
-    caller_list = _get_kg().callers(node_id, rel=rel)
-    return json.dumps(
+    if isinstance(node_id, str):
+        results = {node_id: _get_kg().callers(node_id, rel=rel)}
+    else:
+        results = _get_kg().callers_many(node_id, rel=rel)
+    entries = [
         {
-            "node_id": node_id,
+            "node_id": target,
             "rel": rel,
             "caller_count": len(caller_list),
             "callers": caller_list,
-        },
-        indent=2,
-        ensure_ascii=False,
-    )
+        }
+        for target, caller_list in results.items()
+    ]
+    payload = entries[0] if isinstance(node_id, str) else {"rel": rel, "results": entries}
+    return json.dumps(payload, indent=2, ensure_ascii=False)
 
 
 @mcp.tool()
@@ -252,9 +260,11 @@ def graph_stats() -> str:
     before issuing queries.
 
     :return: JSON string with total_nodes, total_edges, node_counts,
-             edge_counts, and db_path.
+             edge_counts, db_path, and cache hit/miss counters.
     """
-    stats = _get_kg().stats()
+    kg = _get_kg()
+    stats = kg.stats()
+    stats["cache"] = kg.cache_stats()
     return json.dumps(stats, indent=2, ensure_ascii=False)
 
 
@@ -300,6 +310,34 @@ def _parse_args(argv: list | None = None) -> argparse.Namespace:
         default="stdio",
         help="MCP transport: stdio (default, for Claude Desktop) or sse (HTTP)",
     )
+    p.add_argument(
+        "--snapshot",
+        action="store_true",
+        help="Serve traversals from an in-memory graph snapshot instead of SQLite",
+    )
+    p.add_argument(
+        "--persist-cache",
+        action="store_true",
+        help="Keep cached query embeddings and results on disk in .codekg/cache.sqlite across restarts",
+    )
+    p.add_argument(
+        "--nprobes",
+        type=int,
+        default=None,
+        help="IVF partitions probed when the index has an ANN index (default: LanceDB's)",
+    )
+    p.add_argument(
+        "--refine-factor",
+        type=int,
+        default=None,
+        help="Re-rank k * N ANN candidates by exact distance (default: off)",
+    )
+    p.add_argument(
+        "--vector-backend",
+        choices=VECTOR_BACKENDS,
+        default="lancedb",
+        help="Vector storage the index was built with (default: lancedb)",
+    )
     return p.parse_args(argv)
 
 
@@ -343,6 +381,11 @@ def main(argv: list | None = None) -> None:
         db_path=db,
         lancedb_dir=lancedb_dir,
         model=args.model,
+        snapshot=args.snapshot,
+        persist_cache=args.persist_cache,
+        nprobes=args.nprobes,
+        refine_factor=args.refine_factor,
+        vector_backend=args.vector_backend,
     )
 
     mcp.run(transport=args.transport)
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+snapshot.py
+
+GraphSnapshot — immutable in-memory adjacency for the Code Knowledge Graph.
+
+Loaded once from a GraphStore; node ids are interned to integers and each
+relation gets forward and reverse CSR (compressed sparse row) arrays in
+NumPy.  Traversal primitives mirror GraphStore.expand / callers_of /
+edges_within without touching SQLite.
+
+Author: Eric G. Suchanek, PhD
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from code_kg.store import DEFAULT_RELS, ProvMeta
+
+if TYPE_CHECKING:
+    from code_kg.store import GraphStore
+
+# ---------------------------------------------------------------------------
+# CSR adjacency
+# ---------------------------------------------------------------------------
+
+
+class _CSR:
+    """
+    Compressed sparse row adjacency for one relation and direction.
+
+    Row ``i`` lists the neighbours of interned node ``i`` in
+    ``indices[indptr[i]:indptr[i + 1]]``, sorted by interned id (which is
+    lexicographic id order); ``edge_ids`` holds the matching edge numbers.
+
+    :param rows: Interned row (origin) ids, one per edge.
+    :param cols: Interned column (neighbour) ids, one per edge.
+    :param edge_ids: Global edge numbers, one per edge.
+    :param n: Number of interned nodes.
+    """
+
+    __slots__ = ("indptr", "indices", "edge_ids")
+
+    def __init__(self, rows: np.ndarray, cols: np.ndarray, edge_ids: np.ndarray, n: int) -> None:
+        order = np.lexsort((cols, rows))
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n), out=self.indptr[1:])
+        self.indices = cols[order]
+        self.edge_ids = edge_ids[order]
+
+    def row(self, i: int) -> np.ndarray:
+        """Return the neighbours of interned node *i*.
+
+        :param i: Interned node id.
+        :return: Neighbour ids, ascending.
+        """
+        return self.indices[self.indptr[i] : self.indptr[i + 1]]
+
+    def gather(self, frontier: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Return every (neighbour, origin, edge) triple for *frontier* at once.
+
+        :param frontier: Interned node ids to expand.
+        :return: ``(neighbours, origins, edge_ids)`` arrays of equal length.
+        """
+        starts = self.indptr[frontier]
+        lens = self.indptr[frontier + 1] - starts
+        total = int(lens.sum())
+        if total == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty
+        offsets = np.cumsum(lens) - lens
+        pos = np.arange(total) + np.repeat(starts - offsets, lens)
+        return self.indices[pos], np.repeat(frontier, lens), self.edge_ids[pos]
+
+
+# ---------------------------------------------------------------------------
+# GraphSnapshot
+# ---------------------------------------------------------------------------
+
+
+class GraphSnapshot:
+    """
+    Read-only, in-memory copy of the graph topology.
+
+    Build with :meth:`load`; :class:`~code_kg.store.GraphStore` does this
+    lazily (and reloads on database change) when constructed with
+    ``snapshot=True``.
+
+    Example::
+
+        snap = GraphSnapshot.load(store)
+        meta = snap.expand({"fn:src/foo.py:bar"}, hop=2)
+        caller_ids = snap.callers_of("fn:src/foo.py:bar")
+
+    :param ids: Node ids in interned order (sorted).
+    :param fwd: Per-relation forward (src → dst) adjacency.
+    :param rev: Per-relation reverse (dst → src) adjacency.
+    :param evidence: Edge evidence JSON strings, indexed by edge number.
+    :param generation: :meth:`GraphStore.generation` value at load time.
+    """
+
+    def __init__(
+        self,
+        ids: list[str],
+        fwd: dict[str, _CSR],
+        rev: dict[str, _CSR],
+        evidence: list[str | None],
+        generation: tuple[int, ...] = (),
+        *,
+        index: dict[str, int] | None = None,
+        kinds: list[str] | None = None,
+        kind_codes: np.ndarray | None = None,
+    ) -> None:
+        """Initialise from pre-built arrays; prefer :meth:`load`.
+
+        :param ids: Node ids in interned order (sorted).
+        :param fwd: Per-relation forward adjacency.
+        :param rev: Per-relation reverse adjacency.
+        :param evidence: Edge evidence, indexed by edge number.
+        :param generation: Store generation the snapshot reflects.
+        :param index: Precomputed ``{id: position}`` map for *ids*.
+        :param kinds: Distinct node kinds; ``kind_codes`` index into it.
+        :param kind_codes: Per-id kind code, ``-1`` for ids with no
+            ``nodes`` row (edge endpoints only).
+        """
+        self.ids = ids
+        self.index: dict[str, int] = (
+            index if index is not None else {nid: i for i, nid in enumerate(ids)}
+        )
+        self.fwd = fwd
+        self.rev = rev
+        self.evidence = evidence
+        self.generation = generation
+        self.kinds = kinds or []
+        self.kind_codes = (
+            kind_codes if kind_codes is not None else np.full(len(ids), -1, dtype=np.int16)
+        )
+
+    @classmethod
+    def load(cls, store: GraphStore) -> GraphSnapshot:
+        """Read all node ids and edges from *store* into CSR arrays.
+
+        Edge endpoints without a ``nodes`` row are interned too, so
+        traversal matches the SQL implementation exactly.
+
+        :param store: Source :class:`~code_kg.store.GraphStore`.
+        :return: A new :class:`GraphSnapshot`.
+        """
+        con = store.con  # opens (and creates) the database before it is stat-ed
+        generation = store.generation()
+        rows = con.execute("SELECT src, rel, dst, evidence FROM edges").fetchall()
+        srcs, rels, dsts, evidence = zip(*rows) if rows else ((), (), (), ())
+        node_kind = dict(con.execute("SELECT id, kind FROM nodes").fetchall())
+        names = set(node_kind)
+        names.update(srcs)
+        names.update(dsts)
+        ids = sorted(names)
+        index = {nid: i for i, nid in enumerate(ids)}
+        n = len(ids)
+
+        kinds = sorted(set(node_kind.values()))
+        code = {k: c for c, k in enumerate(kinds)}
+        kind_codes = np.fromiter(
+            (code.get(node_kind.get(nid), -1) for nid in ids), dtype=np.int16, count=n
+        )
+
+        src_all = np.fromiter(map(index.__getitem__, srcs), dtype=np.int64, count=len(rows))
+        dst_all = np.fromiter(map(index.__getitem__, dsts), dtype=np.int64, count=len(rows))
+        rel_all = np.asarray(rels, dtype=object)
+        fwd: dict[str, _CSR] = {}
+        rev: dict[str, _CSR] = {}
+        for rel in sorted(set(rels)):
+            e = np.flatnonzero(rel_all == rel)
+            fwd[rel] = _CSR(src_all[e], dst_all[e], e, n)
+            rev[rel] = _CSR(dst_all[e], src_all[e], e, n)
+
+        return cls(
+            ids,
+            fwd,
+            rev,
+            list(evidence),
+            generation,
+            index=index,
+            kinds=kinds,
+            kind_codes=kind_codes,
+        )
+
+    # ------------------------------------------------------------------
+    # Traversal
+    # ------------------------------------------------------------------
+
+    def expand(
+        self,
+        seed_ids: Iterable[str],
+        *,
+        hop: int = 1,
+        rels: tuple[str, ...] = DEFAULT_RELS,
+    ) -> dict[str, ProvMeta]:
+        """
+        Expand from *seed_ids* up to *hop* hops, ignoring edge direction.
+
+        Same contract as :meth:`GraphStore.expand`.  When several seeds
+        reach a node at the same distance, ``via_seed`` is taken from the
+        lowest-id frontier node.
+
+        :param seed_ids: Starting node IDs (hop 0).
+        :param hop: Maximum number of hops to traverse.
+        :param rels: Edge relation types to follow.
+        :return: ``{node_id: ProvMeta}`` for all reachable nodes.
+        """
+        seeds = set(seed_ids)
+        meta: dict[str, ProvMeta] = {sid: ProvMeta(best_hop=0, via_seed=sid) for sid in seeds}
+        known = np.array(sorted(self.index[s] for s in seeds if s in self.index), dtype=np.int64)
+        if known.size == 0:
+            return meta
+
+        best = np.full(len(self.ids), -1, dtype=np.int64)
+        via = np.full(len(self.ids), -1, dtype=np.int64)
+        best[known] = 0
+        via[known] = known
+        csrs = [c[r] for r in rels for c in (self.fwd, self.rev) if r in c]
+
+        frontier = known
+        for h in range(1, hop + 1):
+            if frontier.size == 0:
+                break
+            parts = [csr.gather(frontier)[:2] for csr in csrs]
+            cand = np.concatenate([p[0] for p in parts])
+            origin = np.concatenate([p[1] for p in parts])
+            fresh = best[cand] == -1
+            cand, origin = cand[fresh], origin[fresh]
+            # first occurrence per candidate, preferring the lowest-id origin
+            order = np.lexsort((origin, cand))
+            cand, origin = cand[order], origin[order]
+            frontier, first = np.unique(cand, return_index=True)
+            best[frontier] = h
+            via[frontier] = via[origin[first]]
+
+        for i in np.flatnonzero(best > 0):
+            meta[self.ids[i]] = ProvMeta(best_hop=int(best[i]), via_seed=self.ids[via[i]])
+        return meta
+
+    def filter_ids(
+        self,
+        node_ids: Iterable[str],
+        *,
+        exclude_kinds: Sequence[str] = (),
+        limit: int | None = None,
+    ) -> list[str]:
+        """
+        Return the ids among *node_ids* that have a ``nodes`` row and a kind
+        not in *exclude_kinds*, ascending, truncated to *limit*.
+
+        Mirrors :meth:`GraphStore.filter_nodes` without hydrating rows.
+
+        :param node_ids: Candidate node identifiers.
+        :param exclude_kinds: Node kinds to drop.
+        :param limit: Maximum number of ids to return (``None`` = all).
+        :return: Surviving node ids.
+        """
+        get = self.index.get
+        idx = np.sort(np.array([get(nid, -1) for nid in node_ids], dtype=np.int64))
+        idx = idx[idx >= 0]
+        if idx.size:
+            idx = idx[np.concatenate(([True], idx[1:] != idx[:-1]))]
+        codes = self.kind_codes[idx]
+        dropped = [c for c, k in enumerate(self.kinds) if k in exclude_kinds]
+        idx = idx[(codes >= 0) & ~np.isin(codes, dropped)]
+        if limit is not None:
+            idx = idx[:limit]
+        return [self.ids[i] for i in idx]
+
+    def callers_of(self, node_id: str, *, rel: str = "CALLS") -> list[str]:
+        """
+        Return ids of nodes with a *rel* edge into *node_id*, directly or
+        through a ``sym:`` stub that ``RESOLVES_TO`` it.
+
+        Order matches :meth:`GraphStore.callers_of`: direct callers first,
+        then stub callers, each ascending by id, deduplicated.
+
+        :param node_id: Target node identifier.
+        :param rel: Relation type to invert (default ``"CALLS"``).
+        :return: Deduplicated caller ids.
+        """
+        i = self.index.get(node_id)
+        inv = self.rev.get(rel)
+        if i is None or inv is None:
+            return []
+        found = [inv.row(i)]
+        resolves = self.rev.get("RESOLVES_TO")
+        if resolves is not None:
+            found.extend(inv.row(stub) for stub in resolves.row(i))
+        seen: dict[str, None] = {}
+        for arr in found:
+            for j in arr:
+                seen.setdefault(self.ids[j], None)
+        return list(seen)
+
+    def edges_within(self, node_ids: Iterable[str]) -> list[dict]:
+        """
+        Return all edges where both ``src`` and ``dst`` are in *node_ids*.
+
+        :param node_ids: Node IDs to restrict to.
+        :return: List of edge dicts with keys ``src``, ``rel``, ``dst``, ``evidence``.
+        """
+        members = np.array(
+            sorted({self.index[n] for n in node_ids if n in self.index}), dtype=np.int64
+        )
+        if members.size == 0:
+            return []
+        inside = np.zeros(len(self.ids), dtype=bool)
+        inside[members] = True
+
+        out: list[dict] = []
+        for rel, csr in self.fwd.items():
+            dst, src, eid = csr.gather(members)
+            keep = inside[dst]
+            for s, d, e in zip(src[keep], dst[keep], eid[keep]):
+                out.append(
+                    {
+                        "src": self.ids[s],
+                        "rel": rel,
+                        "dst": self.ids[d],
+                        "evidence": self.evidence[e],
+                    }
+                )
+        return out
+
+    def __repr__(self) -> str:
+        """Return a developer-readable representation of this snapshot.
+
+        :return: String with node, edge and relation counts.
+        """
+        return (
+            f"GraphSnapshot(nodes={len(self.ids)}, edges={len(self.evidence)}, "
+            f"rels={sorted(self.fwd)})"
+        )
@@ -14,19 +14,22 @@ from __future__ import annotations
 
 import json
 import sqlite3
-from collections.abc import Iterable, Sequence
+import uuid
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
 from pathlib import Path
+from typing import TYPE_CHECKING
 
-from code_kg.codekg import Edge, Node
+from code_kg.codekg import Edge, FileRecord, Node, dotted_module_name
+
+if TYPE_CHECKING:
+    from code_kg.snapshot import GraphSnapshot
 
 # ---------------------------------------------------------------------------
 # Schema
 # ---------------------------------------------------------------------------
 
-_SCHEMA_SQL = """
-PRAGMA journal_mode=WAL;
-PRAGMA synchronous=NORMAL;
-
+_TABLES_SQL = """
 CREATE TABLE IF NOT EXISTS nodes (
   id           TEXT PRIMARY KEY,
   kind         TEXT NOT NULL,
@@ -46,18 +49,139 @@ CREATE TABLE IF NOT EXISTS edges (
   PRIMARY KEY (src, rel, dst)
 );
 
+CREATE TABLE IF NOT EXISTS files (
+  path      TEXT PRIMARY KEY,
+  mtime_ns  INTEGER NOT NULL,
+  size      INTEGER NOT NULL,
+  sha256    TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+  key    TEXT PRIMARY KEY,
+  value  TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS node_metrics (
+  id      TEXT NOT NULL,
+  metric  TEXT NOT NULL,
+  value   INTEGER NOT NULL,
+  PRIMARY KEY (id, metric)
+);
+"""
+
+# Secondary indexes; a bulk load creates these after the rows are in.
+_INDEX_SQL = """
 CREATE INDEX IF NOT EXISTS idx_nodes_kind   ON nodes(kind);
 CREATE INDEX IF NOT EXISTS idx_nodes_name   ON nodes(name);
 CREATE INDEX IF NOT EXISTS idx_nodes_module ON nodes(module_path);
 
 CREATE INDEX IF NOT EXISTS idx_edges_src ON edges(src);
-CREATE INDEX IF NOT EXISTS idx_edges_dst ON edges(dst);
 CREATE INDEX IF NOT EXISTS idx_edges_rel ON edges(rel);
+
+-- covering index for reverse (dst → src) traversal, supersedes idx_edges_dst
+DROP INDEX IF EXISTS idx_edges_dst;
+CREATE INDEX IF NOT EXISTS idx_edges_dst_rel ON edges(dst, rel, src);
+
+-- top-N by metric without sorting
+CREATE INDEX IF NOT EXISTS idx_metrics_rank ON node_metrics(metric, value, id);
+"""
+
+# Rebuilds node_metrics from scratch: per-relation degrees straight off the
+# edge indexes, fan-in counting distinct callers directly or through a
+# resolved sym: stub (same set as GraphStore.callers_of), and line counts.
+_METRICS_SQL = """
+DELETE FROM node_metrics;
+INSERT INTO node_metrics (id, metric, value)
+  SELECT src, 'out:' || rel, COUNT(*) FROM edges GROUP BY src, rel;
+INSERT INTO node_metrics (id, metric, value)
+  SELECT dst, 'in:' || rel, COUNT(*) FROM edges GROUP BY dst, rel;
+INSERT INTO node_metrics (id, metric, value)
+  SELECT target, 'fan_in', COUNT(DISTINCT caller) FROM (
+    SELECT dst AS target, src AS caller FROM edges WHERE rel = 'CALLS'
+    UNION ALL
+    SELECT r.dst, c.src FROM edges AS r
+    JOIN edges AS c ON c.dst = r.src AND c.rel = 'CALLS'
+    WHERE r.rel = 'RESOLVES_TO'
+  ) GROUP BY target;
+INSERT INTO node_metrics (id, metric, value)
+  SELECT id, 'lines', end_lineno - lineno + 1 FROM nodes
+  WHERE lineno IS NOT NULL AND end_lineno IS NOT NULL;
+INSERT OR REPLACE INTO meta (key, value)
+  VALUES ('metrics_build_id', COALESCE((SELECT value FROM meta WHERE key = 'build_id'), ''));
+"""
+
+_SCHEMA_SQL = (
+    """
+PRAGMA journal_mode=WAL;
+PRAGMA synchronous=NORMAL;
+"""
+    + _TABLES_SQL
+    + _INDEX_SQL
+)
+
+# A bulk load writes a private staging file that nobody else can see until it
+# is copied into place, so durability and locking can be switched off.  The
+# page cache is kept modest: dirty pages spill to the file anyway, and a large
+# cache would undo the flat memory profile of GraphStore.write_stream().
+_BULK_PRAGMAS_SQL = """
+PRAGMA journal_mode=OFF;
+PRAGMA synchronous=OFF;
+PRAGMA locking_mode=EXCLUSIVE;
+PRAGMA cache_size=-16384;
+"""
+
+_UPSERT_NODE_SQL = """
+INSERT INTO nodes
+  (id, kind, name, qualname, module_path, lineno, end_lineno, docstring)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(id) DO UPDATE SET
+  kind=excluded.kind,
+  name=excluded.name,
+  qualname=excluded.qualname,
+  module_path=excluded.module_path,
+  lineno=excluded.lineno,
+  end_lineno=excluded.end_lineno,
+  docstring=excluded.docstring
+"""
+
+_UPSERT_EDGE_SQL = """
+INSERT INTO edges (src, rel, dst, evidence)
+VALUES (?, ?, ?, ?)
+ON CONFLICT(src, rel, dst) DO UPDATE SET
+  evidence=excluded.evidence
+"""
+
+# Callers of a set of targets: direct *rel* edges plus *rel* edges into sym:
+# stubs that RESOLVES_TO a target.  {targets} is a parameter list or
+# subquery.  Rows come back as (target, caller), direct callers first, then by
+# stub, each by caller id; only ids are sorted so wide fan-ins stay cheap.
+# CROSS JOIN pins the stubs as the outer loop; otherwise ANALYZE statistics
+# can tempt the planner into scanning every CALLS edge via idx_edges_rel.
+_CALLERS_SQL = """
+SELECT target, caller FROM (
+  SELECT e.dst AS target, 0 AS via, '' AS stub, e.src AS caller
+  FROM edges AS e WHERE e.dst IN {targets} AND e.rel = ?
+  UNION ALL
+  SELECT r.dst, 1, r.src, c.src
+  FROM edges AS r CROSS JOIN edges AS c ON c.dst = r.src AND c.rel = ?
+  WHERE r.dst IN {targets} AND r.rel = 'RESOLVES_TO'
+)
+ORDER BY target, via, stub, caller
 """
 
 # Default edge types used for graph expansion
 DEFAULT_RELS: tuple[str, ...] = ("CONTAINS", "CALLS", "IMPORTS", "INHERITS")
 
+# Bound on ``?`` parameters per ``IN (...)`` list (SQLite's historic limit is 999).
+_IN_CHUNK = 500
+
+# Node + edge rows buffered per transaction by GraphStore.write_stream().
+_STREAM_BATCH_ROWS = 20_000
+
+# Default cap on RESOLVES_TO targets per sym: stub; a stub matching more
+# definitions than this is too ambiguous to link (see resolve_symbols).
+RESOLVE_MAX_CANDIDATES = 8
+
 
 # ---------------------------------------------------------------------------
 # Provenance metadata returned by expand()
@@ -86,6 +210,56 @@ class ProvMeta:
         return f"ProvMeta(best_hop={self.best_hop}, via_seed={self.via_seed!r})"
 
 
+# ---------------------------------------------------------------------------
+# Row writers (shared by the upsert and bulk-load paths)
+# ---------------------------------------------------------------------------
+
+
+def _upsert_nodes(con: sqlite3.Connection, nodes: Iterable[Node]) -> None:
+    """Insert or update a batch of nodes in the ``nodes`` table (no commit).
+
+    :param con: Connection to write through.
+    :param nodes: Iterable of :class:`~code_kg.codekg.Node` objects to persist.
+    """
+    rows = (
+        (
+            n.id,
+            n.kind,
+            n.name,
+            n.qualname,
+            n.module_path,
+            n.lineno,
+            n.end_lineno,
+            n.docstring,
+        )
+        for n in nodes
+    )
+    con.executemany(_UPSERT_NODE_SQL, rows)
+
+
+def _upsert_edges(con: sqlite3.Connection, edges: Iterable[Edge]) -> None:
+    """Insert or update a batch of edges in the ``edges`` table (no commit).
+
+    :param con: Connection to write through.
+    :param edges: Iterable of :class:`~code_kg.codekg.Edge` objects to persist.
+    """
+    # Extraction shares one evidence dict between edges on the same source
+    # line, so encode each distinct dict once.  Entries hold the dict
+    # itself so its id() cannot be reused while the batch is written.
+    encoded: dict[int, tuple[dict, str]] = {}
+
+    def _evidence(ev: dict | None) -> str | None:
+        if ev is None:
+            return None
+        hit = encoded.get(id(ev))
+        if hit is None:
+            hit = encoded[id(ev)] = (ev, json.dumps(ev, ensure_ascii=False))
+        return hit[1]
+
+    rows = ((e.src, e.rel, e.dst, _evidence(e.evidence)) for e in edges)
+    con.executemany(_UPSERT_EDGE_SQL, rows)
+
+
 # ---------------------------------------------------------------------------
 # GraphStore
 # ---------------------------------------------------------------------------
@@ -111,15 +285,27 @@ class GraphStore:
         meta = store.expand({"fn:src/foo.py:bar"}, hop=2)
 
     :param db_path: Path to the SQLite database file (created if absent).
+    :param snapshot: Serve :meth:`expand`, :meth:`callers_of` and
+        :meth:`edges_within` from an in-memory
+        :class:`~code_kg.snapshot.GraphSnapshot`, reloaded automatically
+        when the database changes.
     """
 
-    def __init__(self, db_path: str | Path) -> None:
+    def __init__(self, db_path: str | Path, *, snapshot: bool = False) -> None:
         """Initialise the store against a SQLite database file.
 
         :param db_path: Path to the SQLite database file (created if absent).
+        :param snapshot: Route traversal through an in-memory snapshot.
         """
         self.db_path = Path(db_path)
+        self.use_snapshot = snapshot
         self._con: sqlite3.Connection | None = None
+        self._snapshot: GraphSnapshot | None = None
+        self._build_id: tuple[tuple[int, ...], str] | None = None
+        self._con_ino: int | None = None  # inode the connection was opened on
+        self._retired: sqlite3.Connection | None = None  # handle on a replaced file
+        self._staging = False  # True for the private store yielded by rebuild()
+        self._txn = False  # True inside transaction(): writes defer their commit
 
     # ------------------------------------------------------------------
     # Connection management
@@ -127,21 +313,94 @@ class GraphStore:
 
     @property
     def con(self) -> sqlite3.Connection:
-        """Lazy SQLite connection (created on first access)."""
+        """Lazy SQLite connection (created on first access).
+
+        :meth:`rebuild` publishes in place, so one connection sees every
+        build.  If the file at :attr:`db_path` is replaced by other means
+        (e.g. restored from a copy), the stale handle is retired and the new
+        file opened; the retired handle is closed on the next replacement or
+        on :meth:`close`.
+        """
+        if self._con is not None and not self._staging and self._inode() != self._con_ino:
+            # Not closed yet: a cursor may still be reading the old file.
+            if self._retired is not None:
+                self._retired.close()
+            self._retired, self._con = self._con, None
+            self._snapshot = None
         if self._con is None:
             self.db_path.parent.mkdir(parents=True, exist_ok=True)
             self._con = sqlite3.connect(
                 str(self.db_path),
                 check_same_thread=False,  # safe: read-heavy; writes serialised by SQLite WAL
             )
-            self._con.executescript(_SCHEMA_SQL)
+            self._con.executescript(
+                _BULK_PRAGMAS_SQL + _TABLES_SQL if self._staging else _SCHEMA_SQL
+            )
+            self._con_ino = self._inode()
         return self._con
 
+    def _inode(self) -> int | None:
+        """Return the inode of :attr:`db_path`, or ``None`` if it is missing."""
+        try:
+            return self.db_path.stat().st_ino
+        except FileNotFoundError:
+            return None
+
     def close(self) -> None:
         """Close the underlying SQLite connection."""
-        if self._con is not None:
-            self._con.close()
-            self._con = None
+        for con in (self._con, self._retired):
+            if con is not None:
+                con.close()
+        self._con = self._retired = None
+        self._snapshot = None
+
+    def generation(self) -> tuple[int, ...]:
+        """Return a signature that changes whenever the database files change.
+
+        Combines the inode, ``mtime_ns`` and size of the database file and
+        ``mtime_ns`` and size of its WAL, so writes and swapped-in rebuilds
+        from any process are detected without querying SQLite.
+
+        :return: Tuple of integers; compare for equality only.
+        """
+        sig: list[int] = [self._inode() or 0]
+        for path in (self.db_path, self.db_path.with_name(self.db_path.name + "-wal")):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                sig.extend((0, 0))
+            else:
+                sig.extend((st.st_mtime_ns, st.st_size))
+        return tuple(sig)
+
+    def build_id(self) -> str:
+        """Return an identifier for the current graph contents.
+
+        A fresh id is stored in the ``meta`` table by every write through
+        this class, so unlike :meth:`generation` it survives WAL checkpoints
+        and reconnects and is safe to persist in cache keys.  It is re-read
+        only when :meth:`generation` moves.  Databases never written by this
+        version fall back to the :meth:`generation` signature.
+
+        :return: Opaque string; compare for equality only.
+        """
+        gen = self.generation()
+        if self._build_id is None or self._build_id[0] != gen:
+            row = self.con.execute("SELECT value FROM meta WHERE key = 'build_id'").fetchone()
+            self._build_id = (gen, row[0] if row else "gen:" + ",".join(map(str, gen)))
+        return self._build_id[1]
+
+    def snapshot(self) -> GraphSnapshot:
+        """Return the in-memory graph snapshot, (re)loading it if stale.
+
+        :return: A :class:`~code_kg.snapshot.GraphSnapshot` matching the
+            current database contents.
+        """
+        from code_kg.snapshot import GraphSnapshot
+
+        if self._snapshot is None or self._snapshot.generation != self.generation():
+            self._snapshot = GraphSnapshot.load(self)
+        return self._snapshot
 
     def __enter__(self) -> GraphStore:
         """Enter the context manager.
@@ -159,10 +418,11 @@ class GraphStore:
     # ------------------------------------------------------------------
 
     def clear(self) -> None:
-        """Delete all nodes and edges."""
+        """Delete all nodes, edges and the file manifest."""
         self.con.execute("DELETE FROM edges;")
         self.con.execute("DELETE FROM nodes;")
-        self.con.commit()
+        self.con.execute("DELETE FROM files;")
+        self._touch()
 
     def write(
         self,
@@ -174,75 +434,376 @@ class GraphStore:
         """
         Persist a complete graph to SQLite.
 
+        When *wipe* is set or the database is empty this goes through
+        :meth:`bulk_load` (except inside :meth:`transaction`); otherwise rows
+        are upserted in place.
+
         :param nodes: Node list from :class:`~code_kg.graph.CodeGraph`.
         :param edges: Edge list from :class:`~code_kg.graph.CodeGraph`.
-        :param wipe: If ``True``, clear existing data before writing.
+        :param wipe: If ``True``, replace existing data instead of merging.
+        """
+        if self._staging:
+            if wipe:
+                self.clear()
+            self._load([(nodes, edges)])
+            return
+        if not self._txn and (wipe or self.is_empty()):
+            self.bulk_load([(nodes, edges)])
+            return
+        if wipe:
+            self.clear()
+        _upsert_nodes(self.con, nodes)
+        _upsert_edges(self.con, edges)
+        self._touch()
+
+    def write_stream(
+        self,
+        batches: Iterable[tuple[Sequence[Node], Sequence[Edge]]],
+        *,
+        wipe: bool = False,
+        batch_rows: int = _STREAM_BATCH_ROWS,
+    ) -> tuple[int, int]:
+        """
+        Persist per-file results as they are produced, in bounded transactions.
+
+        Consumes an iterator such as :func:`~code_kg.codekg.iter_extract`
+        and commits whenever roughly *batch_rows* node and edge rows have
+        accumulated, so memory stays flat regardless of repository size.
+        ``sym:`` stubs repeated across files are deduplicated by the
+        ``nodes`` primary key instead of an in-memory dict.  The stored
+        graph is the same as ``write(*extract_repo(...))``.  When *wipe* is
+        set or the database is empty the batches go to :meth:`bulk_load`
+        (except inside :meth:`transaction`).
+
+        :param batches: Iterable of ``(nodes, edges)`` per file.
+        :param wipe: If ``True``, replace existing data instead of merging.
+        :param batch_rows: Rows to buffer per transaction.
+        :return: ``(node_rows, edge_rows)`` submitted, counting repeats.
         """
+        if self._staging:
+            if wipe:
+                self.clear()
+            return self._load(batches)
+        if not self._txn and (wipe or self.is_empty()):
+            return self.bulk_load(batches)
         if wipe:
             self.clear()
-        self._upsert_nodes(nodes)
-        self._upsert_edges(edges)
-
-    def _upsert_nodes(self, nodes: Iterable[Node]) -> None:
-        """Insert or update a batch of nodes in the ``nodes`` table.
-
-        :param nodes: Iterable of :class:`~code_kg.codekg.Node` objects to persist.
-        """
-        rows = [
-            (
-                n.id,
-                n.kind,
-                n.name,
-                n.qualname,
-                n.module_path,
-                n.lineno,
-                n.end_lineno,
-                n.docstring,
+        pending_nodes: list[Node] = []
+        pending_edges: list[Edge] = []
+        n_nodes = n_edges = 0
+        for file_nodes, file_edges in batches:
+            pending_nodes.extend(file_nodes)
+            pending_edges.extend(file_edges)
+            if len(pending_nodes) + len(pending_edges) >= batch_rows:
+                n_nodes += len(pending_nodes)
+                n_edges += len(pending_edges)
+                _upsert_nodes(self.con, pending_nodes)
+                _upsert_edges(self.con, pending_edges)
+                self._commit()
+                pending_nodes.clear()
+                pending_edges.clear()
+        n_nodes += len(pending_nodes)
+        n_edges += len(pending_edges)
+        _upsert_nodes(self.con, pending_nodes)
+        _upsert_edges(self.con, pending_edges)
+        self._touch()
+        return n_nodes, n_edges
+
+    def bulk_load(
+        self, batches: Iterable[tuple[Sequence[Node], Sequence[Edge]]]
+    ) -> tuple[int, int]:
+        """
+        Replace the whole graph with *batches* in one bulk transaction.
+
+        All rows go in with only the primary keys live and the secondary
+        indexes are created afterwards.  A new or empty database is loaded
+        directly (see :meth:`_load_empty`); a populated one is replaced by
+        loading an empty :meth:`rebuild` staging store that is then
+        published over it, so readers never see a partial graph.  The file
+        manifest of the new database is empty.
+
+        :param batches: Iterable of ``(nodes, edges)``, e.g. per file.
+        :return: ``(node_rows, edge_rows)`` submitted, counting repeats.
+        """
+        if self.is_empty():
+            return self._load_empty(batches)
+        with self.rebuild() as stage:
+            counts = stage._load(batches)
+        return counts
+
+    @contextmanager
+    def rebuild(self) -> Iterator[GraphStore]:
+        """
+        Build a replacement database off to the side and swap it in on success.
+
+        Yields a staging :class:`GraphStore` on a private file next to
+        :attr:`db_path`, tuned for bulk loading (no journal, no fsync,
+        exclusive lock).  Every method works on it as usual, and its
+        secondary indexes are created by the first :meth:`write` or
+        :meth:`write_stream`.  When the block exits normally a fresh
+        :meth:`build_id` is recorded, :meth:`refresh_metrics` and ``ANALYZE``
+        are run, and the file is copied into
+        :attr:`db_path` with the SQLite backup API in one transaction, so
+        readers see either the old graph or the finished new one, never a
+        partial build.  If the block raises, the staging
+        file is deleted and the database is left untouched.
+
+        Example::
+
+            with store.rebuild() as stage:
+                stage.write(nodes, edges)
+                stage.resolve_symbols()
+
+        Incremental updates patch the live database inside
+        :meth:`transaction` instead.
+
+        :return: Context manager yielding the staging store.
+        """
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        path = self.db_path.with_name(f"{self.db_path.name}.{uuid.uuid4().hex[:8]}.staging")
+        stage = GraphStore(path)
+        stage._staging = True
+        try:
+            yield stage
+            con = stage.con
+            con.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('build_id', ?)",
+                (uuid.uuid4().hex,),
             )
-            for n in nodes
-        ]
-        self.con.executemany(
-            """
-            INSERT INTO nodes
-              (id, kind, name, qualname, module_path, lineno, end_lineno, docstring)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(id) DO UPDATE SET
-              kind=excluded.kind,
-              name=excluded.name,
-              qualname=excluded.qualname,
-              module_path=excluded.module_path,
-              lineno=excluded.lineno,
-              end_lineno=excluded.end_lineno,
-              docstring=excluded.docstring
-            """,
-            rows,
+            con.commit()
+            con.executescript(_INDEX_SQL)
+            stage.refresh_metrics()
+            con.execute("ANALYZE")
+            con.execute("PRAGMA journal_mode=WAL")
+        except BaseException:
+            stage.close()
+            path.unlink(missing_ok=True)
+            raise
+        stage.close()
+        self._publish(path)
+
+    def _load(self, batches: Iterable[tuple[Sequence[Node], Sequence[Edge]]]) -> tuple[int, int]:
+        """Upsert *batches* in one transaction, then create the secondary indexes.
+
+        :param batches: Iterable of ``(nodes, edges)``.
+        :return: ``(node_rows, edge_rows)`` submitted, counting repeats.
+        """
+        n_nodes = n_edges = 0
+        for file_nodes, file_edges in batches:
+            n_nodes += len(file_nodes)
+            n_edges += len(file_edges)
+            _upsert_nodes(self.con, file_nodes)
+            _upsert_edges(self.con, file_edges)
+        for statement in _INDEX_SQL.split(";"):
+            self.con.execute(statement)
+        self._commit()
+        self._snapshot = None
+        return n_nodes, n_edges
+
+    def _load_empty(
+        self, batches: Iterable[tuple[Sequence[Node], Sequence[Edge]]]
+    ) -> tuple[int, int]:
+        """Bulk-load *batches* straight into this empty database.
+
+        One :meth:`transaction` drops the secondary indexes, loads the rows,
+        recreates the indexes and records :meth:`build_id`, metrics and
+        ``ANALYZE``, so readers see the empty graph until the full one
+        commits.  If no other connection has the file open, the load runs
+        under a rollback journal instead of the WAL: pages past the end of
+        the empty file are never journaled, so each page is written once
+        instead of to the WAL and again at checkpoint.
+
+        :param batches: Iterable of ``(nodes, edges)``.
+        :return: ``(node_rows, edge_rows)`` submitted, counting repeats.
+        """
+        con = self.con
+        con.commit()
+        con.execute("PRAGMA busy_timeout=0")  # fail fast instead of waiting on readers
+        try:
+            journaled = con.execute("PRAGMA journal_mode=DELETE").fetchone()[0] == "delete"
+        except sqlite3.OperationalError:  # another connection has the file open
+            journaled = False
+        finally:
+            con.execute("PRAGMA busy_timeout=5000")  # sqlite3.connect() default
+        try:
+            with self.transaction():
+                indexes = con.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL"
+                ).fetchall()
+                for (name,) in indexes:
+                    con.execute(f"DROP INDEX {name}")
+                counts = self._load(batches)
+                self._touch()
+                self.refresh_metrics()
+                con.execute("ANALYZE")
+        finally:
+            if journaled:
+                con.execute("PRAGMA journal_mode=WAL")
+        return counts
+
+    def is_empty(self) -> bool:
+        """Return ``True`` if the database holds no nodes, edges or manifest."""
+        row = self.con.execute(
+            "SELECT EXISTS (SELECT 1 FROM nodes) OR EXISTS (SELECT 1 FROM edges)"
+            " OR EXISTS (SELECT 1 FROM files)"
+        ).fetchone()
+        return not row[0]
+
+    def _publish(self, staging: Path) -> None:
+        """Copy the finished *staging* database into :attr:`db_path`.
+
+        Uses the SQLite online backup API in a single step, so the whole
+        graph is replaced in one write transaction on the live database.
+        Readers with an open transaction keep their snapshot of the old
+        graph and every later read sees the new one; no file is ever renamed
+        under an open connection.  The staging file is deleted afterwards.
+
+        :param staging: Finished database file in the same directory.
+        """
+        src = sqlite3.connect(str(staging))
+        try:
+            self.con.commit()
+            src.backup(self.con)
+        finally:
+            src.close()
+            staging.unlink(missing_ok=True)
+        self._snapshot = None
+        self._build_id = None
+
+    def _touch(self) -> None:
+        """Record a new :meth:`build_id`, commit, and drop the snapshot."""
+        self.con.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('build_id', ?)",
+            (uuid.uuid4().hex,),
         )
+        self._commit()
+        self._snapshot = None
+
+    def _commit(self) -> None:
+        """Commit, unless a :meth:`transaction` block will commit later."""
+        if not self._txn:
+            self.con.commit()
+
+    @contextmanager
+    def transaction(self) -> Iterator[GraphStore]:
+        """
+        Group several in-place writes into one SQLite write transaction.
+
+        Inside the block :meth:`write`, :meth:`write_stream`,
+        :meth:`delete_modules`, :meth:`resolve_symbols`,
+        :meth:`write_manifest` and :meth:`refresh_metrics` do not commit;
+        the block commits once when it exits normally, so other connections
+        see either the graph before the update or after all of it.  If the
+        block raises, every write is rolled back.  Nothing is copied, which
+        makes this the path for incremental updates.
+
+        Example::
+
+            with store.transaction():
+                store.delete_modules(["pkg/mod.py"])
+                store.write_stream(iter_extract(repo, files=[repo / "pkg/mod.py"]))
+                store.resolve_symbols()
+
+        :return: Context manager yielding this store.
+        """
+        self.con.commit()
+        self.con.execute("BEGIN IMMEDIATE")
+        self._txn = True
+        try:
+            yield self
+        except BaseException:
+            self._txn = False
+            self.con.rollback()
+            self._snapshot = None
+            raise
+        self._txn = False
         self.con.commit()
+        self._snapshot = None
 
-    def _upsert_edges(self, edges: Iterable[Edge]) -> None:
-        """Insert or update a batch of edges in the ``edges`` table.
+    # ------------------------------------------------------------------
+    # File manifest (incremental builds)
+    # ------------------------------------------------------------------
 
-        :param edges: Iterable of :class:`~code_kg.codekg.Edge` objects to persist.
+    def manifest(self) -> dict[str, FileRecord]:
         """
-        rows = [
-            (
-                e.src,
-                e.rel,
-                e.dst,
-                json.dumps(e.evidence, ensure_ascii=False) if e.evidence is not None else None,
-            )
-            for e in edges
-        ]
+        Return the file manifest recorded by the last build.
+
+        :return: ``{module_path: FileRecord}`` (empty if never recorded).
+        """
+        rows = self.con.execute("SELECT path, mtime_ns, size, sha256 FROM files").fetchall()
+        return {r[0]: FileRecord(*r) for r in rows}
+
+    def write_manifest(
+        self,
+        records: Iterable[FileRecord],
+        *,
+        removed: Iterable[str] = (),
+    ) -> None:
+        """
+        Upsert file fingerprints and drop entries for removed files.
+
+        :param records: Current :class:`~code_kg.codekg.FileRecord` values.
+        :param removed: Module paths no longer present in the repository.
+        """
+        self.con.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in removed])
         self.con.executemany(
             """
-            INSERT INTO edges (src, rel, dst, evidence)
+            INSERT INTO files (path, mtime_ns, size, sha256)
             VALUES (?, ?, ?, ?)
-            ON CONFLICT(src, rel, dst) DO UPDATE SET
-              evidence=excluded.evidence
+            ON CONFLICT(path) DO UPDATE SET
+              mtime_ns=excluded.mtime_ns,
+              size=excluded.size,
+              sha256=excluded.sha256
             """,
-            rows,
+            [(r.path, r.mtime_ns, r.size, r.sha256) for r in records],
         )
-        self.con.commit()
+        self._commit()
+
+    def delete_modules(self, module_paths: Iterable[str]) -> int:
+        """
+        Remove everything owned by the given modules.
+
+        Deletes nodes whose ``module_path`` is in *module_paths*, every edge
+        touching them (their own outgoing edges plus ``RESOLVES_TO`` edges
+        pointing at them), and any shared ``sym:`` stub left without
+        incoming edges — exactly the rows a fresh build would not create.
+
+        :param module_paths: Repo-relative module paths.
+        :return: Number of nodes deleted (including orphaned stubs).
+        """
+        paths = list(module_paths)
+        if not paths:
+            return 0
+
+        self.con.execute("DROP TABLE IF EXISTS _tmp_owned;")
+        self.con.execute("CREATE TEMP TABLE _tmp_owned (id TEXT PRIMARY KEY);")
+        self.con.executemany(
+            "INSERT OR IGNORE INTO _tmp_owned (id) SELECT id FROM nodes WHERE module_path = ?",
+            [(p,) for p in paths],
+        )
+        self.con.execute("DELETE FROM edges WHERE src IN (SELECT id FROM _tmp_owned);")
+        self.con.execute("DELETE FROM edges WHERE dst IN (SELECT id FROM _tmp_owned);")
+        deleted = self.con.execute(
+            "DELETE FROM nodes WHERE id IN (SELECT id FROM _tmp_owned);"
+        ).rowcount
+
+        # Shared stubs (module_path IS NULL) exist only while something
+        # references them; drop the ones the deleted modules were keeping alive.
+        self.con.execute("DELETE FROM _tmp_owned;")
+        self.con.execute(
+            """
+            INSERT INTO _tmp_owned (id)
+            SELECT n.id FROM nodes n
+            WHERE n.kind = 'symbol' AND n.module_path IS NULL
+              AND NOT EXISTS (SELECT 1 FROM edges e WHERE e.dst = n.id)
+            """
+        )
+        self.con.execute("DELETE FROM edges WHERE src IN (SELECT id FROM _tmp_owned);")
+        deleted += self.con.execute(
+            "DELETE FROM nodes WHERE id IN (SELECT id FROM _tmp_owned);"
+        ).rowcount
+        self._touch()
+        return deleted
 
     # ------------------------------------------------------------------
     # Read — single node
@@ -264,6 +825,32 @@ class GraphStore:
         ).fetchone()
         return _row_to_node(row) if row else None
 
+    def nodes(self, node_ids: Iterable[str]) -> list[dict]:
+        """
+        Fetch many nodes in as few round trips as possible.
+
+        Ids are looked up in chunks of ``IN (...)`` parameters; the result
+        follows the order of *node_ids* (first occurrence), and ids with no
+        ``nodes`` row are skipped.
+
+        :param node_ids: Stable node identifiers, in the desired output order.
+        :return: List of node dicts.
+        """
+        wanted = list(dict.fromkeys(node_ids))
+        found: dict[str, dict] = {}
+        for i in range(0, len(wanted), _IN_CHUNK):
+            chunk = wanted[i : i + _IN_CHUNK]
+            rows = self.con.execute(
+                f"""
+                SELECT id, kind, name, qualname, module_path, lineno, end_lineno, docstring
+                FROM nodes WHERE id IN ({",".join("?" for _ in chunk)})
+                """,
+                chunk,
+            ).fetchall()
+            for row in rows:
+                found[row[0]] = _row_to_node(row)
+        return [found[nid] for nid in wanted if nid in found]
+
     # ------------------------------------------------------------------
     # Read — filtered node lists
     # ------------------------------------------------------------------
@@ -304,6 +891,56 @@ class GraphStore:
         ).fetchall()
         return [_row_to_node(r) for r in rows]
 
+    def filter_nodes(
+        self,
+        node_ids: Iterable[str],
+        *,
+        exclude_kinds: Sequence[str] = (),
+        limit: int | None = None,
+    ) -> list[dict]:
+        """
+        Return the nodes among *node_ids* in ascending id order, skipping
+        *exclude_kinds*, truncated to *limit*.
+
+        Ids without a ``nodes`` row are skipped.  Filtering, ordering and the
+        cut-off happen in SQL over sorted ``IN (...)`` windows that start at
+        *limit* ids and grow only while too few rows survive, so the work
+        tracks *limit* rather than the size of *node_ids* — usually a single
+        query.  With ``snapshot=True`` the filter runs on the in-memory
+        snapshot and only the surviving ids are hydrated.
+
+        :param node_ids: Candidate node identifiers.
+        :param exclude_kinds: Node kinds to drop (e.g. ``("symbol",)``).
+        :param limit: Maximum number of nodes to return (``None`` = all).
+        :return: List of node dicts.
+        """
+        if self.use_snapshot:
+            ids = self.snapshot().filter_ids(node_ids, exclude_kinds=exclude_kinds, limit=limit)
+            return self.nodes(ids)
+
+        ordered = sorted(set(node_ids))
+        want = len(ordered) if limit is None else limit
+        step = min(_IN_CHUNK, max(want, 1))
+        out: list[dict] = []
+        pos = 0
+        while pos < len(ordered) and len(out) < want:
+            chunk = ordered[pos : pos + step]
+            pos += step
+            rows = self.con.execute(
+                f"""
+                SELECT id, kind, name, qualname, module_path, lineno, end_lineno, docstring
+                FROM nodes
+                WHERE id IN ({",".join("?" for _ in chunk)})
+                  AND kind NOT IN ({",".join("?" for _ in exclude_kinds)})
+                ORDER BY id
+                LIMIT ?
+                """,
+                (*chunk, *exclude_kinds, want - len(out)),
+            ).fetchall()
+            out.extend(_row_to_node(r) for r in rows)
+            step = min(_IN_CHUNK, step * 2)
+        return out
+
     # ------------------------------------------------------------------
     # Read — edges
     # ------------------------------------------------------------------
@@ -317,6 +954,8 @@ class GraphStore:
         """
         if not node_ids:
             return []
+        if self.use_snapshot:
+            return self.snapshot().edges_within(node_ids)
 
         self.con.execute("DROP TABLE IF EXISTS _tmp_ids;")
         self.con.execute("CREATE TEMP TABLE _tmp_ids (id TEXT PRIMARY KEY);")
@@ -354,43 +993,77 @@ class GraphStore:
         :return: ``{node_id: ProvMeta}`` for all reachable nodes.
         """
         rels = tuple(rels)
+        if self.use_snapshot:
+            return self.snapshot().expand(seed_ids, hop=hop, rels=rels)
         meta: dict[str, ProvMeta] = {sid: ProvMeta(best_hop=0, via_seed=sid) for sid in seed_ids}
         frontier: set[str] = set(seed_ids)
 
         for h in range(1, hop + 1):
+            if not frontier:
+                break
+            neighbours = self._frontier_neighbours(frontier, rels)
             nxt: set[str] = set()
             for nid in frontier:
-                rows = self.con.execute(
-                    f"""
-                    SELECT src, dst FROM edges
-                    WHERE (src = ? OR dst = ?)
-                      AND rel IN ({",".join("?" for _ in rels)})
-                    """,
-                    (nid, nid, *rels),
-                ).fetchall()
-                for src, dst in rows:
-                    for cand in (src, dst):
-                        if cand not in meta:
-                            meta[cand] = ProvMeta(
-                                best_hop=h,
-                                via_seed=meta[nid].via_seed,
-                            )
-                            nxt.add(cand)
-                        elif h < meta[cand].best_hop:
-                            meta[cand] = ProvMeta(
-                                best_hop=h,
-                                via_seed=meta[nid].via_seed,
-                            )
-                            nxt.add(cand)
+                for cand in neighbours.get(nid, ()):
+                    if cand not in meta or h < meta[cand].best_hop:
+                        meta[cand] = ProvMeta(
+                            best_hop=h,
+                            via_seed=meta[nid].via_seed,
+                        )
+                        nxt.add(cand)
             frontier = nxt
 
         return meta
 
+    def _frontier_neighbours(
+        self, frontier: set[str], rels: tuple[str, ...]
+    ) -> dict[str, list[str]]:
+        """Return the neighbours of every node in *frontier* in one round trip.
+
+        The frontier is loaded into a temp table and joined against
+        ``edges`` twice — once on ``src`` and once on ``dst`` — so each
+        half of the ``UNION ALL`` is served by its own index instead of an
+        ``OR`` scan per node.  ``CROSS JOIN`` pins the frontier as the outer
+        loop; otherwise the planner may prefer the low-selectivity
+        ``idx_edges_rel``.  Both halves are index-only lookups: the primary
+        key covers ``(src, rel, dst)`` and ``idx_edges_dst_rel`` covers the
+        reverse direction.
+
+        :param frontier: Node IDs to expand.
+        :param rels: Edge relation types to follow.
+        :return: ``{frontier_id: [neighbour_id, ...]}``.
+        """
+        self.con.execute("CREATE TEMP TABLE IF NOT EXISTS _tmp_frontier (id TEXT PRIMARY KEY);")
+        self.con.execute("DELETE FROM _tmp_frontier;")
+        self.con.executemany("INSERT INTO _tmp_frontier (id) VALUES (?)", [(i,) for i in frontier])
+        marks = ",".join("?" for _ in rels)
+        rows = self.con.execute(
+            f"""
+            SELECT f.id, e.dst FROM _tmp_frontier f
+            CROSS JOIN edges e ON e.src = f.id
+            WHERE e.rel IN ({marks})
+            UNION ALL
+            SELECT f.id, e.src FROM _tmp_frontier f
+            CROSS JOIN edges e ON e.dst = f.id
+            WHERE e.rel IN ({marks})
+            """,
+            (*rels, *rels),
+        ).fetchall()
+        out: dict[str, list[str]] = {}
+        for nid, cand in rows:
+            out.setdefault(nid, []).append(cand)
+        return out
+
     # ------------------------------------------------------------------
     # Symbol resolution
     # ------------------------------------------------------------------
 
-    def resolve_symbols(self) -> int:
+    def resolve_symbols(
+        self,
+        names: Iterable[str] | None = None,
+        *,
+        max_candidates: int | None = RESOLVE_MAX_CANDIDATES,
+    ) -> int:
         """
         Add ``RESOLVES_TO`` edges from ``sym:`` stub nodes to their
         first-party definitions (``fn:``, ``cls:``, ``m:``, ``mod:``).
@@ -398,45 +1071,129 @@ class GraphStore:
         The AST visitor emits ``CALLS → sym:Foo`` for any call whose target
         cannot be resolved at walk time (imported names, attribute accesses,
         etc.).  This post-build step links those stubs to the canonical
-        definition nodes by matching on the ``name`` field, making fan-in
-        queries (who calls X?) work correctly via graph traversal.
-
-        Matching is by name only, so a ``sym:close`` stub will acquire
-        ``RESOLVES_TO`` edges to *every* in-repo node named ``close``.
-        Agents can use the graph context to disambiguate.  The operation is
-        idempotent — duplicate edges are silently ignored.
-
+        definition nodes, making fan-in queries (who calls X?) work
+        correctly via graph traversal.  Each stub is matched in two tiers,
+        both as indexed SQL joins:
+
+        1. **Qualified** — the stub's dotted text against the dotted import
+           paths of every definition (and their suffixes of two or more
+           parts), so ``sym:code_kg.store.GraphStore`` resolves to
+           ``cls:src/code_kg/store.py:GraphStore`` and nothing else.
+        2. **Bare name** — stubs with no qualified match fall back to every
+           definition with the same ``name`` (``sym:obj.close`` → every
+           ``close``).  Agents can use the graph context to disambiguate.
+
+        A stub with more than *max_candidates* matches is left unresolved
+        rather than fanned out to all of them.  Existing ``RESOLVES_TO``
+        edges of the stubs in scope are reconciled with the fresh result, so
+        a scoped run leaves the same edges as a full one.
+
+        :param names: Restrict resolution to stubs with these names
+            (incremental builds pass the names of re-extracted and deleted
+            nodes, see :func:`resolution_names`).  ``None`` resolves every
+            stub.
+        :param max_candidates: Per-stub cap on targets; ``None`` disables it.
         :return: Number of new ``RESOLVES_TO`` edges written.
         """
-        sym_rows = self.con.execute("SELECT id, name FROM nodes WHERE kind = 'symbol'").fetchall()
-
-        def_rows = self.con.execute(
-            "SELECT id, name FROM nodes WHERE kind != 'symbol' AND name IS NOT NULL"
-        ).fetchall()
-
-        name_to_defs: dict[str, list[str]] = {}
-        for def_id, def_name in def_rows:
-            name_to_defs.setdefault(def_name, []).append(def_id)
+        con = self.con
+        con.execute("DROP TABLE IF EXISTS _tmp_stubs;")
+        con.execute("CREATE TEMP TABLE _tmp_stubs (id TEXT PRIMARY KEY, name TEXT, qualname TEXT);")
+        wanted: set[str] | None = None
+        if names is None:
+            con.execute(
+                "INSERT INTO _tmp_stubs SELECT id, name, qualname FROM nodes WHERE kind = 'symbol'"
+            )
+        else:
+            wanted = set(names)
+            con.execute("DROP TABLE IF EXISTS _tmp_names;")
+            con.execute("CREATE TEMP TABLE _tmp_names (name TEXT PRIMARY KEY);")
+            con.executemany("INSERT INTO _tmp_names (name) VALUES (?)", [(n,) for n in wanted])
+            con.execute(
+                """
+                INSERT INTO _tmp_stubs
+                SELECT id, name, qualname FROM nodes
+                WHERE kind = 'symbol' AND name IN (SELECT name FROM _tmp_names)
+                """
+            )
 
-        edges: list[tuple[str, str, str, None]] = []
-        for sym_id, sym_name in sym_rows:
-            if not sym_name:
-                continue
-            for def_id in name_to_defs.get(sym_name, []):
-                edges.append((sym_id, "RESOLVES_TO", def_id, None))
+        # Dotted-path suffixes of every definition whose last part could match
+        # a stub in scope (a stub's name is the last part of its qualname).
+        # The joins below are CROSS JOINs so the stubs stay the outer loop:
+        # temp tables carry no statistics, and the planner otherwise scans
+        # them once per definition.
+        con.execute("DROP TABLE IF EXISTS _tmp_paths;")
+        con.execute("CREATE TEMP TABLE _tmp_paths (path TEXT NOT NULL, id TEXT NOT NULL);")
+        con.executemany(
+            "INSERT INTO _tmp_paths (path, id) VALUES (?, ?)",
+            _qualified_paths(
+                con.execute(
+                    """
+                    SELECT id, kind, qualname, module_path FROM nodes
+                    WHERE kind != 'symbol' AND module_path IS NOT NULL
+                    """
+                ),
+                wanted,
+            ),
+        )
+        con.execute("CREATE INDEX _tmp_paths_path ON _tmp_paths(path);")
+        # Definitions by bare name.  nodes(name) alone would also walk every
+        # same-named stub, which is quadratic for names like "append".
+        con.execute("DROP TABLE IF EXISTS _tmp_defs;")
+        con.execute("CREATE TEMP TABLE _tmp_defs (name TEXT NOT NULL, id TEXT NOT NULL);")
+        con.execute(
+            "INSERT INTO _tmp_defs SELECT name, id FROM nodes WHERE kind != 'symbol'"
+            + ("" if wanted is None else " AND name IN (SELECT name FROM _tmp_names)")
+        )
+        con.execute("CREATE INDEX _tmp_defs_name ON _tmp_defs(name);")
 
-        if edges:
-            self.con.executemany(
-                """
-                INSERT INTO edges (src, rel, dst, evidence)
-                VALUES (?, ?, ?, ?)
-                ON CONFLICT(src, rel, dst) DO NOTHING
-                """,
-                edges,
+        # A NULL cap never compares true, so max_candidates=None keeps everything.
+        con.execute("DROP TABLE IF EXISTS _tmp_resolved;")
+        con.execute("CREATE TEMP TABLE _tmp_resolved (src TEXT, dst TEXT, PRIMARY KEY (src, dst));")
+        con.execute(
+            """
+            INSERT OR IGNORE INTO _tmp_resolved
+            SELECT s.id, p.id FROM _tmp_stubs AS s CROSS JOIN _tmp_paths AS p ON p.path = s.qualname
+            """
+        )
+        con.execute(
+            """
+            DELETE FROM _tmp_resolved WHERE src IN (
+                SELECT src FROM _tmp_resolved GROUP BY src HAVING COUNT(*) > ?
             )
-            self.con.commit()
+            """,
+            (max_candidates,),
+        )
+        con.execute(
+            """
+            INSERT OR IGNORE INTO _tmp_resolved
+            SELECT s.id, d.id FROM _tmp_stubs AS s CROSS JOIN _tmp_defs AS d ON d.name = s.name
+            WHERE s.id NOT IN (SELECT src FROM _tmp_resolved)
+              AND s.name NOT IN (SELECT name FROM _tmp_defs GROUP BY name HAVING COUNT(*) > ?)
+            """,
+            (max_candidates,),
+        )
 
-        return len(edges)
+        removed = con.execute(
+            """
+            DELETE FROM edges
+            WHERE rel = 'RESOLVES_TO' AND src IN (SELECT id FROM _tmp_stubs)
+              AND NOT EXISTS (
+                SELECT 1 FROM _tmp_resolved AS t WHERE t.src = edges.src AND t.dst = edges.dst
+              )
+            """
+        ).rowcount
+        added = con.execute(
+            """
+            INSERT INTO edges (src, rel, dst, evidence)
+            SELECT src, 'RESOLVES_TO', dst, NULL FROM _tmp_resolved WHERE true
+            ON CONFLICT(src, rel, dst) DO NOTHING
+            """
+        ).rowcount
+        if removed or added:
+            self._touch()
+        else:
+            self._commit()
+        return added
 
     # ------------------------------------------------------------------
     # Caller lookup (fan-in)
@@ -447,47 +1204,242 @@ class GraphStore:
         Return all nodes that have a *rel* edge pointing at *node_id*,
         including cross-module callers that reference it via ``sym:`` stubs.
 
-        Two-phase lookup:
-
-        1. Direct: ``edges WHERE dst = node_id AND rel = rel``
-        2. Indirect: find all ``sym:`` stubs with a ``RESOLVES_TO`` edge to
-           *node_id*, then collect their incoming *rel* edges.
-
-        Caller nodes are deduplicated and returned as node dicts.
+        One statement joins the direct ``dst = node_id`` edges with the
+        incoming *rel* edges of every ``sym:`` stub that ``RESOLVES_TO``
+        *node_id*; the callers are then fetched with one :meth:`nodes` call.
+        Direct callers come first, then stub callers (grouped by stub), each
+        ascending by id; duplicates are dropped.
 
         :param node_id: Target node identifier (e.g. ``fn:src/foo.py:bar``).
         :param rel: Relation type to invert (default ``"CALLS"``).
         :return: List of caller node dicts, deduplicated.
         """
-        direct = self.con.execute(
-            "SELECT src FROM edges WHERE dst = ? AND rel = ?",
-            (node_id, rel),
+        if self.use_snapshot:
+            return self.nodes(self.snapshot().callers_of(node_id, rel=rel))
+
+        rows = self.con.execute(
+            _CALLERS_SQL.format(targets="(?)"), (node_id, rel, rel, node_id)
         ).fetchall()
+        return self.nodes(caller for _, caller in rows)
 
-        stubs = self.con.execute(
-            "SELECT src FROM edges WHERE dst = ? AND rel = 'RESOLVES_TO'",
-            (node_id,),
+    def callers_of_many(
+        self, node_ids: Iterable[str], *, rel: str = "CALLS"
+    ) -> dict[str, list[dict]]:
+        """
+        Batch form of :meth:`callers_of`: fan-in for many targets at once.
+
+        The targets go into a temp table that drives the same join as
+        :meth:`callers_of`, so the whole batch costs one statement plus one
+        :meth:`nodes` fetch of the distinct callers.  A caller shared by
+        several targets appears as the same dict in each list.
+
+        :param node_ids: Target node identifiers.
+        :param rel: Relation type to invert (default ``"CALLS"``).
+        :return: ``{target_id: callers}`` for every requested id, in request
+            order; each list matches :meth:`callers_of` for that id.
+        """
+        targets = list(dict.fromkeys(node_ids))
+        if self.use_snapshot:
+            snap = self.snapshot()
+            grouped = {t: dict.fromkeys(snap.callers_of(t, rel=rel)) for t in targets}
+        else:
+            self.con.execute("CREATE TEMP TABLE IF NOT EXISTS _tmp_targets (id TEXT PRIMARY KEY);")
+            self.con.execute("DELETE FROM _tmp_targets;")
+            self.con.executemany(
+                "INSERT INTO _tmp_targets (id) VALUES (?)", [(t,) for t in targets]
+            )
+            grouped = {t: {} for t in targets}
+            for target, caller in self.con.execute(
+                _CALLERS_SQL.format(targets="(SELECT id FROM _tmp_targets)"), (rel, rel)
+            ):
+                grouped[target][caller] = None
+
+        found = {n["id"]: n for n in self.nodes(c for cs in grouped.values() for c in cs)}
+        return {t: [found[c] for c in cs if c in found] for t, cs in grouped.items()}
+
+    # ------------------------------------------------------------------
+    # Node metrics (precomputed degrees)
+    # ------------------------------------------------------------------
+
+    def refresh_metrics(self) -> int:
+        """
+        Recompute the ``node_metrics`` table in one set-based pass.
+
+        Metrics per node id (only non-zero values are stored):
+
+        - ``in:<REL>`` / ``out:<REL>`` — edge count by relation and direction
+        - ``fan_in`` — distinct ``CALLS`` callers, direct or through a
+          ``sym:`` stub that ``RESOLVES_TO`` the node
+        - ``lines`` — ``end_lineno - lineno + 1``
+
+        :meth:`rebuild` runs this before swapping a build in, and
+        :meth:`metrics` / :meth:`top_nodes` re-run it whenever the graph
+        has changed since (tracked via :meth:`build_id`).
+
+        :return: Number of metric rows written.
+        """
+        for statement in _METRICS_SQL.split(";"):
+            self.con.execute(statement)
+        self._commit()
+        return self.con.execute("SELECT COUNT(*) FROM node_metrics").fetchone()[0]
+
+    def metrics(self, node_id: str) -> dict[str, int]:
+        """
+        Return every precomputed metric of one node.
+
+        :param node_id: Stable node identifier.
+        :return: ``{metric: value}``; absent metrics are zero.
+        """
+        self._ensure_metrics()
+        rows = self.con.execute(
+            "SELECT metric, value FROM node_metrics WHERE id = ?", (node_id,)
         ).fetchall()
+        return dict(rows)
 
-        stub_callers: list[tuple[str]] = []
-        for (stub_id,) in stubs:
-            rows = self.con.execute(
-                "SELECT src FROM edges WHERE dst = ? AND rel = ?",
-                (stub_id, rel),
-            ).fetchall()
-            stub_callers.extend(rows)
+    def top_nodes(
+        self,
+        metric: str,
+        *,
+        limit: int = 10,
+        kinds: Sequence[str] | None = None,
+    ) -> list[dict]:
+        """
+        Return the nodes with the highest value of *metric*.
+
+        Served from the ``(metric, value)`` index, so the cost tracks
+        *limit* rather than the graph size.
+
+        :param metric: Metric name, e.g. ``"fan_in"`` or ``"out:CALLS"``
+            (see :meth:`refresh_metrics`).
+        :param limit: Maximum number of nodes.
+        :param kinds: Restrict to these node kinds.
+        :return: Node dicts, highest value first (ties by id), each with the
+            metric under ``"value"``.
+        """
+        self._ensure_metrics()
+        sql = """
+            SELECT n.id, n.kind, n.name, n.qualname, n.module_path,
+                   n.lineno, n.end_lineno, n.docstring, m.value
+            FROM node_metrics AS m JOIN nodes AS n ON n.id = m.id
+            WHERE m.metric = ?
+        """
+        params: list = [metric]
+        if kinds:
+            sql += f" AND n.kind IN ({','.join('?' for _ in kinds)})"
+            params.extend(kinds)
+        sql += " ORDER BY m.value DESC, m.id LIMIT ?"
+        params.append(limit)
+        return [
+            {**_row_to_node(row), "value": row[8]}
+            for row in self.con.execute(sql, params).fetchall()
+        ]
 
-        seen: set[str] = set()
-        result: list[dict] = []
-        for (caller_id,) in direct + stub_callers:
-            if caller_id in seen:
-                continue
-            seen.add(caller_id)
-            n = self.node(caller_id)
-            if n:
-                result.append(n)
+    def orphans(self, *, kinds: Sequence[str] = ("function", "method", "class")) -> list[dict]:
+        """
+        Return every definition that nothing calls.
 
-        return result
+        A node is orphaned when it has no ``fan_in`` metric, i.e. no direct
+        or ``sym:``-resolved ``CALLS`` edge points at it, and no called
+        ``sym:`` stub of the same name was left unresolved.  In a resolved
+        graph such a stub matched more than *max_candidates* definitions in
+        :meth:`resolve_symbols`, so any of them may be its target.  Dunder
+        names are skipped since the interpreter calls them implicitly.
+
+        :param kinds: Node kinds to consider.
+        :return: Node dicts ordered by module path and line number.
+        """
+        self._ensure_metrics()
+        rows = self.con.execute(
+            f"""
+            SELECT id, kind, name, qualname, module_path, lineno, end_lineno, docstring
+            FROM nodes AS n
+            WHERE kind IN ({",".join("?" for _ in kinds)})
+              AND name NOT LIKE '\\_\\_%\\_\\_' ESCAPE '\\'
+              AND NOT EXISTS (
+                SELECT 1 FROM node_metrics AS m WHERE m.id = n.id AND m.metric = 'fan_in'
+              )
+              AND name NOT IN (
+                SELECT s.name FROM nodes AS s JOIN edges AS c ON c.dst = s.id AND c.rel = 'CALLS'
+                WHERE s.kind = 'symbol' AND NOT EXISTS (
+                  SELECT 1 FROM edges AS r WHERE r.src = s.id AND r.rel = 'RESOLVES_TO'
+                )
+              )
+            ORDER BY module_path, lineno, id
+            """,
+            list(kinds),
+        ).fetchall()
+        return [_row_to_node(r) for r in rows]
+
+    def module_coupling(self) -> dict[str, dict]:
+        """
+        Summarise every module's size, fan-in and import dependencies.
+
+        An import counts as a dependency on the module that owns the node it
+        names, directly or through a ``sym:`` stub that ``RESOLVES_TO`` it.
+
+        :return: ``{module_path: {"functions", "classes", "methods",
+            "fan_in", "imports", "imported_by"}}``, where ``fan_in`` sums
+            the ``fan_in`` metric of the module's definitions and the two
+            dependency lists hold sorted module paths.
+        """
+        self._ensure_metrics()
+        modules = {
+            path: {
+                "functions": fns,
+                "classes": classes,
+                "methods": methods,
+                "fan_in": 0,
+                "imports": [],
+                "imported_by": [],
+            }
+            for path, fns, classes, methods in self.con.execute(
+                """
+                SELECT module_path, SUM(kind = 'function'), SUM(kind = 'class'),
+                       SUM(kind = 'method')
+                FROM nodes WHERE kind != 'symbol'
+                GROUP BY module_path HAVING SUM(kind = 'module') > 0
+                """
+            )
+        }
+        for path, fan_in in self.con.execute(
+            """
+            SELECT n.module_path, SUM(m.value)
+            FROM node_metrics AS m JOIN nodes AS n ON n.id = m.id
+            WHERE m.metric = 'fan_in' AND n.kind IN ('function', 'method', 'class')
+            GROUP BY n.module_path
+            """
+        ):
+            if path in modules:
+                modules[path]["fan_in"] = fan_in
+        deps = self.con.execute(
+            """
+            SELECT DISTINCT s.module_path, t.module_path
+            FROM edges AS i
+            JOIN nodes AS s ON s.id = i.src
+            LEFT JOIN edges AS r ON r.src = i.dst AND r.rel = 'RESOLVES_TO'
+            JOIN nodes AS t ON t.id = COALESCE(r.dst, i.dst) AND t.kind != 'symbol'
+            WHERE i.rel = 'IMPORTS' AND s.module_path != t.module_path
+            ORDER BY s.module_path, t.module_path
+            """
+        ).fetchall()
+        for src, dst in deps:
+            if src in modules and dst in modules:
+                modules[src]["imports"].append(dst)
+                modules[dst]["imported_by"].append(src)
+        for entry in modules.values():
+            entry["imported_by"].sort()
+        return modules
+
+    def _ensure_metrics(self) -> None:
+        """Run :meth:`refresh_metrics` if the graph changed since the last run."""
+        stale = self.con.execute(
+            """
+            SELECT (SELECT value FROM meta WHERE key = 'metrics_build_id')
+                IS NOT COALESCE((SELECT value FROM meta WHERE key = 'build_id'), '')
+            """
+        ).fetchone()[0]
+        if stale:
+            self.refresh_metrics()
 
     # ------------------------------------------------------------------
     # Stats
@@ -525,6 +1477,50 @@ class GraphStore:
 # ---------------------------------------------------------------------------
 
 
+def resolution_names(kind: str, name: str, module_path: str | None) -> set[str]:
+    """Return the stub names whose resolution a definition can affect.
+
+    That is the definition's own name plus, for a module, the last part of
+    its dotted path (``pkg/__init__.py`` is named ``__init__`` but imported
+    as ``pkg``).  Pass the union over added and deleted nodes to
+    :meth:`GraphStore.resolve_symbols` for an incremental re-resolution.
+
+    :param kind: Node kind.
+    :param name: Node name.
+    :param module_path: Repo-relative module path.
+    :return: Set of stub names.
+    """
+    if kind == "module" and module_path:
+        return {name, dotted_module_name(module_path).rpartition(".")[2]}
+    return {name}
+
+
+def _qualified_paths(
+    rows: Iterable[tuple[str, str, str | None, str | None]], names: set[str] | None
+) -> Iterator[tuple[str, str]]:
+    """Yield ``(dotted_path, id)`` for every suffix of two or more parts.
+
+    ``cls:src/code_kg/store.py:GraphStore`` yields
+    ``src.code_kg.store.GraphStore``, ``code_kg.store.GraphStore`` and
+    ``store.GraphStore``.
+
+    :param rows: ``(id, kind, qualname, module_path)`` of definitions;
+        rows without a module path are skipped.
+    :param names: Only yield paths whose last part is in this set.
+    """
+    for node_id, kind, qualname, module_path in rows:
+        if module_path is None:
+            continue
+        full = dotted_module_name(module_path)
+        if kind != "module" and qualname:
+            full = f"{full}.{qualname}"
+        parts = full.split(".")
+        if names is not None and parts[-1] not in names:
+            continue
+        for k in range(len(parts) - 1):
+            yield ".".join(parts[k:]), node_id
+
+
 def _row_to_node(row: tuple) -> dict:
     """Convert a raw SQLite row into a node dict.
 
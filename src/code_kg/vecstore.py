@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+vecstore.py
+
+Pluggable vector backends for :class:`~code_kg.index.SemanticIndex`.
+
+``VectorBackend`` is the storage-and-search contract: per-row metadata,
+upserts and deletes applied as one atomic write, and batched top-k
+search.  ``NumpyVectorStore`` implements it in-process for small and
+medium repositories: one file holding a structured metadata array and a
+row-normalised float32 matrix, memory-mapped on open and searched with
+``argpartition`` over dot products.  Nothing beyond NumPy is imported.
+
+The file (``<table>.vectors.bin``) is not itself an ``.npy`` file: it is a
+sequence of ``.npy`` records, each padded to a 64-byte boundary — first
+the structured metadata array, then the matrix.  ``np.load`` would return
+only the first record; read it with :class:`NumpyVectorStore`.
+
+Author: Eric G. Suchanek, PhD
+"""
+
+from __future__ import annotations
+
+import os
+import uuid
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Literal
+
+import numpy as np
+
+# Metadata fields stored per row, in file order.
+ROW_FIELDS = ("id", "kind", "name", "qualname", "module_path", "text_hash", "model")
+
+# Arrays in a NumpyVectorStore file start on this byte boundary.
+_ALIGN = 64
+
+# Queries scored together by NumpyVectorStore.search (bounds the score matrix).
+_QUERY_BLOCK = 64
+
+
+# ---------------------------------------------------------------------------
+# Backend interface
+# ---------------------------------------------------------------------------
+
+
+class VectorBackend:
+    """
+    Abstract vector storage behind :class:`~code_kg.index.SemanticIndex`.
+
+    ``SemanticIndex`` keeps embedding, change detection and the query
+    cache; a backend only stores rows and answers nearest-neighbour
+    queries.  Rows carry the :data:`ROW_FIELDS` strings plus one vector.
+    """
+
+    def existing_hashes(self) -> dict[str, tuple[str, str]]:
+        """
+        Return the ``(text_hash, model)`` pair of every stored row.
+
+        :return: Mapping of node id to ``(text_hash, model)``.
+        """
+        raise NotImplementedError
+
+    def write(
+        self,
+        rows: dict[str, list[str]],
+        vecs: np.ndarray,
+        *,
+        wipe: bool = False,
+        delete: Iterable[str] = (),
+    ) -> None:
+        """
+        Upsert *rows* and drop *delete* in one atomic write.
+
+        :param rows: Column lists keyed by :data:`ROW_FIELDS`.
+        :param vecs: ``(len(rows["id"]), dim)`` float32 matrix.
+        :param wipe: Replace all stored rows instead of merging.
+        :param delete: Node ids to remove.
+        """
+        raise NotImplementedError
+
+    def search(self, qvecs: np.ndarray, k: int) -> list[list[dict]]:
+        """
+        Return the *k* nearest rows for each query vector.
+
+        :param qvecs: ``(n_queries, dim)`` query matrix.
+        :param k: Results per query.
+        :return: One list per query of row dicts (the metadata fields plus
+                 ``_distance``), nearest first.
+        """
+        raise NotImplementedError
+
+    def count(self) -> int:
+        """Return the number of stored rows."""
+        raise NotImplementedError
+
+    def generation(self) -> tuple[int, ...]:
+        """Return a signature that changes whenever the stored rows change.
+
+        :return: Tuple of integers; compare for equality only.
+        """
+        raise NotImplementedError
+
+
+# ---------------------------------------------------------------------------
+# NumPy implementation
+# ---------------------------------------------------------------------------
+
+
+class NumpyVectorStore(VectorBackend):
+    """
+    In-process vector store: a memory-mapped float32 matrix plus row metadata.
+
+    Everything lives in a single file — a structured array of UTF-8
+    metadata fields followed by the ``(n, dim)`` matrix, each as an aligned
+    ``.npy`` record — that is rewritten through a temporary file and
+    :func:`os.replace`, so readers see either the old rows or the new ones.
+    Open handles follow rewrites by other processes on their next call.
+
+    Vectors are L2-normalised on write and queries on search, so ranking is
+    by cosine similarity.  ``_distance`` is ``2 - 2·cos``, the squared L2
+    distance between the unit vectors, which matches LanceDB's ``l2``
+    metric for normalised embeddings.
+
+    :param path: File to store the vectors in.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        """Bind the store to *path* (the file is read lazily).
+
+        :param path: File to store the vectors in.
+        """
+        self.path = Path(path)
+        self._rows: np.ndarray | None = None
+        self._vecs: np.ndarray | None = None
+        self._generation: tuple[int, ...] | None = None
+
+    # ------------------------------------------------------------------
+    # VectorBackend API
+    # ------------------------------------------------------------------
+
+    def existing_hashes(self) -> dict[str, tuple[str, str]]:
+        """Return the ``(text_hash, model)`` pair of every stored row.
+
+        :return: Mapping of node id to ``(text_hash, model)``.
+        """
+        rows, _ = self._load()
+        return {
+            nid.decode(): (h.decode(), m.decode())
+            for nid, h, m in zip(rows["id"], rows["text_hash"], rows["model"])
+        }
+
+    def write(
+        self,
+        rows: dict[str, list[str]],
+        vecs: np.ndarray,
+        *,
+        wipe: bool = False,
+        delete: Iterable[str] = (),
+    ) -> None:
+        """Upsert *rows* and drop *delete*, then atomically replace the file.
+
+        A call with no rows and nothing to delete leaves an existing file
+        untouched.
+
+        :param rows: Column lists keyed by :data:`ROW_FIELDS`.
+        :param vecs: ``(len(rows["id"]), dim)`` float32 matrix.
+        :param wipe: Replace all stored rows instead of merging.
+        :param delete: Node ids to remove.
+        """
+        delete = list(delete)
+        if not (wipe or rows["id"] or delete) and self.path.exists():
+            return
+        cols = {f: _encode(rows[f]) for f in ROW_FIELDS}
+        new_vecs = np.asarray(vecs, dtype=np.float32)
+        if new_vecs.ndim != 2:
+            new_vecs = new_vecs.reshape(len(cols["id"]), -1)
+        new_vecs = _normalize(new_vecs)
+
+        if not wipe:
+            old_rows, old_vecs = self._load()
+            if len(old_rows) and (not len(new_vecs) or old_vecs.shape[1] == new_vecs.shape[1]):
+                drop = _encode([*delete, *rows["id"]])
+                keep = ~np.isin(old_rows["id"], drop)
+                cols = {f: np.concatenate([old_rows[f][keep], cols[f]]) for f in ROW_FIELDS}
+                new_vecs = (
+                    np.concatenate([old_vecs[keep], new_vecs]) if len(new_vecs) else old_vecs[keep]
+                )
+
+        table = np.empty(len(cols["id"]), dtype=[(f, cols[f].dtype) for f in ROW_FIELDS])
+        for f in ROW_FIELDS:
+            table[f] = cols[f]
+        _save_arrays(self.path, table, new_vecs)
+        self._rows = self._vecs = self._generation = None
+
+    def search(self, qvecs: np.ndarray, k: int) -> list[list[dict]]:
+        """Return the *k* most similar rows for each query vector.
+
+        :param qvecs: ``(n_queries, dim)`` query matrix.
+        :param k: Results per query.
+        :return: One list per query of row dicts, nearest first.
+        """
+        rows, vecs = self._load()
+        qvecs = np.atleast_2d(np.asarray(qvecs, dtype=np.float32))
+        k = min(k, len(rows))
+        if k <= 0:
+            return [[] for _ in range(len(qvecs))]
+
+        out: list[list[dict]] = []
+        for start in range(0, len(qvecs), _QUERY_BLOCK):
+            scores = _normalize(qvecs[start : start + _QUERY_BLOCK]) @ vecs.T
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            top_scores = np.take_along_axis(top_scores, order, axis=1)
+            for idx, sims in zip(top, top_scores):
+                hits = []
+                for i, sim in zip(idx, sims):
+                    row = rows[i]
+                    hit = {f: row[f].decode() for f in ROW_FIELDS}
+                    hit["_distance"] = float(max(0.0, 2.0 - 2.0 * sim))
+                    hits.append(hit)
+                out.append(hits)
+        return out
+
+    def count(self) -> int:
+        """Return the number of stored rows."""
+        return len(self._load()[0])
+
+    def generation(self) -> tuple[int, ...]:
+        """Return the file's ``(mtime_ns, inode, size)``, or ``(0,)`` if absent.
+
+        :return: Tuple of integers; compare for equality only.
+        """
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return (0,)
+        return (st.st_mtime_ns, st.st_ino, st.st_size)
+
+    def __repr__(self) -> str:
+        """Return a developer-readable representation of this store.
+
+        :return: String with the backing file path.
+        """
+        return f"NumpyVectorStore(path={str(self.path)!r})"
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _load(self) -> tuple[np.ndarray, np.ndarray]:
+        """Map the file, reopening it when :meth:`generation` has moved.
+
+        :return: ``(rows, vecs)``; empty arrays when the file does not exist.
+        """
+        gen = self.generation()
+        if self._rows is None or gen != self._generation:
+            if gen == (0,):
+                empty = [(f, "S1") for f in ROW_FIELDS]
+                self._rows, self._vecs = np.empty(0, dtype=empty), np.zeros((0, 0), np.float32)
+            else:
+                self._rows, self._vecs = _load_arrays(self.path)
+            self._generation = gen
+        return self._rows, self._vecs  # type: ignore[return-value]
+
+
+# ---------------------------------------------------------------------------
+# Internal utilities
+# ---------------------------------------------------------------------------
+
+
+def _encode(values: Iterable[str]) -> np.ndarray:
+    """Encode strings as a fixed-width UTF-8 bytes array (at least ``S1``)."""
+    encoded = [v.encode("utf-8") for v in values]
+    return np.array(encoded, dtype=f"S{max(map(len, encoded), default=1) or 1}")
+
+
+def _normalize(vecs: np.ndarray) -> np.ndarray:
+    """Scale each row of *vecs* to unit L2 norm (zero rows stay zero)."""
+    norms = np.linalg.norm(vecs, axis=1, keepdims=True)
+    return vecs / np.where(norms > 0, norms, 1.0)
+
+
+def _save_arrays(path: Path, *arrays: np.ndarray) -> None:
+    """Write *arrays* back to back in ``.npy`` format and swap the file in.
+
+    Each array starts on an :data:`_ALIGN`-byte boundary so it can be
+    memory-mapped in place.
+
+    :param path: Destination file.
+    :param arrays: Arrays to store (no object dtypes).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp, "wb") as f:
+            for arr in arrays:
+                np.lib.format.write_array(f, np.ascontiguousarray(arr), allow_pickle=False)
+                f.write(b"\0" * (-f.tell() % _ALIGN))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _load_arrays(path: Path) -> list[np.ndarray]:
+    """Memory-map every array written by :func:`_save_arrays` to *path*.
+
+    :param path: File to read.
+    :return: Read-only arrays in file order.
+    """
+    arrays: list[np.ndarray] = []
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        while f.tell() < size:
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            if nbytes:
+                order: Literal["C", "F"] = "F" if fortran else "C"
+                arrays.append(
+                    np.memmap(str(path), dtype, mode="r", offset=offset, shape=shape, order=order)
+                )
+            else:
+                arrays.append(np.empty(shape, dtype=dtype))
+            end = offset + nbytes
+            f.seek(end + (-end % _ALIGN))
+    return arrays
@@ -1,6 +1,7 @@
 import ast
+import sys
 
-from code_kg.codekg import node_id
+from code_kg.codekg import FrozenDict, node_id
 
 # Relation types (add to your constants or use strings directly)
 REL_CALLS = "CALLS"
@@ -11,6 +12,10 @@ REL_ATTR_ACCESS = "ATTR_ACCESS"
 REL_DEPENDS_ON = "DEPENDS_ON"  # placeholder for future control-flow
 
 
+def _skip(node: ast.AST) -> None:
+    """No-op visit for field-less leaf nodes."""
+
+
 class CodeKGVisitor(ast.NodeVisitor):
     def __init__(self, module_id: str, file_path: str):
         """Initialise the visitor for a single Python source file.
@@ -28,6 +33,76 @@ class CodeKGVisitor(ast.NodeVisitor):
         self._scope_kinds: dict[str, str] = {}  # qualname → kind
         self.edges: list[tuple[str, str, str, dict | None]] = []  # (src_id, tgt_id, rel, evidence)
         self.nodes: dict[str, dict] = {}  # id → node props (your existing)
+        # Call sites inside a def: (depth, seq, call, def_name, def_class)
+        # where def_class is the name of the ClassDef directly holding the
+        # innermost enclosing def, else None.  Sorting on (depth, seq) gives
+        # ast.walk (breadth-first) order.
+        self.call_sites: list[tuple[int, int, ast.Call, str, str | None]] = []
+        self._path: list[ast.AST] = []  # ancestors of the node being visited
+        self._dispatch: dict[type, object] = {}  # node class → bound visit method
+        self._defs: list[tuple[str, str | None]] = []  # enclosing (def_name, def_class)
+        self._seq = 0
+        self._evidence: dict[int | None, FrozenDict] = {}  # lineno → shared evidence
+
+    def visit(self, node: ast.AST):
+        """Visit *node*, tracking its ancestor path for call-site depth.
+
+        Dispatch is cached per node class, and leaf nodes without fields
+        (``Load``, ``Store``, operators) are skipped when they have no
+        dedicated visitor, since there is nothing below them.
+
+        :param node: AST node to visit.
+        """
+        cls = node.__class__
+        method = self._dispatch.get(cls)
+        if method is None:
+            method = getattr(self, "visit_" + cls.__name__, None)
+            if method is None:
+                method = self.generic_visit if cls._fields else _skip
+            self._dispatch[cls] = method
+        self._path.append(node)
+        result = method(node)  # type: ignore[operator]
+        self._path.pop()
+        return result
+
+    def generic_visit(self, node: ast.AST):
+        """Visit every child of *node* in field order.
+
+        Equivalent to :meth:`ast.NodeVisitor.generic_visit` without the
+        per-field generator.
+
+        :param node: AST node whose children are visited.
+        """
+        visit = self.visit
+        for field in node._fields:
+            value = getattr(node, field, None)
+            if isinstance(value, list):
+                for item in value:
+                    if isinstance(item, ast.AST):
+                        visit(item)
+            elif isinstance(value, ast.AST):
+                visit(value)
+
+    def _record_call(self, node: ast.Call, depth: int) -> None:
+        """Record *node* as a call site of the innermost enclosing def."""
+        if self._defs:
+            name, cls = self._defs[-1]
+            self.call_sites.append((depth, self._seq, node, name, cls))
+            self._seq += 1
+
+    def _collect_calls(self, node: ast.AST, depth: int) -> None:
+        """Record call sites in a subtree the visitor does not otherwise enter.
+
+        Used for the decorators, signature and return annotation of a def,
+        which :meth:`_visit_function` skips for data-flow purposes.
+
+        :param node: Root of the subtree.
+        :param depth: Depth of *node* below the module.
+        """
+        if isinstance(node, ast.Call):
+            self._record_call(node, depth)
+        for child in ast.iter_child_nodes(node):
+            self._collect_calls(child, depth + 1)
 
     def _qualname(self, name: str) -> str:
         """Build qualified name, e.g. module.class.method"""
@@ -53,6 +128,8 @@ class CodeKGVisitor(ast.NodeVisitor):
         else:
             rel_qn = qualname[len(prefix) :] if qualname.startswith(prefix) else qualname
             nid = node_id(kind, self.module_id, rel_qn)
+        # Interned so the many edges touching one node share a single id string.
+        nid = sys.intern(nid)
         if nid not in self.nodes:
             self.nodes[nid] = {"qualname": qualname, "kind": kind, "file": self.file_path}
         return nid
@@ -66,24 +143,30 @@ class CodeKGVisitor(ast.NodeVisitor):
         :param evidence: Optional AST node from which the line number is
             extracted and stored alongside the edge.
         """
-        ev = {"lineno": getattr(evidence, "lineno", None), "file": self.file_path}
+        lineno = getattr(evidence, "lineno", None)
+        ev = self._evidence.get(lineno)
+        if ev is None:
+            # One read-only dict per source line, shared by every edge on it
+            ev = self._evidence[lineno] = FrozenDict(lineno=lineno, file=self.file_path)
         self.edges.append((src_id, tgt_id, rel, ev))
 
-    def _extract_reads(self, expr: ast.AST) -> set[str]:
+    def _extract_reads(self, expr: ast.AST) -> dict[str, None]:
         """Collect variable names that are loaded (READS).
 
         Walks *expr* and returns the identifier of every ``ast.Name`` node
         whose context is ``Load`` or ``Del`` (deletion can be read-like).
 
         :param expr: Root AST node to walk.
-        :return: Set of variable name strings that are read within *expr*.
+        :return: Variable names read within *expr*, deduplicated in first-seen
+            order (a dict rather than a set, so edge order does not depend on
+            string hashing and is stable across processes).
         """
-        reads = set()
+        reads: dict[str, None] = {}
         for sub in ast.walk(expr):
             if isinstance(sub, ast.Name) and isinstance(
                 sub.ctx, ast.Load | ast.Del
             ):  # Del can be read-like
-                reads.add(sub.id)
+                reads[sub.id] = None
         return reads
 
     def _add_var_edge(
@@ -168,13 +251,33 @@ class CodeKGVisitor(ast.NodeVisitor):
     def visit_FunctionDef(self, node: ast.FunctionDef):
         """Visit a synchronous function or method definition.
 
+        See :meth:`_visit_function`.
+
+        :param node: The ``ast.FunctionDef`` node being visited.
+        """
+        self._visit_function(node)
+
+    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
+        """Visit an asynchronous function or method definition.
+
+        See :meth:`_visit_function`.
+
+        :param node: The ``ast.AsyncFunctionDef`` node being visited.
+        """
+        self._visit_function(node)
+
+    def _visit_function(self, node: ast.FunctionDef | ast.AsyncFunctionDef):
+        """Visit a function or method definition (sync or async).
+
         Determines whether the callable is a ``"function"`` or ``"method"``
         based on the enclosing scope kind, processes default argument
         expressions in the enclosing scope, then pushes a new scope for the
         function body. Emits a ``CONTAINS`` edge from the parent scope and
         seeds parameter names into the local variable set before recursing.
+        Fields other than the body (signature, decorators, return
+        annotation) are only scanned for call sites, in field order.
 
-        :param node: The ``ast.FunctionDef`` node being visited.
+        :param node: The definition node being visited.
         """
         qualname = self._qualname(node.name)
         parent_kind = self._scope_kinds.get(
@@ -191,47 +294,26 @@ class CodeKGVisitor(ast.NodeVisitor):
             for r in self._extract_reads(expr):
                 self._add_var_edge(r, REL_READS, evidence=expr)
 
-        self.current_scope.append(qualname)
-        self.current_func = qualname
-        self.vars_in_scope[qualname] = set()
-        self._seed_params(qualname, node.args)
-
-        parent_id = self._get_node_id(self.current_scope[-2])
-        func_id = self._get_node_id(qualname)
-        self._add_edge(parent_id, func_id, REL_CONTAINS)
-
-        for stmt in node.body:
-            self.visit(stmt)
+        depth = len(self._path) - 1
+        parent = self._path[-2] if depth > 0 else None
+        self._defs.append((node.name, parent.name if isinstance(parent, ast.ClassDef) else None))
 
-        self.current_scope.pop()
-        self.current_func = None
+        for field, value in ast.iter_fields(node):
+            if field == "body":
+                self._visit_body(qualname, node)
+                continue
+            for child in value if isinstance(value, list) else (value,):
+                if isinstance(child, ast.AST):
+                    self._collect_calls(child, depth + 1)
 
-    def visit_AsyncFunctionDef(self, node: ast.AsyncFunctionDef):
-        """Visit an asynchronous function or method definition.
+        self._defs.pop()
 
-        Behaves identically to :meth:`visit_FunctionDef` but handles
-        ``async def`` nodes. Determines kind (``"function"`` or
-        ``"method"``), processes default argument expressions in the
-        enclosing scope, pushes the function scope, emits a ``CONTAINS``
-        edge, seeds parameters, and recurses into the body.
+    def _visit_body(self, qualname: str, node: ast.FunctionDef | ast.AsyncFunctionDef):
+        """Push the function scope, emit its CONTAINS edge and visit its body.
 
-        :param node: The ``ast.AsyncFunctionDef`` node being visited.
+        :param qualname: Qualified name of the function.
+        :param node: The definition node whose body is visited.
         """
-        qualname = self._qualname(node.name)
-        parent_kind = self._scope_kinds.get(
-            self.current_scope[-1] if self.current_scope else "", "module"
-        )
-        func_kind = "method" if parent_kind == "class" else "function"
-        self._scope_kinds[qualname] = func_kind
-
-        # Default expressions are evaluated in the enclosing scope, not the
-        # function scope — process them before pushing the new scope.
-        # kw_defaults may contain None for keyword-only args without a default.
-        defaults = node.args.defaults + [d for d in node.args.kw_defaults if d is not None]
-        for expr in defaults:
-            for r in self._extract_reads(expr):
-                self._add_var_edge(r, REL_READS, evidence=expr)
-
         self.current_scope.append(qualname)
         self.current_func = qualname
         self.vars_in_scope[qualname] = set()
@@ -298,7 +380,9 @@ class CodeKGVisitor(ast.NodeVisitor):
 
         :param node: The ``ast.Call`` node being visited.
         """
-        # Assume you already have CALLS logic; add READS from args/kwargs
+        self._record_call(node, len(self._path) - 1)
+
+        # CALLS edges are resolved by extract_file from call_sites; add READS
         for arg in node.args:
             reads = self._extract_reads(arg)
             for r in reads:
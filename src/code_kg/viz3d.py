@@ -334,9 +334,7 @@ def create_kg_visualization(
     # Lift all nodes to sit on top of the cake stand platform
     # Platform is centered at (0, 0, stand_height + 2) with height 4, so top is at stand_height + 4
     platform_top = stand_height + 4
-    for node_id in positions:
-        pos = positions[node_id]
-        positions[node_id] = np.array([pos[0], pos[1], pos[2] + platform_top])
+    positions.positions[:, 2] += platform_top
 
     # -- LOD tier
     n_visible = len(nodes)
@@ -350,7 +348,7 @@ def create_kg_visualization(
     node_id_set = {n.id for n in nodes}
 
     for node in nodes:
-        pos = positions.get(node.id)  # type: ignore[assignment]
+        pos = positions.get(node.id)
         if pos is None:
             continue
         kind = node.kind
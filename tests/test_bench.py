@@ -0,0 +1,83 @@
+"""
+test_bench.py
+
+Smoke tests for the codekg-bench suite (synthetic repo + stage runner).
+"""
+
+from __future__ import annotations
+
+import json
+
+import numpy as np
+
+from code_kg.bench import HashEmbedder, main, run_benchmark, synth_repo
+from code_kg.codekg import extract_repo
+
+
+def test_synth_repo_function_count(tmp_path):
+    info = synth_repo(tmp_path, 90, per_module=40)
+    assert info == {"functions": 90, "modules": 3, "packages": 1, "files": 5}
+    nodes, edges = extract_repo(tmp_path)
+    assert sum(n.kind in ("function", "method") for n in nodes) == 90
+    assert {"CONTAINS", "CALLS", "IMPORTS"} <= {e.rel for e in edges}
+
+
+def test_synth_repo_is_deterministic(tmp_path):
+    synth_repo(tmp_path / "a", 50, seed=3)
+    synth_repo(tmp_path / "b", 50, seed=3)
+    rel = "synth/pkg_0/mod_1.py"
+    assert (tmp_path / "a" / rel).read_text() == (tmp_path / "b" / rel).read_text()
+
+
+def test_hash_embedder_is_deterministic_and_normalised():
+    emb = HashEmbedder(dim=16)
+    a, b = emb.embed_texts(["cache retry", "cache retry"])
+    assert a == b
+    assert abs(sum(x * x for x in a) - 1.0) < 1e-5
+    assert emb.model_name == "hash-16"
+    mat = emb.embed_batch(["cache retry", "", "other words"])
+    assert mat.shape == (3, 16) and mat.dtype == np.float32
+    assert np.allclose(mat[0], a)
+    assert not mat[1].any()
+
+
+def test_run_benchmark_reports_every_stage(tmp_path):
+    result = run_benchmark(60, tmp_path, queries=3, dim=16)
+    stages = result["stages"]
+    assert list(stages) == [
+        "extract",
+        "write",
+        "expand",
+        "hydrate",
+        "callers",
+        "callers_many",
+        "index",
+        "search",
+        "pack",
+    ]
+    assert stages["extract"]["nodes"] > 60
+    assert stages["expand"]["reached"] >= 8  # the k seeds themselves, at least
+    assert stages["index"]["rows"] > 0
+    assert stages["callers_many"]["targets"] > 0
+    for name in ("expand", "hydrate", "callers", "callers_many", "search", "pack"):
+        assert stages[name]["calls"] == 3
+        assert stages[name]["p50_ms"] <= stages[name]["max_ms"]
+    assert all(s["peak_mb"] is not None for s in stages.values())
+
+
+def test_run_benchmark_ann_reports_recall(tmp_path):
+    result = run_benchmark(60, tmp_path, queries=3, dim=16, ann="IVF_FLAT", trace_memory=False)
+    stages = result["stages"]
+    assert list(stages)[7:] == ["search", "ann_index", "ann_search", "pack"]
+    assert stages["ann_index"]["index_type"] == "IVF_FLAT"
+    assert stages["ann_search"]["calls"] == 3
+    assert 0.0 <= stages["ann_search"]["recall_at_k"] <= 1.0
+
+
+def test_bench_cli_writes_json(tmp_path, capsys):
+    out = tmp_path / "bench.json"
+    main(["--functions", "20", "--queries", "2", "--no-tracemalloc", "--output", str(out)])
+    report = json.loads(out.read_text())
+    assert json.loads(capsys.readouterr().out) == report
+    assert report["params"]["tracemalloc"] is False
+    assert report["runs"][0]["stages"]["pack"]["peak_mb"] is None
@@ -0,0 +1,90 @@
+"""
+test_cache.py
+
+Tests for LRUCache — in-memory eviction, counters and the SQLite disk tier.
+"""
+
+from __future__ import annotations
+
+from code_kg.cache import LRUCache
+
+# ---------------------------------------------------------------------------
+# In-memory tier
+# ---------------------------------------------------------------------------
+
+
+def test_lru_get_put_and_counters():
+    cache = LRUCache(2)
+    assert cache.get("a") is None
+    cache.put("a", [1.0, 2.0])
+    assert cache.get("a") == [1.0, 2.0]
+    s = cache.stats()
+    assert (s["hits"], s["misses"], s["size"]) == (1, 1, 1)
+    assert s["hit_rate"] == 0.5
+    assert s["persistent"] is False
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")  # a is now most recent
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_lru_maxsize_zero_disables():
+    cache = LRUCache(0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+# ---------------------------------------------------------------------------
+# Disk tier
+# ---------------------------------------------------------------------------
+
+
+def test_lru_disk_tier_survives_restart(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    first = LRUCache(4, path=path, namespace="qv")
+    first.put("q", [0.5, 0.25])
+    first.close()
+
+    second = LRUCache(4, path=path, namespace="qv")
+    assert second.get("q") == [0.5, 0.25]
+    assert second.stats()["disk_hits"] == 1
+    assert second.get("q") == [0.5, 0.25]  # now served from memory
+    assert second.stats()["disk_hits"] == 1
+    second.close()
+
+
+def test_lru_disk_namespaces_are_isolated(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    a = LRUCache(4, path=path, namespace="a")
+    b = LRUCache(4, path=path, namespace="b")
+    a.put("k", "from-a")
+    assert b.get("k") is None
+    b.put("k", "from-b")
+    a.clear()
+    assert LRUCache(4, path=path, namespace="a").get("k") is None
+    assert LRUCache(4, path=path, namespace="b").get("k") == "from-b"
+    a.close()
+    b.close()
+
+
+def test_lru_disk_tier_is_bounded(tmp_path):
+    path = tmp_path / "cache.sqlite"
+    cache = LRUCache(1, path=path, disk_maxsize=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, key)
+    cache.close()
+
+    fresh = LRUCache(1, path=path)
+    assert fresh.get("a") is None
+    assert fresh.get("b") == "b"
+    assert fresh.get("c") == "c"
+    fresh.close()
@@ -86,6 +86,16 @@ def test_codegraph_extract_force_reruns(tmp_path):
     assert {n.id for n in g.nodes} == {n.id for n in nodes_first}
 
 
+def test_codegraph_extract_jobs_same_result(tmp_path):
+    _write_repo(
+        tmp_path,
+        {"a.py": "def foo(): pass\n", "b.py": "from a import foo\ndef bar():\n    foo()\n"},
+    )
+    serial = CodeGraph(tmp_path).extract().result()
+    parallel = CodeGraph(tmp_path).extract(jobs=2).result()
+    assert parallel == serial
+
+
 # ---------------------------------------------------------------------------
 # result()
 # ---------------------------------------------------------------------------
@@ -8,6 +8,8 @@ and the private utility functions in index.py.
 from __future__ import annotations
 
 import textwrap
+import warnings
+from datetime import timedelta
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -21,6 +23,7 @@ from code_kg.index import (
     _build_index_text,
     _escape,
     _extract_distance,
+    _text_hash,
 )
 
 # ---------------------------------------------------------------------------
@@ -51,6 +54,14 @@ def test_embedder_embed_query_delegates_to_embed_texts():
     assert FakeEmbedder().embed_query("anything") == [0.1, 0.2, 0.3, 0.4]
 
 
+def test_embedder_embed_batch_defaults_to_embed_texts_matrix():
+    mat = FakeEmbedder().embed_batch(["a", "b", "c"])
+    assert mat.shape == (3, 4)
+    assert mat.dtype == np.float32
+    assert np.allclose(mat, [0.1, 0.2, 0.3, 0.4])
+    assert FakeEmbedder().embed_batch([]).shape == (0, 4)
+
+
 # ---------------------------------------------------------------------------
 # SentenceTransformerEmbedder — mocked to avoid loading real ML models
 # ---------------------------------------------------------------------------
@@ -291,6 +302,33 @@ def test_semanticindex_build_returns_stats(tmp_path):
     store.close()
 
 
+class MatrixEmbedder(FakeEmbedder):
+    """Embedder that only produces matrices; embed_texts must not be used."""
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        raise AssertionError("build should use embed_batch")
+
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        return np.arange(len(texts) * 4, dtype=np.float32).reshape(len(texts), 4)
+
+
+def test_semanticindex_build_writes_float32_vectors_from_matrix(tmp_path):
+    import pyarrow as pa
+
+    store = _make_populated_store(tmp_path)
+    idx = SemanticIndex(tmp_path / "ldb", embedder=MatrixEmbedder())
+    stats = idx.build(store, wipe=True)
+
+    tbl = idx._get_table()
+    assert tbl.schema.field("vector").type == pa.list_(pa.float32(), 4)
+    data = tbl.to_arrow().to_pydict()
+    assert len(data["id"]) == stats["embedded"]
+    vecs = np.array(data["vector"], dtype=np.float32)
+    assert np.array_equal(vecs, np.arange(vecs.size, dtype=np.float32).reshape(-1, 4))
+    assert set(data["model"]) == {"MatrixEmbedder"}
+    store.close()
+
+
 def test_semanticindex_build_wipe_rebuilds(tmp_path):
     store = _make_populated_store(tmp_path)
     idx = SemanticIndex(tmp_path / "ldb", embedder=FakeEmbedder())
@@ -360,3 +398,385 @@ def test_semanticindex_open_table_existing(tmp_path):
 
     assert second_stats["indexed_rows"] == first_stats["indexed_rows"]
     store.close()
+
+
+# ---------------------------------------------------------------------------
+# SemanticIndex — incremental builds
+# ---------------------------------------------------------------------------
+
+
+class CountingEmbedder(FakeEmbedder):
+    """FakeEmbedder that records every text it is asked to embed."""
+
+    def __init__(self, model_name: str = "fake") -> None:
+        self.model_name = model_name
+        self.seen: list[str] = []
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        self.seen.extend(texts)
+        return super().embed_texts(texts)
+
+
+def test_semanticindex_build_incremental_skips_unchanged(tmp_path):
+    store = _make_populated_store(tmp_path)
+    idx = SemanticIndex(tmp_path / "ldb", embedder=CountingEmbedder())
+    first = idx.build(store, incremental=True)
+    assert first["embedded"] == first["indexed_rows"] > 0
+
+    emb = CountingEmbedder()
+    second = SemanticIndex(tmp_path / "ldb", embedder=emb).build(store, incremental=True)
+    assert second["embedded"] == 0
+    assert second["skipped"] == first["indexed_rows"]
+    assert second["deleted"] == 0
+    assert emb.seen == []
+    store.close()
+
+
+def test_semanticindex_build_incremental_reembeds_changed_and_deletes_vanished(tmp_path):
+    store = _make_populated_store(tmp_path)
+    idx = SemanticIndex(tmp_path / "ldb", embedder=CountingEmbedder())
+    idx.build(store, incremental=True)
+
+    store.con.execute("UPDATE nodes SET docstring = 'Now documented.' WHERE id = 'fn:mod.py:foo'")
+    store.con.execute("DELETE FROM nodes WHERE id = 'm:mod.py:Bar.baz'")
+    store.con.commit()
+
+    emb = CountingEmbedder()
+    idx2 = SemanticIndex(tmp_path / "ldb", embedder=emb)
+    stats = idx2.build(store, incremental=True)
+    assert stats["embedded"] == 1
+    assert stats["deleted"] == 1
+    assert "Now documented." in emb.seen[0]
+    assert idx2._get_table().count_rows() == stats["indexed_rows"]
+    store.close()
+
+
+def test_semanticindex_build_incremental_model_change_reembeds_all(tmp_path):
+    store = _make_populated_store(tmp_path)
+    SemanticIndex(tmp_path / "ldb", embedder=CountingEmbedder("a")).build(store, incremental=True)
+    stats = SemanticIndex(tmp_path / "ldb", embedder=CountingEmbedder("b")).build(
+        store, incremental=True
+    )
+    assert stats["skipped"] == 0
+    assert stats["embedded"] == stats["indexed_rows"]
+    store.close()
+
+
+# ---------------------------------------------------------------------------
+# SemanticIndex — query vector cache
+# ---------------------------------------------------------------------------
+
+
+class QueryCountingEmbedder(FakeEmbedder):
+    """FakeEmbedder that counts query embeddings."""
+
+    def __init__(self, model_name: str = "fake") -> None:
+        self.model_name = model_name
+        self.queries: list[str] = []
+
+    def embed_query(self, query: str) -> list[float]:
+        self.queries.append(query)
+        return super().embed_query(query)
+
+
+def test_semanticindex_query_cache_hits_on_repeat(tmp_path):
+    store = _make_populated_store(tmp_path)
+    emb = QueryCountingEmbedder()
+    idx = SemanticIndex(tmp_path / "ldb", embedder=emb)
+    idx.build(store)
+
+    first = idx.search("database  connection ", k=2)
+    second = idx.search(" database connection", k=2)
+    assert [h.id for h in first] == [h.id for h in second]
+    assert emb.queries == ["database connection"]
+    assert idx.query_cache.stats()["hits"] == 1
+    assert idx.query_cache.stats()["misses"] == 1
+    store.close()
+
+
+def test_semanticindex_query_cache_keyed_on_model(tmp_path):
+    from code_kg.cache import LRUCache
+
+    shared = LRUCache(8)
+    a = SemanticIndex(tmp_path / "ldb", embedder=QueryCountingEmbedder("a"), query_cache=shared)
+    b = SemanticIndex(tmp_path / "ldb", embedder=QueryCountingEmbedder("b"), query_cache=shared)
+    a.embed_query("same question")
+    b.embed_query("same question")
+    assert len(shared) == 2
+    a.embed_query("same question")
+    assert a.embedder.queries == ["same question"]
+
+
+def test_semanticindex_sees_rebuild_from_other_instance(tmp_path):
+    store = _make_populated_store(tmp_path)
+    writer = SemanticIndex(tmp_path / "ldb", embedder=FakeEmbedder())
+    assert writer.generation() == (0,)
+    writer.build(store)
+    gen = writer.generation()
+
+    reader = SemanticIndex(tmp_path / "ldb", embedder=FakeEmbedder())
+    before = {h.id for h in reader.search("anything", k=50)}
+
+    writer.build(store, wipe=True)
+    assert writer.generation() != gen
+    store.con.execute("DELETE FROM nodes WHERE kind = 'method'")
+    store.con.commit()
+    writer.build(store, incremental=True)
+    after = {h.id for h in reader.search("anything", k=50)}
+    assert after and after < before
+    store.close()
+
+
+def test_semanticindex_wipe_build_is_published_atomically(tmp_path):
+    import lancedb
+
+    store = _make_populated_store(tmp_path)
+    SemanticIndex(tmp_path / "ldb", embedder=FakeEmbedder()).build(store)
+    reader = SemanticIndex(tmp_path / "ldb", embedder=FakeEmbedder())
+    full = reader._get_table().count_rows()
+    seen: list[int] = []
+
+    class ProbingEmbedder(FakeEmbedder):
+        def embed_texts(self, texts):
+            seen.append(reader._get_table().count_rows())
+            return super().embed_texts(texts)
+
+    writer = SemanticIndex(tmp_path / "ldb", embedder=ProbingEmbedder())
+    stats = writer.build(store, wipe=True, batch_size=1)
+    assert len(seen) == full > 1
+    assert set(seen) == {full}  # never empty or partial mid-build
+    assert reader._get_table().count_rows() == stats["indexed_rows"] == full
+    assert lancedb.connect(str(tmp_path / "ldb")).list_tables().tables == ["codekg_nodes"]
+    store.close()
+
+
+# ---------------------------------------------------------------------------
+# SemanticIndex — pipelined embedding and writing
+# ---------------------------------------------------------------------------
+
+
+class SequenceEmbedder(FakeEmbedder):
+    """Embeds each text as its running call number, to check row order."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        self.calls += 1
+        return np.full((len(texts), 4), self.calls, dtype=np.float32)
+
+
+def _vectors_by_id(idx: SemanticIndex) -> dict[str, list[float]]:
+    data = idx._get_table().to_arrow().to_pydict()
+    return dict(zip(data["id"], data["vector"]))
+
+
+def test_semanticindex_pipelined_build_matches_serial(tmp_path):
+    store = _make_populated_store(tmp_path)
+    serial = SemanticIndex(tmp_path / "serial", embedder=SequenceEmbedder())
+    s1 = serial.build(store, batch_size=1, pipeline_depth=0, write_batch_size=1)
+    piped = SemanticIndex(tmp_path / "piped", embedder=SequenceEmbedder())
+    s2 = piped.build(store, batch_size=1, pipeline_depth=3, write_batch_size=2)
+
+    assert s1["embedded"] == s2["embedded"] > 2
+    assert _vectors_by_id(serial) == _vectors_by_id(piped)
+    assert s2["rows_per_sec"] > 0
+    assert 0 <= s2["embed_seconds"] <= s2["seconds"]
+    store.close()
+
+
+def test_semanticindex_pipelined_build_propagates_embedder_errors(tmp_path):
+    store = _make_populated_store(tmp_path)
+    SemanticIndex(tmp_path / "ldb", embedder=FakeEmbedder()).build(store)
+    reader = SemanticIndex(tmp_path / "ldb", embedder=FakeEmbedder())
+    full = reader._get_table().count_rows()
+
+    class FailingEmbedder(SequenceEmbedder):
+        def embed_batch(self, texts):
+            if self.calls == 1:
+                raise RuntimeError("model crashed")
+            return super().embed_batch(texts)
+
+    writer = SemanticIndex(tmp_path / "ldb", embedder=FailingEmbedder())
+    with pytest.raises(RuntimeError, match="model crashed"):
+        writer.build(store, wipe=True, batch_size=1, pipeline_depth=2, write_batch_size=1)
+    assert reader._get_table().count_rows() == full
+    store.close()
+
+
+# ---------------------------------------------------------------------------
+# SemanticIndex — merge-insert upserts and compaction
+# ---------------------------------------------------------------------------
+
+
+def test_semanticindex_incremental_upserts_in_place_and_compacts(tmp_path):
+    store = _make_populated_store(tmp_path)
+    SemanticIndex(tmp_path / "ldb", embedder=SequenceEmbedder()).build(store)
+
+    emb = SequenceEmbedder()
+    emb.model_name = "other"  # force every row to be re-embedded in place
+    idx = SemanticIndex(tmp_path / "ldb", embedder=emb)
+    stats = idx.build(store, incremental=True, batch_size=1, write_batch_size=1)
+
+    tbl = idx._get_table()
+    assert tbl.count_rows() == stats["indexed_rows"] == stats["embedded"] > 1
+    assert set(tbl.to_arrow().column("model").to_pylist()) == {"other"}
+    assert tbl.stats()["fragment_stats"]["num_fragments"] == 1
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # LanceDB warns about a zero retention
+        idx.optimize(keep_versions_for=timedelta(0))
+    assert len(tbl.list_versions()) == 1
+    assert tbl.count_rows() == stats["indexed_rows"]
+    store.close()
+
+
+def test_semanticindex_build_without_optimize_keeps_fragments(tmp_path):
+    store = _make_populated_store(tmp_path)
+    SemanticIndex(tmp_path / "ldb", embedder=SequenceEmbedder()).build(store)
+
+    emb = SequenceEmbedder()
+    emb.model_name = "other"
+    idx = SemanticIndex(tmp_path / "ldb", embedder=emb)
+    idx.build(store, incremental=True, batch_size=1, write_batch_size=1, optimize=False)
+    assert idx._get_table().stats()["fragment_stats"]["num_fragments"] > 1
+    store.close()
+
+
+# ---------------------------------------------------------------------------
+# SemanticIndex — ANN vector index
+# ---------------------------------------------------------------------------
+
+
+class SpreadEmbedder(FakeEmbedder):
+    """Distinct deterministic vectors per text, so nearest neighbours differ."""
+
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        seeds = [int(_text_hash(t)[:8], 16) for t in texts]
+        return np.array(
+            [np.random.default_rng(s).random(4, dtype=np.float32) for s in seeds]
+        ).reshape(len(texts), 4)
+
+    def embed_texts(self, texts: list[str]) -> list[list[float]]:
+        return self.embed_batch(texts).tolist()
+
+
+def test_semanticindex_build_creates_ann_index_past_threshold(tmp_path):
+    store = _make_populated_store(tmp_path)
+    idx = SemanticIndex(tmp_path / "ldb", embedder=SpreadEmbedder())
+    assert idx.build(store, vector_index_min_rows=10_000)["vector_index"] is None
+    # no ANN index unless one is asked for, whatever the table size
+    assert idx.build(store, wipe=True, vector_index_min_rows=1)["vector_index"] is None
+
+    stats = idx.build(store, wipe=True, vector_index="IVF_FLAT", vector_index_min_rows=1)
+    assert stats["vector_index"] == idx.vector_index_type() is not None
+
+    exact = [h.id for h in idx.search("Bar", k=3, exact=True)]
+    approx = [h.id for h in idx.search("Bar", k=3, nprobes=50, refine_factor=2)]
+    assert len(exact) == 3
+    assert approx == exact
+    store.close()
+
+
+def test_semanticindex_search_uses_instance_ann_defaults(tmp_path):
+    store = _make_populated_store(tmp_path)
+    idx = SemanticIndex(tmp_path / "ldb", embedder=SpreadEmbedder(), nprobes=4, refine_factor=3)
+    idx.build(store, vector_index="IVF_FLAT", vector_index_min_rows=1)
+    assert (idx.nprobes, idx.refine_factor) == (4, 3)
+    assert len(idx.search("foo", k=2)) == 2
+    with pytest.raises(ValueError, match="Unknown vector index type"):
+        idx.create_vector_index("KD_TREE")
+    store.close()
+
+
+# ---------------------------------------------------------------------------
+# SemanticIndex — NumPy vector backend
+# ---------------------------------------------------------------------------
+
+
+class UnitSpreadEmbedder(SpreadEmbedder):
+    """SpreadEmbedder with unit-length vectors, as sentence-transformers returns."""
+
+    def embed_batch(self, texts: list[str]) -> np.ndarray:
+        vecs = super().embed_batch(texts)
+        return vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+
+
+def test_semanticindex_numpy_backend_matches_lancedb_exact_search(tmp_path):
+    store = _make_populated_store(tmp_path)
+    lance = SemanticIndex(tmp_path / "ldb", embedder=UnitSpreadEmbedder())
+    lance.build(store)
+    idx = SemanticIndex(tmp_path / "ldb", embedder=UnitSpreadEmbedder(), backend="numpy")
+    stats = idx.build(store)
+
+    assert stats["embedded"] == lance._get_table().count_rows()
+    assert stats["vector_index"] is None
+    assert (tmp_path / "ldb" / "codekg_nodes.vectors.bin").exists()
+    assert "backend=NumpyVectorStore" in repr(idx)
+    for q in ("foo", "Bar", "baz method"):
+        expected = lance.search(q, k=3, exact=True)
+        hits = idx.search(q, k=3)
+        assert [h.id for h in hits] == [h.id for h in expected]
+        assert [h.distance for h in hits] == pytest.approx([h.distance for h in expected], abs=1e-5)
+    batched = idx.search_many(["foo", "Bar"], k=3)
+    for hits, q in zip(batched, ["foo", "Bar"]):
+        single = idx.search(q, k=3)
+        assert [h.id for h in hits] == [h.id for h in single]
+        assert [h.distance for h in hits] == pytest.approx([h.distance for h in single], abs=1e-5)
+    assert lance.search_many(["foo"], k=2) == [lance.search("foo", k=2)]
+    with pytest.raises(ValueError, match="does not support ANN"):
+        idx.create_vector_index()
+    store.close()
+
+
+def test_semanticindex_numpy_backend_incremental_build(tmp_path):
+    store = _make_populated_store(tmp_path)
+    idx = SemanticIndex(tmp_path / "ldb", embedder=CountingEmbedder(), backend="numpy")
+    first = idx.build(store, incremental=True)
+    gen = idx.generation()
+    assert first["embedded"] == first["indexed_rows"] > 0
+
+    again = idx.build(store, incremental=True)
+    assert (again["embedded"], again["deleted"]) == (0, 0)
+    assert idx.generation() == gen
+
+    store.con.execute("UPDATE nodes SET docstring = 'Now documented.' WHERE id = 'fn:mod.py:foo'")
+    store.con.execute("DELETE FROM nodes WHERE id = 'm:mod.py:Bar.baz'")
+    store.con.commit()
+    emb = CountingEmbedder()
+    stats = SemanticIndex(tmp_path / "ldb", embedder=emb, backend="numpy").build(
+        store, incremental=True
+    )
+    assert (stats["embedded"], stats["deleted"]) == (1, 1)
+    assert "Now documented." in emb.seen[0]
+    assert idx.generation() != gen
+    assert {h.id for h in idx.search("x", k=10)} == {n["id"] for n in idx._read_nodes(store)}
+    store.close()
+
+
+def test_semanticindex_numpy_backend_delete_only_and_empty_builds(tmp_path):
+    from code_kg.store import GraphStore
+
+    store = _make_populated_store(tmp_path)
+    idx = SemanticIndex(tmp_path / "ldb", embedder=CountingEmbedder(), backend="numpy")
+    idx.build(store, incremental=True)
+
+    store.con.execute("DELETE FROM nodes WHERE id = 'm:mod.py:Bar.baz'")
+    store.con.commit()
+    stats = idx.build(store, incremental=True)
+    assert (stats["embedded"], stats["deleted"]) == (0, 1)
+    assert "m:mod.py:Bar.baz" not in {h.id for h in idx.search("x", k=10)}
+    store.close()
+
+    empty = GraphStore(tmp_path / "empty.sqlite")
+    fresh = SemanticIndex(tmp_path / "ldb_empty", embedder=CountingEmbedder(), backend="numpy")
+    assert fresh.build(empty)["indexed_rows"] == 0  # first build
+    assert fresh.build(empty, wipe=True)["indexed_rows"] == 0
+    assert fresh.build(empty, incremental=True)["embedded"] == 0
+    assert fresh.search("x", k=3) == []
+    empty.close()
+
+
+def test_semanticindex_rejects_unknown_backend(tmp_path):
+    with pytest.raises(ValueError, match="Unknown vector backend"):
+        SemanticIndex(tmp_path / "ldb", embedder=FakeEmbedder(), backend="faiss")
@@ -129,6 +129,112 @@ def test_codekg_build_graph_wipe(tmp_path):
     kg.close()
 
 
+def _dump_graph(kg: CodeKG) -> tuple[list, list]:
+    con = kg.store.con
+    nodes = con.execute("SELECT * FROM nodes ORDER BY id").fetchall()
+    edges = con.execute("SELECT * FROM edges ORDER BY src, rel, dst").fetchall()
+    return [tuple(r) for r in nodes], [tuple(r) for r in edges]
+
+
+_INCR_FILES = {
+    "pkg/__init__.py": "",
+    "pkg/a.py": """\
+        import os
+
+        def helper(x):
+            return os.path.join(x, "a")
+        """,
+    "pkg/b.py": """\
+        from pkg.a import helper
+
+        class Runner:
+            def run(self):
+                return helper("b")
+        """,
+    "pkg/c.py": """\
+        def unused():
+            return 1
+        """,
+}
+
+
+def test_codekg_build_graph_incremental_matches_full(tmp_path):
+    kg = _make_kg(tmp_path, _INCR_FILES)
+    repo = kg.repo_root
+    (repo / "pkg" / "a.py").write_text("def helper(x, y=2):\n    return x + y\n")
+    (repo / "pkg" / "c.py").unlink()
+    (repo / "pkg" / "d.py").write_text(
+        "from pkg.b import Runner\n\ndef go():\n    return Runner().run()\n"
+    )
+
+    stats = kg.build_graph(incremental=True)
+    assert stats.changed_files == 2
+    assert stats.removed_files == 1
+    incremental = _dump_graph(kg)
+    kg.close()
+
+    fresh = CodeKG(repo, db_path=tmp_path / "fresh.sqlite", lancedb_dir=tmp_path / "l2")
+    fresh.build_graph(wipe=True)
+    assert incremental == _dump_graph(fresh)
+    fresh.close()
+
+
+def test_codekg_build_graph_incremental_reresolves_package_imports(tmp_path):
+    files = _INCR_FILES | {"pkg/sub/__init__.py": "X = 1\n", "pkg/e.py": "from pkg import sub\n"}
+    kg = _make_kg(tmp_path, files)
+    edge = ("sym:pkg.sub", "RESOLVES_TO", "mod:pkg/sub/__init__.py", None)
+    assert edge in _dump_graph(kg)[1]
+    (kg.repo_root / "pkg" / "sub" / "__init__.py").write_text("X = 2\n")
+    kg.build_graph(incremental=True)
+    assert edge in _dump_graph(kg)[1]
+    kg.close()
+
+
+def test_codekg_build_graph_stream_matches_full(tmp_path):
+    kg = _make_kg(tmp_path, _INCR_FILES)
+    full = _dump_graph(kg)
+    stats = kg.build_graph(wipe=True, stream=True)
+    assert _dump_graph(kg) == full
+    assert stats.total_nodes == len(full[0])
+    kg.close()
+
+
+def test_codekg_build_graph_incremental_noop(tmp_path):
+    kg = _make_kg(tmp_path, _INCR_FILES)
+    before = _dump_graph(kg)
+    stats = kg.build_graph(incremental=True)
+    assert stats.changed_files == 0
+    assert stats.removed_files == 0
+    assert _dump_graph(kg) == before
+    kg.close()
+
+
+def test_codekg_build_graph_incremental_without_manifest_is_full(tmp_path):
+    repo = _write_repo(tmp_path / "repo", _INCR_FILES)
+    kg = CodeKG(repo, db_path=tmp_path / "codekg.sqlite", lancedb_dir=tmp_path / "lancedb")
+    stats = kg.build_graph(incremental=True)
+    assert stats.changed_files == len(_INCR_FILES)
+    assert set(kg.store.manifest()) == set(_INCR_FILES)
+    kg.close()
+
+
+def test_codekg_cache_stats_does_not_load_index(tmp_path):
+    kg = _make_kg(tmp_path, {"mod.py": "def foo(): pass\n"})
+    stats = kg.cache_stats()
+    assert stats["query_vectors"]["hits"] == 0
+    assert stats["query_vectors"]["persistent"] is False
+    assert kg._index is None and kg._embedder is None
+    kg.close()
+
+
+def test_codekg_persist_cache_lives_next_to_db(tmp_path):
+    repo = _write_repo(tmp_path / "repo", {"mod.py": "x = 1\n"})
+    kg = CodeKG(repo, db_path=tmp_path / "kg" / "g.sqlite", persist_cache=True)
+    kg.query_cache.put("k", [1.0])
+    kg.close()
+    assert (tmp_path / "kg" / "cache.sqlite").exists()
+
+
 # ---------------------------------------------------------------------------
 # CodeKG — layer accessors
 # ---------------------------------------------------------------------------
@@ -610,7 +716,7 @@ def test_codekg_build_index_wipe_flag(tmp_path):
     kg._index = mock_idx
 
     kg.build_index(wipe=True)
-    mock_idx.build.assert_called_once_with(kg.store, wipe=True)
+    mock_idx.build.assert_called_once_with(kg.store, wipe=True, incremental=False)
     kg.close()
 
 
@@ -646,6 +752,7 @@ def test_codekg_query_returns_query_result(tmp_path):
     fn_id = fns[0]["id"]
 
     mock_idx = MagicMock()
+    mock_idx.generation.return_value = (0,)
     mock_idx.search.return_value = [
         SeedHit(
             id=fn_id,
@@ -673,6 +780,7 @@ def test_codekg_query_include_symbols_flag(tmp_path):
     fn_id = fns[0]["id"]
 
     mock_idx = MagicMock()
+    mock_idx.generation.return_value = (0,)
     mock_idx.search.return_value = [
         SeedHit(
             id=fn_id,
@@ -704,6 +812,7 @@ def test_codekg_pack_returns_snippet_pack(tmp_path):
     fn_id = fns[0]["id"]
 
     mock_idx = MagicMock()
+    mock_idx.generation.return_value = (0,)
     mock_idx.search.return_value = [
         SeedHit(
             id=fn_id,
@@ -735,6 +844,7 @@ def test_codekg_pack_max_nodes_limit(tmp_path):
     assert len(fns) >= 3
 
     mock_idx = MagicMock()
+    mock_idx.generation.return_value = (0,)
     mock_idx.search.return_value = [
         SeedHit(
             id=n["id"],
@@ -752,3 +862,188 @@ def test_codekg_pack_max_nodes_limit(tmp_path):
     pack = kg.pack("many functions", k=len(fns), max_nodes=2)
     assert pack.returned_nodes <= 2
     kg.close()
+
+
+def test_codekg_pack_bulk_hydration_matches_per_id_lookups(tmp_path, monkeypatch):
+    src = "\n".join(f"def fn{i}():\n    fn{i + 1}()\n" for i in range(12))
+    kg = _make_kg(tmp_path, {"mod.py": src, "other.py": "from mod import fn3\n"})
+    fns = kg.store.query_nodes(kinds=["function"])
+    mock_idx = MagicMock()
+    mock_idx.generation.return_value = (0,)
+    mock_idx.search.return_value = [
+        SeedHit(
+            id=n["id"],
+            kind="function",
+            name=n["name"],
+            qualname=n["qualname"] or "",
+            module_path="mod.py",
+            distance=float(i) * 0.1,
+            rank=i,
+        )
+        for i, n in enumerate(fns[:4])
+    ]
+    kg._index = mock_idx
+    kg.result_cache.maxsize = 0
+
+    for max_nodes in (3, 50):
+        bulk = kg.pack("functions", k=4, hop=2, max_nodes=max_nodes).to_dict()
+        assert 1 < len(bulk["nodes"]) <= max_nodes
+
+        def per_id(ids):
+            # one node() query per id, as pack hydrated before GraphStore.nodes
+            return [n for n in map(kg.store.node, dict.fromkeys(ids)) if n]
+
+        with monkeypatch.context() as m:
+            m.setattr(kg.store, "nodes", per_id)
+            assert kg.pack("functions", k=4, hop=2, max_nodes=max_nodes).to_dict() == bulk
+    kg.close()
+
+
+# ---------------------------------------------------------------------------
+# CodeKG — result cache
+# ---------------------------------------------------------------------------
+
+
+def _cached_kg(tmp_path: Path) -> tuple[CodeKG, MagicMock]:
+    kg = _make_kg(tmp_path, {"mod.py": "def foo():\n    pass\n"})
+    fn_id = kg.store.query_nodes(kinds=["function"])[0]["id"]
+    mock_idx = MagicMock()
+    mock_idx.generation.return_value = (0,)
+    mock_idx.search.return_value = [
+        SeedHit(
+            id=fn_id,
+            kind="function",
+            name="foo",
+            qualname="foo",
+            module_path="mod.py",
+            distance=0.1,
+            rank=0,
+        )
+    ]
+    kg._index = mock_idx
+    return kg, mock_idx
+
+
+def test_codekg_pack_result_cache_hit(tmp_path):
+    kg, mock_idx = _cached_kg(tmp_path)
+    first = kg.pack("find foo", k=3)
+    first.nodes.clear()  # callers may mutate; the cached copy must not change
+    second = kg.pack("find foo", k=3)
+    assert mock_idx.search.call_count == 1
+    assert second.nodes and second.nodes[0]["snippet"]["path"] == "mod.py"
+    assert kg.cache_stats()["results"]["hits"] == 1
+
+    kg.pack("find foo", k=3, max_lines=10)
+    kg.query("find foo", k=3)
+    assert mock_idx.search.call_count == 3
+    kg.close()
+
+
+def test_codekg_pack_result_cache_rereads_edited_sources(tmp_path):
+    kg, mock_idx = _cached_kg(tmp_path)
+    kg.pack("find foo", k=3)
+    (tmp_path / "repo" / "mod.py").write_text("def foo():\n    return 42\n")
+    second = kg.pack("find foo", k=3)
+    assert mock_idx.search.call_count == 2
+    assert "return 42" in second.nodes[0]["snippet"]["text"]
+
+    kg.pack("find foo", k=3)
+    assert mock_idx.search.call_count == 2
+    kg.close()
+
+
+def test_codekg_result_cache_invalidated_by_rebuild(tmp_path):
+    kg, mock_idx = _cached_kg(tmp_path)
+    kg.query("find foo")
+    kg.query("find foo")
+    assert mock_idx.search.call_count == 1
+
+    mock_idx.generation.return_value = (1,)  # index rewritten
+    kg.query("find foo")
+    assert mock_idx.search.call_count == 2
+
+    kg.store.write([], [], wipe=True)  # graph rewritten
+    result = kg.query("find foo")
+    assert mock_idx.search.call_count == 3
+    assert result.returned_nodes == 0
+    kg.close()
+
+
+def test_codekg_result_cache_persists(tmp_path):
+    repo = _write_repo(tmp_path / "repo", {"mod.py": "def foo(): pass\n"})
+    db = tmp_path / "kg" / "g.sqlite"
+    kg = CodeKG(repo, db_path=db, persist_cache=True)
+    kg.build_graph(wipe=True)
+    fn_id = kg.store.query_nodes(kinds=["function"])[0]["id"]
+    mock_idx = MagicMock()
+    mock_idx.generation.return_value = (0,)
+    mock_idx.search.return_value = [
+        SeedHit(
+            id=fn_id,
+            kind="function",
+            name="foo",
+            qualname="foo",
+            module_path="mod.py",
+            distance=0.1,
+            rank=0,
+        )
+    ]
+    kg._index = mock_idx
+    expected = kg.query("find foo").to_dict()
+    kg.close()
+
+    again = CodeKG(repo, db_path=db, persist_cache=True)
+    again._index = mock_idx
+    assert again.query("find foo").to_dict() == expected
+    assert mock_idx.search.call_count == 1
+    assert again.cache_stats()["results"]["disk_hits"] == 1
+    again.close()
+
+
+def test_codekg_result_cache_hit_skips_index_and_embedder(tmp_path):
+    repo = _write_repo(tmp_path / "repo", {"mod.py": "def foo(): pass\n"})
+    db = tmp_path / "kg" / "g.sqlite"
+    kg = CodeKG(repo, db_path=db, persist_cache=True, vector_backend="numpy")
+    kg.build_graph(wipe=True)
+    kg._embedder = _FakeEmbedder()
+    kg.build_index(wipe=True)
+    expected = kg.query("find foo").to_dict()
+    kg.close()
+
+    again = CodeKG(repo, db_path=db, persist_cache=True, vector_backend="numpy")
+    assert again.query("find foo").to_dict() == expected
+    assert again._index is None and again._embedder is None
+    again.close()
+
+
+# ---------------------------------------------------------------------------
+# CodeKGAnalyzer
+# ---------------------------------------------------------------------------
+
+
+def test_analyzer_scans_whole_graph_without_embedder(tmp_path):
+    from rich.console import Console
+
+    from code_kg.codekg_thorough_analysis import CodeKGAnalyzer
+
+    kg = _make_kg(
+        tmp_path,
+        {
+            "a.py": "def helper():\n    pass\n\ndef unused():\n    helper()\n",
+            "b.py": "from a import helper\n\ndef g():\n    helper()\n",
+        },
+    )
+    analyzer = CodeKGAnalyzer(kg, Console(quiet=True))
+    results = analyzer.run_analysis()
+
+    assert kg._embedder is None and kg._index is None
+    assert results["function_metrics"]["fn:a.py:helper"]["fan_in"] == 2
+    assert results["function_metrics"]["fn:a.py:helper"]["lines"] == 2
+    assert {f["lines"] for f in results["orphaned_functions"]} == {2}
+    assert {f["node_id"] for f in results["orphaned_functions"]} == {
+        "fn:a.py:unused",
+        "fn:b.py:g",
+    }
+    assert results["module_metrics"]["b.py"]["outgoing_deps"] == ["a.py"]
+    assert results["module_metrics"]["a.py"]["functions"] == 2
+    kg.close()
@@ -0,0 +1,102 @@
+"""
+test_layout3d.py
+
+Tests for the vectorised 3-D layout engine — point generators and layouts.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from code_kg.layout3d import (
+    AlliumLayout,
+    LayerCakeLayout,
+    LayoutEdge,
+    LayoutNode,
+    LayoutPositions,
+    fibonacci_annulus,
+    fibonacci_sphere,
+)
+
+
+def _graph() -> tuple[list[LayoutNode], list[LayoutEdge]]:
+    nodes = [
+        LayoutNode("mod:a.py", "module", "a"),
+        LayoutNode("cls:a.py:A", "class", "A"),
+        LayoutNode("m:a.py:A.f", "method", "f"),
+        LayoutNode("m:a.py:A.g", "method", "g"),
+        LayoutNode("fn:a.py:h", "function", "h"),
+        LayoutNode("mod:b.py", "module", "b"),
+        LayoutNode("fn:b.py:k", "function", "k"),
+        LayoutNode("sym:os", "symbol", "os"),
+    ]
+    edges = [
+        LayoutEdge("mod:a.py", "CONTAINS", "cls:a.py:A"),
+        LayoutEdge("cls:a.py:A", "CONTAINS", "m:a.py:A.f"),
+        LayoutEdge("cls:a.py:A", "CONTAINS", "m:a.py:A.g"),
+        LayoutEdge("mod:a.py", "CONTAINS", "fn:a.py:h"),
+        LayoutEdge("mod:b.py", "CONTAINS", "fn:b.py:k"),
+        LayoutEdge("fn:b.py:k", "CALLS", "sym:os"),
+    ]
+    return nodes, edges
+
+
+# ---------------------------------------------------------------------------
+# Point generators
+# ---------------------------------------------------------------------------
+
+
+def test_fibonacci_sphere_shape_and_radius():
+    center = np.array([1.0, 2.0, 3.0])
+    pts = fibonacci_sphere(50, radius=2.5, center=center)
+    assert pts.shape == (50, 3)
+    assert np.allclose(np.linalg.norm(pts - center, axis=1), 2.5)
+    assert np.allclose(fibonacci_sphere(1, radius=2.0), [[0.0, 0.0, 2.0]])
+    assert fibonacci_sphere(0).shape == (0, 3)
+
+
+def test_fibonacci_annulus_stays_in_ring():
+    pts = fibonacci_annulus(40, inner_radius=3.0, outer_radius=6.0, z_thickness=0.5)
+    r = np.linalg.norm(pts[:, :2], axis=1)
+    assert pts.shape == (40, 3)
+    assert r.min() >= 3.0 - 1e-9 and r.max() <= 6.0 + 1e-9
+    assert np.abs(pts[:, 2]).max() <= 0.5
+    assert np.array_equal(pts, fibonacci_annulus(40, 3.0, 6.0, z_thickness=0.5))
+
+
+# ---------------------------------------------------------------------------
+# Layouts
+# ---------------------------------------------------------------------------
+
+
+def test_allium_layout_positions_every_node():
+    nodes, edges = _graph()
+    layout = AlliumLayout()
+    result = layout.compute(nodes, edges)
+    assert isinstance(result, LayoutPositions)
+    assert result.positions.shape == (len(nodes), 3)
+    assert list(result) == [n.id for n in nodes]
+    assert np.array_equal(result["fn:a.py:h"], result.positions[result.index["fn:a.py:h"]])
+    assert result.get("missing") is None
+
+    # modules stand on the ground, heads sit on a sphere around the stem apex
+    mod = result["mod:a.py"]
+    assert mod[2] == 0.0
+    apex = np.array([mod[0], mod[1], layout.stem_height])
+    head_r = layout.base_head_radius + np.sqrt(2) * 0.4
+    assert np.isclose(np.linalg.norm(result["cls:a.py:A"] - apex), head_r)
+    # methods orbit their class; the unparented stub is an orphan at the origin
+    method_r = layout.method_orbit_radius + np.sqrt(2) * 0.15
+    assert np.isclose(np.linalg.norm(result["m:a.py:A.f"] - result["cls:a.py:A"]), method_r)
+    assert np.isclose(np.linalg.norm(result["sym:os"]), 3.0)
+
+
+def test_layer_cake_layout_levels():
+    nodes, edges = _graph()
+    layout = LayerCakeLayout(layer_gap=10.0)
+    result = layout.compute(nodes, edges)
+    z = {n.id: result[n.id][2] for n in nodes}
+    assert z["mod:a.py"] == z["mod:b.py"] == 0.0
+    assert z["cls:a.py:A"] == 10.0
+    assert z["fn:a.py:h"] == z["m:a.py:A.f"] == 20.0
+    assert z["sym:os"] == 30.0
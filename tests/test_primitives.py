@@ -2,12 +2,18 @@
 test_primitives.py
 
 Tests for the locked v0 primitives in codekg.py:
-  Node, Edge, node_id, rel_module_path, expr_to_name, iter_python_files, extract_repo
+  Node, Edge, node_id, rel_module_path, expr_to_name, iter_python_files,
+  extract_file, extract_repo
 """
 
 from __future__ import annotations
 
 import ast
+import json
+import os
+import pickle
+import subprocess
+import sys
 import textwrap
 from pathlib import Path
 
@@ -15,8 +21,10 @@ import pytest
 
 from code_kg.codekg import (
     Edge,
+    FrozenDict,
     Node,
     expr_to_name,
+    extract_file,
     extract_repo,
     iter_python_files,
     node_id,
@@ -276,6 +284,153 @@ def test_extract_repo_deterministic(tmp_path):
     assert {(e.src, e.rel, e.dst) for e in edges1} == {(e.src, e.rel, e.dst) for e in edges2}
 
 
+def test_extract_repo_parallel_matches_serial(tmp_path):
+    """Parallel extraction merges per-file results into the serial order."""
+    _write_repo(
+        tmp_path,
+        {
+            "a.py": "import os\nclass A(Base):\n    def run(self, x):\n        y = os.path.join(x)\n",
+            "pkg/b.py": "from a import A\ndef b():\n    return A().run(1)\n",
+            "pkg/c.py": "import os\ndef c(v=os.sep):\n    os.getcwd()\n",
+            "bad.py": "def (\n",
+        },
+    )
+    assert extract_repo(tmp_path, jobs=2) == extract_repo(tmp_path, jobs=1)
+
+
+def test_extract_file_single_module(tmp_path):
+    _write_repo(tmp_path, {"mod.py": "def foo():\n    bar()\n"})
+    nodes, edges = extract_file(tmp_path / "mod.py", tmp_path)
+    assert {n.id for n in nodes} >= {"mod:mod.py", "fn:mod.py:foo", "sym:bar"}
+    assert ("fn:mod.py:foo", "CALLS", "sym:bar") in {(e.src, e.rel, e.dst) for e in edges}
+
+
+def test_extract_file_syntax_error_is_empty(tmp_path):
+    _write_repo(tmp_path, {"bad.py": "def (\n"})
+    assert extract_file(tmp_path / "bad.py", tmp_path) == ([], [])
+
+
+_CALL_SHAPES = """\
+    import functools
+
+    def deco(f):
+        return functools.wraps(f)(f)
+
+    @deco
+    @functools.lru_cache(maxsize=helper())
+    def outer(x=make_default(), *, y: annot() = 2) -> ret_type():
+        def inner(z=inner_default()):
+            return helper(z)
+        if x:
+            helper(x)
+        helper(y)
+        cb = lambda: helper(inner(x))
+        class Local:
+            attr = helper()
+        return helper(x)
+
+    def helper(v=None):
+        return v
+
+    class Base:
+        def run(self):
+            return self.step(helper(self))
+
+        def step(self, v):
+            return self.missing(v) or outer(v)
+
+        if True:
+            def guarded(self):
+                return helper()
+
+    module_level_call = helper()
+"""
+
+
+def _reference_calls(tree: ast.Module, nodes: list[Node], module: str) -> list[tuple]:
+    """Pass 2 as originally written: parent map + enclosing-def walk per call."""
+    module_locals = {
+        n.qualname: n.id
+        for n in nodes
+        if n.kind in ("class", "function", "method") and n.module_path == module
+    }
+    class_methods = {n.name: n.id for n in nodes if n.kind == "method"}
+    parent = {c: p for p in ast.walk(tree) for c in ast.iter_child_nodes(p)}
+    edges: dict[tuple, tuple] = {}
+    for n in ast.walk(tree):
+        if not isinstance(n, ast.Call):
+            continue
+        fn = parent.get(n)
+        while fn and not isinstance(fn, ast.FunctionDef | ast.AsyncFunctionDef):
+            fn = parent.get(fn)
+        if fn is None:
+            continue
+        p = parent.get(fn)
+        src = module_locals.get(f"{p.name}.{fn.name}" if isinstance(p, ast.ClassDef) else fn.name)
+        callee = expr_to_name(n.func)
+        if not src or not callee:
+            continue
+        if callee in module_locals:
+            dst = module_locals[callee]
+        elif callee.startswith("self."):
+            dst = class_methods.get(callee.split(".", 1)[1]) or f"sym:{callee}"
+        else:
+            dst = f"sym:{callee}"
+        edges[(src, dst)] = (src, "CALLS", dst, n.lineno, callee)
+    return list(edges.values())
+
+
+def test_extract_file_calls_match_three_pass_reference(tmp_path):
+    """The fused traversal yields exactly the original Pass 2 CALLS edges."""
+    _write_repo(tmp_path, {"mod.py": _CALL_SHAPES})
+    nodes, edges = extract_file(tmp_path / "mod.py", tmp_path)
+    tree = ast.parse((tmp_path / "mod.py").read_text())
+
+    got = [
+        (e.src, e.rel, e.dst, e.evidence["lineno"], e.evidence["expr"])
+        for e in edges
+        if e.rel == "CALLS"
+    ]
+    expected = _reference_calls(tree, nodes, "mod.py")
+    assert got == expected
+    # calls in decorators, defaults, annotations and nested scopes are all seen
+    dsts = {(src, dst) for src, _, dst, _, _ in got}
+    for pair in [
+        ("fn:mod.py:outer", "sym:functools.lru_cache"),
+        ("fn:mod.py:outer", "sym:make_default"),
+        ("fn:mod.py:outer", "sym:annot"),
+        ("fn:mod.py:outer", "sym:ret_type"),
+        ("m:mod.py:Base.run", "m:mod.py:Base.step"),
+        ("m:mod.py:Base.step", "sym:self.missing"),
+    ]:
+        assert pair in dsts
+    # repeated (src, dst) pairs keep the last call in breadth-first order:
+    # the depth-4 call in the decorator (visited after the body), not the
+    # final ``return helper(x)``
+    assert ("fn:mod.py:outer", "CALLS", "fn:mod.py:helper", 7, "helper") in got
+    assert not any(src.endswith("guarded") for src, *_ in got)
+
+
+def test_extract_repo_independent_of_hash_seed(tmp_path):
+    """Edge order must not depend on PYTHONHASHSEED (worker processes may differ)."""
+    _write_repo(tmp_path, {"mod.py": "def f(a, b, c):\n    g(a + b * c, d=a or b)\n"})
+    script = (
+        "import sys; from pathlib import Path; from code_kg.codekg import extract_repo; "
+        "print(repr(extract_repo(Path(sys.argv[1]))))"
+    )
+    outputs = {
+        subprocess.run(
+            [sys.executable, "-c", script, str(tmp_path)],
+            env={**os.environ, "PYTHONHASHSEED": seed},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for seed in ("1", "2", "3")
+    }
+    assert len(outputs) == 1
+
+
 # ---------------------------------------------------------------------------
 # Node / Edge dataclasses
 # ---------------------------------------------------------------------------
@@ -297,6 +452,39 @@ def test_edge_with_evidence():
     assert e.evidence == {"lineno": 5}
 
 
+def test_node_and_edge_are_slotted_and_pickle_roundtrip():
+    n = Node("fn:mod.py:foo", "function", "foo", "foo", "mod.py", 1, 2, "doc")
+    e = Edge("mod:mod.py", "CONTAINS", "fn:mod.py:foo", {"lineno": 1})
+    assert not hasattr(n, "__dict__")
+    assert not hasattr(e, "__dict__")
+    assert pickle.loads(pickle.dumps([n, e])) == [n, e]
+    assert hash(pickle.loads(pickle.dumps(n))) == hash(n)
+
+
+def test_extract_file_shares_interned_ids_and_evidence(tmp_path):
+    (tmp_path / "mod.py").write_text("def foo(p):\n    return p.x + p.y\n")
+    nodes, edges = extract_file(tmp_path / "mod.py", tmp_path)
+    by_id = {n.id: n.id for n in nodes}
+    flows = [e for e in edges if e.rel == "ATTR_ACCESS"]
+    assert len(flows) == 2
+    assert all(e.src is by_id[e.src] and e.dst is by_id[e.dst] for e in flows)
+    assert flows[0].evidence is flows[1].evidence  # same source line
+    assert flows[0].evidence["lineno"] == 2
+    with pytest.raises(TypeError):
+        flows[0].evidence["lineno"] = 3
+    with pytest.raises(TypeError):
+        flows[0].evidence.update(expr="p.x")
+    assert flows[1].evidence["lineno"] == 2
+
+    # sharing and read-only-ness survive the worker → parent pickle
+    shipped = pickle.loads(pickle.dumps(flows))
+    assert shipped == flows
+    assert shipped[0].evidence is shipped[1].evidence
+    assert isinstance(shipped[0].evidence, FrozenDict)
+    assert shipped[0].rel is sys.intern("ATTR_ACCESS")
+    assert json.loads(json.dumps(shipped[0].evidence)) == dict(flows[0].evidence)
+
+
 def test_node_fields():
     n = Node(
         id="fn:mod.py:foo",
@@ -0,0 +1,169 @@
+"""
+test_snapshot.py
+
+Tests for GraphSnapshot — in-memory CSR adjacency and its use by GraphStore.
+"""
+
+from __future__ import annotations
+
+import textwrap
+from pathlib import Path
+
+from code_kg.codekg import extract_repo
+from code_kg.snapshot import GraphSnapshot
+from code_kg.store import GraphStore
+
+_FILES = {
+    "pkg/__init__.py": "",
+    "pkg/a.py": """\
+        import os
+
+        def helper(x):
+            return os.path.join(x, "a")
+
+        class Base:
+            def run(self):
+                return helper("base")
+        """,
+    "pkg/b.py": """\
+        from pkg.a import Base, helper
+
+        class Child(Base):
+            def run(self):
+                return helper("child")
+
+        def main():
+            Child().run()
+            helper("main")
+        """,
+}
+
+
+def _make_store(tmp_path: Path, files: dict = _FILES, **kwargs) -> GraphStore:
+    """Write a synthetic repo, extract it, and persist to a temp SQLite."""
+    repo = tmp_path / "repo"
+    for rel, src in files.items():
+        p = repo / rel
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(textwrap.dedent(src))
+
+    nodes, edges = extract_repo(repo)
+    store = GraphStore(tmp_path / "codekg.sqlite", **kwargs)
+    store.write(nodes, edges, wipe=True)
+    store.resolve_symbols()
+    return store
+
+
+# ---------------------------------------------------------------------------
+# Snapshot vs SQL parity
+# ---------------------------------------------------------------------------
+
+
+def test_snapshot_expand_matches_store(tmp_path):
+    store = _make_store(tmp_path)
+    snap = GraphSnapshot.load(store)
+    seeds = {"fn:pkg/a.py:helper", "m:pkg/b.py:Child.run", "missing:id"}
+    for hop in (0, 1, 2, 3):
+        sql = store.expand(seeds, hop=hop)
+        mem = snap.expand(seeds, hop=hop)
+        assert {k: p.best_hop for k, p in mem.items()} == {k: p.best_hop for k, p in sql.items()}
+        assert all(p.via_seed in seeds for p in mem.values())
+    store.close()
+
+
+def test_snapshot_callers_of_matches_store(tmp_path):
+    store = _make_store(tmp_path)
+    snap = GraphSnapshot.load(store)
+    for target in ("fn:pkg/a.py:helper", "cls:pkg/b.py:Child", "fn:pkg/b.py:main", "nope"):
+        expected = [n["id"] for n in store.callers_of(target)]
+        assert snap.callers_of(target) == expected
+    assert snap.callers_of("fn:pkg/a.py:helper")  # non-trivial
+    store.close()
+
+
+def test_snapshot_edges_within_matches_store(tmp_path):
+    store = _make_store(tmp_path)
+    snap = GraphSnapshot.load(store)
+    ids = set(store.expand({"mod:pkg/b.py"}, hop=2))
+
+    def key(e):
+        return (e["src"], e["rel"], e["dst"], e["evidence"])
+
+    assert sorted(map(key, snap.edges_within(ids))) == sorted(map(key, store.edges_within(ids)))
+    assert snap.edges_within(set()) == []
+    store.close()
+
+
+def test_snapshot_filter_ids_matches_store(tmp_path):
+    store = _make_store(tmp_path)
+    snap = GraphSnapshot.load(store)
+    ids = set(store.expand({"mod:pkg/b.py"}, hop=3)) | {"missing:x"}
+    for exclude in ((), ("symbol",), ("symbol", "module")):
+        for limit in (None, 0, 3):
+            expected = [
+                n["id"] for n in store.filter_nodes(ids, exclude_kinds=exclude, limit=limit)
+            ]
+            assert snap.filter_ids(ids, exclude_kinds=exclude, limit=limit) == expected
+    store.close()
+
+
+def test_snapshot_empty_store(tmp_path):
+    store = GraphStore(tmp_path / "empty.sqlite")
+    snap = GraphSnapshot.load(store)
+    assert snap.expand({"x"}, hop=2)["x"].best_hop == 0
+    assert snap.callers_of("x") == []
+    assert "nodes=0" in repr(snap)
+    store.close()
+
+
+# ---------------------------------------------------------------------------
+# GraphStore(snapshot=True)
+# ---------------------------------------------------------------------------
+
+
+def test_store_snapshot_mode_is_cached(tmp_path):
+    store = _make_store(tmp_path, snapshot=True)
+    first = store.snapshot()
+    store.expand({"fn:pkg/a.py:helper"}, hop=2)
+    assert store.snapshot() is first
+    store.close()
+
+
+def test_store_snapshot_reloads_after_own_write(tmp_path):
+    store = _make_store(tmp_path, snapshot=True)
+    before = store.snapshot()
+    store.con.execute("INSERT INTO edges VALUES ('fn:pkg/b.py:main', 'CALLS', 'x:new', NULL)")
+    store.con.commit()
+    assert store.snapshot() is not before
+    assert "x:new" in store.expand({"fn:pkg/b.py:main"}, hop=1)
+    store.close()
+
+
+def test_store_snapshot_reloads_after_external_write(tmp_path):
+    store = _make_store(tmp_path, snapshot=True)
+    assert "x:ext" not in store.expand({"fn:pkg/a.py:helper"}, hop=1)
+
+    other = GraphStore(tmp_path / "codekg.sqlite")
+    other.con.execute("INSERT INTO edges VALUES ('fn:pkg/a.py:helper', 'CALLS', 'x:ext', NULL)")
+    other.con.commit()
+    other.close()
+
+    assert "x:ext" in store.expand({"fn:pkg/a.py:helper"}, hop=1)
+    store.close()
+
+
+def test_store_snapshot_mode_callers_returns_nodes(tmp_path):
+    store = _make_store(tmp_path, snapshot=True)
+    plain = GraphStore(tmp_path / "codekg.sqlite")
+    assert store.callers_of("fn:pkg/a.py:helper") == plain.callers_of("fn:pkg/a.py:helper")
+    plain.close()
+    store.close()
+
+
+def test_store_snapshot_mode_callers_many_matches_sql(tmp_path):
+    store = _make_store(tmp_path, snapshot=True)
+    plain = GraphStore(tmp_path / "codekg.sqlite")
+    targets = ["fn:pkg/a.py:helper", "cls:pkg/b.py:Child", "nope"]
+    assert store.callers_of_many(targets) == plain.callers_of_many(targets)
+    plain.close()
+    store.close()
@@ -6,11 +6,22 @@ Tests for GraphStore — SQLite persistence and graph traversal.
 
 from __future__ import annotations
 
+import os
+import sqlite3
 import textwrap
 from pathlib import Path
 
-from code_kg.codekg import extract_repo
-from code_kg.store import GraphStore, ProvMeta
+import pytest
+
+from code_kg.bench import synth_repo
+from code_kg.codekg import Edge, Node, extract_repo, iter_extract
+from code_kg.store import (
+    DEFAULT_RELS,
+    RESOLVE_MAX_CANDIDATES,
+    GraphStore,
+    ProvMeta,
+    _qualified_paths,
+)
 
 
 def _make_store(tmp_path: Path, files: dict) -> GraphStore:
@@ -108,6 +119,205 @@ def test_store_upsert_idempotent(tmp_path):
     store.close()
 
 
+def test_store_write_stream_matches_write(tmp_path):
+    files = {
+        "pkg/a.py": "import os\n\ndef helper(x):\n    return os.path.join(x)\n",
+        "pkg/b.py": "import os\nfrom pkg.a import helper\n\ndef main():\n    helper(1)\n",
+    }
+    store = _make_store(tmp_path, files)
+    expected = [
+        store.con.execute("SELECT * FROM nodes ORDER BY id").fetchall(),
+        store.con.execute("SELECT * FROM edges ORDER BY src, rel, dst").fetchall(),
+    ]
+    before = store.build_id()
+
+    n_nodes, n_edges = store.write_stream(iter_extract(tmp_path / "repo"), wipe=True, batch_rows=3)
+    actual = [
+        store.con.execute("SELECT * FROM nodes ORDER BY id").fetchall(),
+        store.con.execute("SELECT * FROM edges ORDER BY src, rel, dst").fetchall(),
+    ]
+    assert actual == expected
+    assert n_nodes >= len(expected[0])  # shared sym: rows are counted per file
+    assert n_edges == len(expected[1])
+    assert store.build_id() != before
+    store.close()
+
+
+def test_store_bulk_load_publishes_past_open_reader(tmp_path):
+    store = _make_store(tmp_path, {"mod.py": "def foo(): pass\n"})
+    db = tmp_path / "codekg.sqlite"
+    reader = sqlite3.connect(str(db), isolation_level=None)
+    reader.execute("BEGIN")
+    before = reader.execute("SELECT COUNT(*) FROM nodes").fetchone()[0]
+
+    repo = tmp_path / "repo"
+    (repo / "other.py").write_text("def bar(): pass\n")
+    store.write(*extract_repo(repo), wipe=True)
+
+    # a reader inside a transaction keeps its consistent view of the old graph
+    assert reader.execute("SELECT COUNT(*) FROM nodes").fetchone()[0] == before
+    reader.execute("COMMIT")
+    assert reader.execute("SELECT COUNT(*) FROM nodes").fetchone()[0] > before
+    reader.close()
+    store.close()
+    check = sqlite3.connect(str(db))
+    assert check.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    check.close()
+    assert store.node("fn:other.py:bar") is not None
+    indexes = {r[0] for r in store.con.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert {"idx_nodes_kind", "idx_edges_src", "idx_edges_dst_rel"} <= indexes
+    assert store.con.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+    assert store.con.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert not list(tmp_path.glob("*.staging"))
+    store.close()
+
+
+@pytest.mark.parametrize("open_reader", [False, True])
+def test_store_bulk_load_into_empty_database_loads_in_place(tmp_path, open_reader):
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    (repo / "mod.py").write_text("def foo(): pass\n\ndef bar():\n    foo()\n")
+    db = tmp_path / "codekg.sqlite"
+    store = GraphStore(db)
+    store.con  # create the empty schema
+    reader = GraphStore(db) if open_reader else None
+    if reader is not None:
+        assert reader.stats()["total_nodes"] == 0
+
+    store.write(*extract_repo(repo))
+
+    assert not list(tmp_path.glob("*.staging*"))
+    assert store.metrics("fn:mod.py:foo")["in:CALLS"] == 1
+    indexes = {r[0] for r in store.con.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert {"idx_nodes_kind", "idx_edges_src", "idx_edges_dst_rel"} <= indexes
+    assert store.con.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0] > 0
+    assert store.con.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    if reader is not None:
+        assert reader.node("fn:mod.py:foo") is not None
+        reader.close()
+    store.close()
+
+
+def test_store_bulk_load_failure_keeps_old_graph(tmp_path):
+    store = _make_store(tmp_path, {"mod.py": "def foo(): pass\n"})
+    nodes = store.stats()["total_nodes"]
+
+    def batches():
+        yield [], []
+        raise RuntimeError("extraction failed")
+
+    with pytest.raises(RuntimeError):
+        store.write_stream(batches(), wipe=True)
+    assert store.stats()["total_nodes"] == nodes
+    assert not list(tmp_path.glob("*.staging"))
+    store.close()
+
+
+def test_store_rebuild_is_invisible_until_swapped(tmp_path):
+    store = _make_store(tmp_path, {"mod.py": "def foo(): pass\n"})
+    reader = GraphStore(tmp_path / "codekg.sqlite")
+    assert reader.node("fn:mod.py:foo") is not None
+
+    with store.rebuild() as stage:
+        assert stage.node("fn:mod.py:foo") is None  # staging starts empty
+        stage.write([Node("fn:new.py:bar", "function", "bar", "bar", "new.py", 1, 1, None)], [])
+        # readers keep the old graph while the staging file is built
+        assert reader.node("fn:mod.py:foo") is not None
+        assert reader.node("fn:new.py:bar") is None
+
+    # the long-lived reader follows the swap without being reopened
+    assert reader.node("fn:mod.py:foo") is None
+    assert reader.node("fn:new.py:bar") is not None
+    assert not list(tmp_path.glob("*.staging"))
+    reader.close()
+    store.close()
+
+
+def test_store_transaction_commits_once_and_rolls_back_on_error(tmp_path):
+    store = _make_store(tmp_path, {"mod.py": "def foo(): pass\n"})
+    reader = GraphStore(tmp_path / "codekg.sqlite")
+    bar = Node("fn:new.py:bar", "function", "bar", "bar", "new.py", 1, 1, None)
+
+    with store.transaction():
+        store.delete_modules(["mod.py"])
+        store.write_stream([([bar], [])])
+        store.resolve_symbols()
+        # nothing is visible to other connections until the block commits
+        assert reader.node("fn:mod.py:foo") is not None
+        assert reader.node("fn:new.py:bar") is None
+    assert reader.node("fn:mod.py:foo") is None
+    assert reader.node("fn:new.py:bar") is not None
+    assert not list(tmp_path.glob("*.staging"))
+
+    with pytest.raises(RuntimeError), store.transaction():
+        store.delete_modules(["new.py"])
+        raise RuntimeError("extraction failed")
+    assert store.node("fn:new.py:bar") is not None
+    reader.close()
+    store.close()
+
+
+def test_store_rebuild_under_concurrent_reader_keeps_file_intact(tmp_path):
+    store = _make_store(tmp_path, {"mod.py": "def foo(): pass\n"})
+    db = tmp_path / "codekg.sqlite"
+    reader = GraphStore(db)
+    con = reader.con
+    con.execute("BEGIN")
+    assert reader.node("fn:mod.py:foo") is not None
+
+    with store.rebuild() as stage:
+        stage.write([Node("fn:new.py:bar", "function", "bar", "bar", "new.py", 1, 1, None)], [])
+
+    # the open transaction still reads the old graph, on the same connection
+    assert reader.node("fn:mod.py:foo") is not None
+    con.execute("COMMIT")
+    assert reader.node("fn:mod.py:foo") is None
+    assert reader.node("fn:new.py:bar") is not None
+    assert reader.con is con
+    reader.close()
+    store.close()
+    check = sqlite3.connect(str(db))
+    assert check.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+    check.close()
+
+
+def test_store_replaced_file_retires_and_closes_stale_connection(tmp_path):
+    store = _make_store(tmp_path, {"mod.py": "def foo(): pass\n"})
+    db = tmp_path / "codekg.sqlite"
+    reader = GraphStore(db)
+    first = reader.con
+    for name in ("a", "b"):
+        copy = tmp_path / f"{name}.sqlite"
+        dst = sqlite3.connect(str(copy))
+        store.con.backup(dst)
+        dst.close()
+        store.close()
+        os.replace(copy, db)
+        assert reader.node("fn:mod.py:foo") is not None
+    with pytest.raises(sqlite3.ProgrammingError):  # closed on the second replacement
+        first.execute("SELECT 1")
+    reader.close()
+
+
+def test_store_build_id_survives_reopen_and_moves_on_write(tmp_path):
+    store = _make_store(tmp_path, {"mod.py": "def foo(): pass\n"})
+    first = store.build_id()
+    assert store.build_id() == first
+    store.close()  # checkpoints the WAL, so generation() changes
+
+    reopened = GraphStore(tmp_path / "codekg.sqlite")
+    assert reopened.build_id() == first
+    reopened.delete_modules(["mod.py"])
+    assert reopened.build_id() != first
+    reopened.close()
+
+
+def test_store_build_id_legacy_db_falls_back_to_generation(tmp_path):
+    store = GraphStore(tmp_path / "empty.sqlite")
+    assert store.build_id().startswith("gen:")
+    store.close()
+
+
 # ---------------------------------------------------------------------------
 # node()
 # ---------------------------------------------------------------------------
@@ -132,6 +342,39 @@ def test_store_node_missing_returns_none(tmp_path):
     store.close()
 
 
+def test_store_nodes_bulk_preserves_order_and_skips_missing(tmp_path):
+    store = _make_store(tmp_path, {"mod.py": "def a(): pass\ndef b(): pass\n"})
+    ids = ["fn:mod.py:b", "missing:x", "mod:mod.py", "fn:mod.py:a", "fn:mod.py:b"]
+    got = store.nodes(ids)
+    assert [n["id"] for n in got] == ["fn:mod.py:b", "mod:mod.py", "fn:mod.py:a"]
+    assert got[0] == store.node("fn:mod.py:b")
+    assert store.nodes([]) == []
+    store.close()
+
+
+def test_store_nodes_bulk_spans_chunks(tmp_path):
+    src = "\n".join(f"def f{i}(): pass" for i in range(1200))
+    store = _make_store(tmp_path, {"mod.py": src})
+    ids = [f"fn:mod.py:f{i}" for i in reversed(range(1200))]
+    assert [n["id"] for n in store.nodes(ids)] == ids
+    store.close()
+
+
+def test_store_filter_nodes_ranked_and_truncated(tmp_path):
+    store = _make_store(
+        tmp_path, {"mod.py": "import os\n\ndef b():\n    os.getcwd()\n\ndef a(): pass\n"}
+    )
+    ids = {r[0] for r in store.con.execute("SELECT id FROM nodes")} | {"missing:x"}
+    everything = store.filter_nodes(ids)
+    assert [n["id"] for n in everything] == sorted(ids - {"missing:x"})
+
+    no_syms = store.filter_nodes(ids, exclude_kinds=("symbol",))
+    assert no_syms and all(n["kind"] != "symbol" for n in no_syms)
+    assert store.filter_nodes(ids, exclude_kinds=("symbol",), limit=2) == no_syms[:2]
+    assert store.filter_nodes([], limit=5) == []
+    store.close()
+
+
 # ---------------------------------------------------------------------------
 # query_nodes()
 # ---------------------------------------------------------------------------
@@ -245,6 +488,46 @@ def test_store_expand_seed_has_hop0(tmp_path):
     store.close()
 
 
+def _legacy_expand(store: GraphStore, seed_ids: set[str], hop: int) -> dict[str, ProvMeta]:
+    """Per-node expansion as shipped before the batched frontier query."""
+    rels = tuple(DEFAULT_RELS)
+    meta = {sid: ProvMeta(best_hop=0, via_seed=sid) for sid in seed_ids}
+    frontier = set(seed_ids)
+    for h in range(1, hop + 1):
+        nxt: set[str] = set()
+        for nid in frontier:
+            rows = store.con.execute(
+                f"""
+                SELECT src, dst FROM edges
+                WHERE (src = ? OR dst = ?)
+                  AND rel IN ({",".join("?" for _ in rels)})
+                """,
+                (nid, nid, *rels),
+            ).fetchall()
+            for src, dst in rows:
+                for cand in (src, dst):
+                    if cand not in meta:
+                        meta[cand] = ProvMeta(best_hop=h, via_seed=meta[nid].via_seed)
+                        nxt.add(cand)
+        frontier = nxt
+    return meta
+
+
+def test_store_expand_matches_per_node_expansion(tmp_path):
+    synth_repo(tmp_path / "repo", 120)
+    store = GraphStore(tmp_path / "codekg.sqlite")
+    store.write(*extract_repo(tmp_path / "repo"))
+    store.resolve_symbols()
+    fns = sorted(n["id"] for n in store.query_nodes(kinds=["function", "method"]))
+    seeds = set(fns[::15])
+    for hop in (1, 2, 3):
+        old = _legacy_expand(store, seeds, hop)
+        new = store.expand(seeds, hop=hop)
+        assert old.keys() == new.keys()
+        assert all(old[k].best_hop == new[k].best_hop for k in old)
+    store.close()
+
+
 def test_store_expand_non_seed_hop_positive(tmp_path):
     store = _make_store(
         tmp_path,
@@ -256,3 +539,299 @@ def test_store_expand_non_seed_hop_positive(tmp_path):
     non_seeds = {nid: p for nid, p in meta.items() if nid not in seed}
     assert all(p.best_hop > 0 for p in non_seeds.values())
     store.close()
+
+
+def test_store_expand_matches_reference_bfs(tmp_path):
+    store = _make_store(
+        tmp_path,
+        {
+            "a.py": "import b\n\ndef f():\n    return g()\n\ndef g():\n    return b.h()\n",
+            "b.py": "class K:\n    def m(self):\n        pass\n\ndef h():\n    return K().m()\n",
+        },
+    )
+    adj: dict[str, set[str]] = {}
+    for src, rel, dst in store.con.execute("SELECT src, rel, dst FROM edges"):
+        if rel not in DEFAULT_RELS:
+            continue
+        adj.setdefault(src, set()).add(dst)
+        adj.setdefault(dst, set()).add(src)
+
+    seeds = {"fn:a.py:f", "cls:b.py:K"}
+    dist = {sid: 0 for sid in seeds}
+    reach = {sid: {sid} for sid in seeds}  # seeds that reach each node at best distance
+    frontier = set(seeds)
+    for h in range(1, 4):
+        nxt = set()
+        for nid in frontier:
+            for cand in adj.get(nid, ()):
+                if cand not in dist:
+                    dist[cand] = h
+                    nxt.add(cand)
+                if dist[cand] == h:
+                    reach.setdefault(cand, set()).update(reach[nid])
+        frontier = nxt
+
+        meta = store.expand(seeds, hop=h)
+        assert {k: p.best_hop for k, p in meta.items()} == dist
+        assert all(p.via_seed in reach[k] for k, p in meta.items())
+    store.close()
+
+
+# ---------------------------------------------------------------------------
+# File manifest / incremental support
+# ---------------------------------------------------------------------------
+
+
+def test_store_manifest_roundtrip(tmp_path):
+    from code_kg.codekg import FileRecord
+
+    store = GraphStore(tmp_path / "codekg.sqlite")
+    assert store.manifest() == {}
+    recs = [FileRecord("a.py", 1, 10, "aa"), FileRecord("b.py", 2, 20, "bb")]
+    store.write_manifest(recs)
+    assert store.manifest() == {r.path: r for r in recs}
+
+    store.write_manifest([FileRecord("a.py", 3, 11, "a2")], removed=["b.py"])
+    assert store.manifest() == {"a.py": FileRecord("a.py", 3, 11, "a2")}
+    store.clear()
+    assert store.manifest() == {}
+    store.close()
+
+
+def test_store_delete_modules_drops_owned_rows_and_orphan_syms(tmp_path):
+    store = _make_store(
+        tmp_path,
+        {
+            "a.py": "import json\n\ndef f():\n    return json.dumps(1)\n",
+            "b.py": "def g():\n    pass\n",
+        },
+    )
+    removed = store.delete_modules(["a.py"])
+    assert removed > 0
+    ids = {r[0] for r in store.con.execute("SELECT id FROM nodes")}
+    assert not any(i.startswith(("mod:a.py", "fn:a.py")) for i in ids)
+    assert "sym:json" not in ids  # no remaining references
+    assert "fn:b.py:g" in ids
+    dangling = store.con.execute(
+        "SELECT COUNT(*) FROM edges WHERE src NOT IN (SELECT id FROM nodes)"
+    ).fetchone()[0]
+    assert dangling == 0
+    store.close()
+
+
+def test_store_resolve_symbols_restricted_to_names(tmp_path):
+    store = _make_store(
+        tmp_path,
+        {
+            "a.py": "def helper(): pass\ndef other(): pass\n",
+            "b.py": "from a import helper, other\n\ndef g():\n    helper()\n    other()\n",
+        },
+    )
+    # sym:a.helper (import) and sym:helper (call) both resolve to fn:a.py:helper
+    assert store.resolve_symbols(names={"helper"}) == 2
+    resolved = {r[0] for r in store.con.execute("SELECT src FROM edges WHERE rel = 'RESOLVES_TO'")}
+    assert resolved == {"sym:a.helper", "sym:helper"}
+    store.resolve_symbols()
+    resolved = {r[0] for r in store.con.execute("SELECT src FROM edges WHERE rel = 'RESOLVES_TO'")}
+    assert resolved == {"sym:a.helper", "sym:helper", "sym:a.other", "sym:other"}
+    store.close()
+
+
+# ---------------------------------------------------------------------------
+# Node metrics
+# ---------------------------------------------------------------------------
+
+_METRIC_FILES = {
+    "a.py": "def helper():\n    pass\n\ndef other():\n    helper()\n",
+    "b.py": "from a import helper\n\ndef g():\n    helper()\n    helper()\n\ndef h():\n    g()\n",
+}
+
+
+def test_store_metrics_match_callers_and_degrees(tmp_path):
+    store = _make_store(tmp_path, _METRIC_FILES)
+    store.resolve_symbols()
+    assert store.refresh_metrics() > 0
+    for node_id in ("fn:a.py:helper", "fn:b.py:g", "fn:b.py:h"):
+        assert store.metrics(node_id).get("fan_in", 0) == len(store.callers_of(node_id))
+    helper = store.metrics("fn:a.py:helper")
+    assert helper["fan_in"] == 2  # direct from other(), via sym:helper from g()
+    assert helper["lines"] == 2
+    assert store.metrics("fn:b.py:g")["out:CALLS"] == 1  # duplicate calls are one edge
+    assert store.metrics("mod:a.py")["out:CONTAINS"] == 2
+    assert store.metrics("missing:id") == {}
+    store.close()
+
+
+def test_store_top_nodes_ranked_and_filtered(tmp_path):
+    store = _make_store(tmp_path, _METRIC_FILES)
+    store.resolve_symbols()
+    top = store.top_nodes("fan_in", limit=2)
+    assert [(n["id"], n["value"]) for n in top] == [("fn:a.py:helper", 2), ("fn:b.py:g", 1)]
+    assert top[0]["kind"] == "function"
+    assert all(n["kind"] == "module" for n in store.top_nodes("out:CONTAINS", kinds=("module",)))
+    assert store.top_nodes("no-such-metric") == []
+    store.close()
+
+
+def test_store_metrics_refresh_after_write(tmp_path):
+    store = _make_store(tmp_path, _METRIC_FILES)
+    assert store.metrics("fn:b.py:g").get("fan_in") == 1
+    store.write([], [Edge("fn:a.py:other", "CALLS", "fn:b.py:g")])
+    assert store.metrics("fn:b.py:g")["fan_in"] == 2
+    store.close()
+
+
+def test_store_orphans_are_uncalled_definitions(tmp_path):
+    store = _make_store(
+        tmp_path,
+        {
+            "a.py": "def helper():\n    pass\n\ndef unused():\n    helper()\n",
+            "b.py": "class C:\n    def __init__(self):\n        pass\n    def m(self):\n        pass\n",
+        },
+    )
+    store.resolve_symbols()
+    ids = [n["id"] for n in store.orphans()]
+    assert ids == ["fn:a.py:unused", "cls:b.py:C", "m:b.py:C.m"]  # no dunders
+    assert [n["id"] for n in store.orphans(kinds=("class",))] == ["cls:b.py:C"]
+    store.close()
+
+
+def test_store_orphans_keep_targets_of_capped_stubs(tmp_path):
+    files = {f"m{i}.py": "def run():\n    pass\n" for i in range(RESOLVE_MAX_CANDIDATES + 1)}
+    files["main.py"] = "def main(obj):\n    obj.run()\n\ndef lonely():\n    pass\n"
+    store = _make_store(tmp_path, files)
+    store.resolve_symbols()
+    # sym:obj.run matches one definition too many and stays unresolved ...
+    assert "sym:obj.run" not in {s for s, _ in _resolved(store)}
+    assert "fan_in" not in store.metrics("fn:m0.py:run")
+    # ... but its candidates are not reported as dead code
+    assert [n["id"] for n in store.orphans()] == ["fn:main.py:main", "fn:main.py:lonely"]
+    store.close()
+
+
+def test_store_module_coupling_resolves_imports(tmp_path):
+    store = _make_store(tmp_path, _METRIC_FILES | {"c.py": "import os\n"})
+    store.resolve_symbols()
+    coupling = store.module_coupling()
+    assert set(coupling) == {"a.py", "b.py", "c.py"}
+    assert coupling["b.py"]["imports"] == ["a.py"]
+    assert coupling["a.py"]["imported_by"] == ["b.py"]
+    assert coupling["c.py"]["imports"] == []  # sym:os has no first-party target
+    assert coupling["a.py"]["functions"] == 2
+    assert coupling["a.py"]["fan_in"] == 2  # helper has two callers, other none
+    store.close()
+
+
+# ---------------------------------------------------------------------------
+# Caller lookup (fan-in)
+# ---------------------------------------------------------------------------
+
+
+def test_store_callers_of_many_matches_callers_of(tmp_path):
+    store = _make_store(tmp_path, _METRIC_FILES)
+    store.resolve_symbols()
+    targets = ["fn:b.py:g", "fn:a.py:helper", "missing:id", "fn:a.py:helper"]
+    batch = store.callers_of_many(targets)
+    assert list(batch) == ["fn:b.py:g", "fn:a.py:helper", "missing:id"]
+    for target, callers in batch.items():
+        assert callers == store.callers_of(target)
+    # direct caller first, then the caller that goes through sym:helper
+    assert [n["id"] for n in batch["fn:a.py:helper"]] == ["fn:a.py:other", "fn:b.py:g"]
+    assert batch["missing:id"] == []
+    assert store.callers_of_many([]) == {}
+    store.close()
+
+
+def _legacy_callers_of(store: GraphStore, node_id: str, rel: str = "CALLS") -> list[dict]:
+    """Multi-query lookup as shipped before the set-based join."""
+    direct = store.con.execute(
+        "SELECT src FROM edges WHERE dst = ? AND rel = ?", (node_id, rel)
+    ).fetchall()
+    stubs = store.con.execute(
+        "SELECT src FROM edges WHERE dst = ? AND rel = 'RESOLVES_TO'", (node_id,)
+    ).fetchall()
+    stub_callers: list[tuple[str]] = []
+    for (stub_id,) in stubs:
+        stub_callers.extend(
+            store.con.execute(
+                "SELECT src FROM edges WHERE dst = ? AND rel = ?", (stub_id, rel)
+            ).fetchall()
+        )
+    return store.nodes(caller_id for (caller_id,) in direct + stub_callers)
+
+
+def test_store_callers_of_matches_multi_query_lookup(tmp_path):
+    synth_repo(tmp_path / "repo", 120)
+    store = GraphStore(tmp_path / "codekg.sqlite")
+    store.write(*extract_repo(tmp_path / "repo"))
+    store.resolve_symbols()
+    targets = [n["id"] for n in store.query_nodes(kinds=["function", "method"])]
+    batch = store.callers_of_many(targets)
+    assert any(len(callers) > 1 for callers in batch.values())
+    for target in targets:
+        assert _legacy_callers_of(store, target) == store.callers_of(target) == batch[target]
+    store.close()
+
+
+# ---------------------------------------------------------------------------
+# Symbol resolution
+# ---------------------------------------------------------------------------
+
+_RESOLVE_FILES = {
+    "src/pkg/__init__.py": "",
+    "src/pkg/a.py": "def helper():\n    pass\n",
+    "src/pkg/b.py": "def helper():\n    pass\n",
+    "src/pkg/c.py": (
+        "from pkg.a import helper\nimport pkg.b\n\n"
+        "def g():\n    helper()\n    pkg.b.helper()\n    obj.helper()\n"
+    ),
+}
+
+
+def _resolved(store: GraphStore) -> set[tuple[str, str]]:
+    return set(store.con.execute("SELECT src, dst FROM edges WHERE rel = 'RESOLVES_TO'"))
+
+
+def test_store_resolve_symbols_prefers_qualified_match(tmp_path):
+    store = _make_store(tmp_path, _RESOLVE_FILES)
+    store.resolve_symbols()
+    resolved = _resolved(store)
+    # import-qualified stubs link to exactly one definition ...
+    assert {d for s, d in resolved if s == "sym:pkg.a.helper"} == {"fn:src/pkg/a.py:helper"}
+    assert {d for s, d in resolved if s == "sym:pkg.b.helper"} == {"fn:src/pkg/b.py:helper"}
+    assert {d for s, d in resolved if s == "sym:pkg.b"} == {"mod:src/pkg/b.py"}
+    # ... while bare and attribute calls fall back to every same-named def
+    assert {d for s, d in resolved if s == "sym:obj.helper"} == {
+        "fn:src/pkg/a.py:helper",
+        "fn:src/pkg/b.py:helper",
+    }
+    store.close()
+
+
+def test_qualified_paths_skips_rows_without_module_path():
+    rows = [
+        ("cls:pkg/mod.py:A", "class", "A", "pkg/mod.py"),
+        ("sym:A", "symbol", "A", None),
+    ]
+    assert list(_qualified_paths(rows, {"A"})) == [
+        ("pkg.mod.A", "cls:pkg/mod.py:A"),
+        ("mod.A", "cls:pkg/mod.py:A"),
+    ]
+
+
+def test_store_resolve_symbols_caps_ambiguous_stubs(tmp_path):
+    store = _make_store(tmp_path, _RESOLVE_FILES)
+    assert store.resolve_symbols(max_candidates=1) > 0
+    stubs = {s for s, _ in _resolved(store)}
+    assert "sym:obj.helper" not in stubs and "sym:helper" not in stubs
+    assert "sym:pkg.a.helper" in stubs
+
+    # an uncapped, name-scoped rerun reconciles to the same edges as a full run
+    # sym:helper, sym:obj.helper and g's local read of helper, two targets each
+    assert store.resolve_symbols(names={"helper"}, max_candidates=None) == 6
+    scoped = _resolved(store)
+    assert store.resolve_symbols(max_candidates=None) == 0
+    assert _resolved(store) == scoped
+    assert store.resolve_symbols(names={"helper"}, max_candidates=1) == 0
+    assert "sym:obj.helper" not in {s for s, _ in _resolved(store)}
+    store.close()
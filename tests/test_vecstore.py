@@ -0,0 +1,115 @@
+"""
+test_vecstore.py
+
+Tests for the in-process NumPy vector backend.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from code_kg.vecstore import ROW_FIELDS, NumpyVectorStore, VectorBackend
+
+
+def _rows(ids: list[str], text_hash: str = "h") -> dict[str, list[str]]:
+    return {
+        "id": ids,
+        "kind": ["function"] * len(ids),
+        "name": [i.rsplit(":", 1)[-1] for i in ids],
+        "qualname": ids,
+        "module_path": ["mod.py"] * len(ids),
+        "text_hash": [text_hash] * len(ids),
+        "model": ["fake"] * len(ids),
+    }
+
+
+def test_vector_backend_methods_raise_not_implemented():
+    backend = VectorBackend()
+    with pytest.raises(NotImplementedError):
+        backend.search(np.zeros((1, 4)), 3)
+    with pytest.raises(NotImplementedError):
+        backend.existing_hashes()
+
+
+def test_numpy_store_round_trip_is_memory_mapped(tmp_path):
+    store = NumpyVectorStore(tmp_path / "vecs.bin")
+    assert store.count() == 0
+    assert store.generation() == (0,)
+    assert store.search(np.ones((2, 4)), 3) == [[], []]
+
+    vecs = np.eye(3, 4, dtype=np.float32) * 5
+    store.write(_rows(["fn:a", "fn:bé", "fn:c"]), vecs)
+    assert store.count() == 3
+    assert store.existing_hashes()["fn:bé"] == ("h", "fake")
+
+    reopened = NumpyVectorStore(tmp_path / "vecs.bin")
+    rows, mat = reopened._load()
+    assert isinstance(mat, np.memmap) and mat.dtype == np.float32
+    assert mat.ctypes.data % 64 == 0
+    assert np.allclose(np.linalg.norm(mat, axis=1), 1.0)
+
+    (hit,) = reopened.search(np.array([[0.0, 2.0, 0.0, 0.0]]), 1)[0]
+    assert {f: hit[f] for f in ROW_FIELDS} == {
+        "id": "fn:bé",
+        "kind": "function",
+        "name": "bé",
+        "qualname": "fn:bé",
+        "module_path": "mod.py",
+        "text_hash": "h",
+        "model": "fake",
+    }
+    assert hit["_distance"] == pytest.approx(0.0)
+
+
+def test_numpy_store_upserts_deletes_and_wipes(tmp_path):
+    store = NumpyVectorStore(tmp_path / "vecs.bin")
+    store.write(_rows(["a", "b", "c"]), np.eye(3, 4, dtype=np.float32))
+    gen = store.generation()
+
+    store.write(_rows(["b", "d"], "h2"), np.eye(2, 4, k=2, dtype=np.float32), delete=["c"])
+    assert store.generation() != gen
+    assert store.existing_hashes() == {"a": ("h", "fake"), "b": ("h2", "fake"), "d": ("h2", "fake")}
+    # "b" now points along axis 2
+    assert store.search(np.array([[0, 0, 1, 0]]), 1)[0][0]["id"] == "b"
+
+    store.write(_rows(["z"]), np.ones((1, 4), dtype=np.float32), wipe=True)
+    assert list(store.existing_hashes()) == ["z"]
+    assert not list(tmp_path.glob("*.tmp"))
+
+
+def test_numpy_store_accepts_empty_writes(tmp_path):
+    store = NumpyVectorStore(tmp_path / "vecs.bin")
+    store.write(_rows([]), np.zeros((0, 4), dtype=np.float32))  # creates an empty file
+    assert store.generation() != (0,)
+    assert store.count() == 0
+
+    store.write(_rows(["a", "b"]), np.eye(2, 4, dtype=np.float32))
+    gen = store.generation()
+    store.write(_rows([]), np.zeros((0, 4), dtype=np.float32))  # nothing to do
+    assert store.generation() == gen
+
+    store.write(_rows([]), np.zeros((0, 4), dtype=np.float32), delete=["a"])
+    assert list(store.existing_hashes()) == ["b"]
+
+    store.write(_rows([]), np.zeros((0, 4), dtype=np.float32), wipe=True)
+    assert store.count() == 0
+
+
+def test_numpy_store_batched_search_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(0)
+    vecs = rng.standard_normal((500, 16)).astype(np.float32)
+    queries = rng.standard_normal((150, 16)).astype(np.float32)
+    store = NumpyVectorStore(tmp_path / "vecs.bin")
+    store.write(_rows([f"n{i}" for i in range(500)]), vecs)
+
+    unit = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+    results = store.search(queries, 10)
+    assert len(results) == 150
+    for q, hits in zip(queries, results):
+        expected = np.argsort(-(unit @ (q / np.linalg.norm(q))))[:10]
+        assert [h["id"] for h in hits] == [f"n{i}" for i in expected]
+        dists = [h["_distance"] for h in hits]
+        assert dists == sorted(dists)
+    assert store.search(queries[:1], 1000)[0][-1]["id"] in {f"n{i}" for i in range(500)}
+    assert len(store.search(queries[:1], 1000)[0]) == 500